@@ -1,11 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db import transaction
 from django.shortcuts import redirect
 from django.urls import reverse
 from .models import (
     Usuario, CategoriaVideo, CategoriaMusica, VideoBase, MusicaBase,
     VideoGerado, Plano, Assinatura, Configuracao, Pagamento
 )
+from .tasks import task_ingerir_midia
 from itertools import zip_longest
 import os
 
@@ -90,7 +92,8 @@ recalc_urls.short_description = "Recalcular URLs"
 
 @admin.register(VideoBase)
 class VideoBaseAdmin(admin.ModelAdmin):
-    list_display = ('titulo', 'categoria', 'object_key', 'get_video_url')
+    list_display = ('titulo', 'categoria', 'object_key', 'disponivel', 'normalizado', 'largura', 'altura', 'fps', 'get_video_url')
+    list_filter = ('disponivel', 'normalizado', 'categoria')
     readonly_fields = ('get_video_url',)
     actions = [corrigir_object_keys, recalc_urls]
     change_form_template = "admin/core/videobase/change_form.html"
@@ -100,6 +103,12 @@ class VideoBaseAdmin(admin.ModelAdmin):
         return obj.video_url if hasattr(obj, 'video_url') else 'N/A'
     get_video_url.short_description = 'URL do Vídeo'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Arquivo enviado pelo formulário comum: ingestão (e liberação para sorteio) no worker
+        if 'arquivo_video' in form.changed_data and obj.arquivo_video:
+            transaction.on_commit(lambda pk=obj.pk: task_ingerir_midia.delay("video", pk))
+
     def add_view(self, request, form_url='', extra_context=None):
         if request.method == 'POST':
             files = request.FILES.getlist('arquivo_video_multiple')
@@ -116,11 +125,17 @@ class VideoBaseAdmin(admin.ModelAdmin):
                         video = VideoBase(
                             titulo=final_title,
                             categoria=categoria,
-                            arquivo_video=file
+                            arquivo_video=file,
                         )
                         video.save()
+                        # ffprobe e normalização para 1080x1920/30 fps no worker (core/media_ingest.py)
+                        transaction.on_commit(lambda pk=video.pk: task_ingerir_midia.delay("video", pk))
                     
-                    self.message_user(request, f"{len(files)} vídeos foram adicionados com sucesso à categoria '{categoria.nome}'.")
+                    self.message_user(
+                        request,
+                        f"{len(files)} vídeos foram adicionados com sucesso à categoria '{categoria.nome}'. "
+                        "A normalização segue em segundo plano.",
+                    )
                     return redirect(reverse('admin:core_videobase_changelist'))
                 
                 except CategoriaVideo.DoesNotExist:
@@ -132,7 +147,8 @@ class VideoBaseAdmin(admin.ModelAdmin):
 
 @admin.register(MusicaBase)
 class MusicaBaseAdmin(admin.ModelAdmin):
-    list_display = ('titulo', 'categoria', 'object_key', 'get_musica_url')
+    list_display = ('titulo', 'categoria', 'object_key', 'disponivel', 'normalizado', 'duracao', 'get_musica_url')
+    list_filter = ('disponivel', 'normalizado', 'categoria')
     readonly_fields = ('get_musica_url',)
     actions = [corrigir_object_keys, recalc_urls]
     
@@ -140,6 +156,12 @@ class MusicaBaseAdmin(admin.ModelAdmin):
         return obj.musica_url if hasattr(obj, 'musica_url') else 'N/A'
     get_musica_url.short_description = 'URL da Música'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Arquivo enviado pelo formulário comum: ingestão (e liberação para sorteio) no worker
+        if 'arquivo_musica' in form.changed_data and obj.arquivo_musica:
+            transaction.on_commit(lambda pk=obj.pk: task_ingerir_midia.delay("musica", pk))
+
     def add_view(self, request, form_url='', extra_context=None):
         if request.method == 'POST':
             files = request.FILES.getlist('arquivo_musica_multiple')
@@ -155,11 +177,13 @@ class MusicaBaseAdmin(admin.ModelAdmin):
                     musica = MusicaBase(
                         titulo=final_title,
                         categoria=categoria,
-                        arquivo_musica=file
+                        arquivo_musica=file,
                     )
                     musica.save()  # Isso automaticamente seta o object_key correto
+                    # ffprobe e conversão para AAC (se preciso) no worker
+                    transaction.on_commit(lambda pk=musica.pk: task_ingerir_midia.delay("musica", pk))
                 
-                self.message_user(request, f"{len(files)} músicas foram adicionadas com sucesso.")
+                self.message_user(request, f"{len(files)} músicas foram adicionadas com sucesso. A normalização segue em segundo plano.")
                 return redirect(reverse('admin:core_musicabase_changelist'))
         
         return super().add_view(request, form_url, extra_context)
@@ -176,7 +200,8 @@ class VideoGeradoAdmin(admin.ModelAdmin):
 
 @admin.register(Plano)
 class PlanoAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'preco', 'limite_videos_mensal', 'descricao')
+    list_display = ('nome', 'preco', 'limite_videos_mensal', 'perfil_encoder', 'descricao')
+    list_filter = ('perfil_encoder',)
     search_fields = ('nome',)
 
 @admin.register(Assinatura)
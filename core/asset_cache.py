@@ -0,0 +1,176 @@
+"""
+Cache local (por worker) das mídias da biblioteca no R2: vídeos de fundo e músicas.
+
+A chave é object_key + ETag, então um arquivo substituído no R2 com a mesma chave
+vira outra entrada. O preenchimento é atômico (CacheDisco) e downloads simultâneos
+do mesmo ativo são deduplicados: por thread (Lock) e entre processos do worker
+(flock/msvcrt num arquivo de trava, removido junto com a entrada no descarte LRU).
+O job recebe um hardlink da entrada, que pode apagar no seu `finally` sem afetar o
+cache nem sofrer com um descarte LRU concorrente.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .cache_utils import CacheDisco, hash_conteudo, r2_configurado
+from .utils import download_from_cloudflare, etag_no_r2
+
+logger = logging.getLogger(__name__)
+
+if os.name == "posix":
+    import fcntl
+
+    def _travar_arquivo(f, bloquear=True):
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _destravar_arquivo(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+elif os.name == "nt":
+    import msvcrt
+
+    def _travar_arquivo(f, bloquear=True):
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not bloquear:
+                    return False
+                time.sleep(0.1)
+
+    def _destravar_arquivo(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    # Sem trava entre processos: só a de thread vale (downloads podem se repetir)
+    def _travar_arquivo(f, bloquear=True):
+        return True
+
+    def _destravar_arquivo(f):
+        pass
+
+
+ATIVOS_CACHE_MAX_MB = getattr(settings, "ATIVOS_CACHE_MAX_MB", 8192)
+# Por quanto tempo o ETag de um objeto é reaproveitado sem novo HEAD no R2
+ATIVOS_ETAG_TTL_SEGUNDOS = getattr(settings, "ATIVOS_ETAG_TTL_SEGUNDOS", 300)
+
+_DIRETORIO_ATIVOS = os.path.join(getattr(settings, "CACHE_LOCAL_DIR", os.path.join(settings.BASE_DIR, "cache")), "ativos")
+# Fora do diretório das entradas, para o descarte LRU não apagar travas em uso
+_DIRETORIO_TRAVAS = os.path.join(_DIRETORIO_ATIVOS, "travas")
+os.makedirs(_DIRETORIO_TRAVAS, exist_ok=True)
+
+_lock = threading.Lock()
+_travas_thread = {}
+_etags = {}
+_etags_lock = threading.Lock()
+
+
+def _etag(object_key):
+    agora = time.monotonic()
+    with _etags_lock:
+        em_memoria = _etags.get(object_key)
+    if em_memoria and agora - em_memoria[1] < ATIVOS_ETAG_TTL_SEGUNDOS:
+        return em_memoria[0]
+    etag = etag_no_r2(object_key)
+    if etag:
+        with _etags_lock:
+            _etags[object_key] = (etag, agora)
+    return etag
+
+
+def _caminho_trava(chave):
+    return os.path.join(_DIRETORIO_TRAVAS, f"{chave}.lock")
+
+
+@contextmanager
+def _trava(chave):
+    """Exclusão mútua por chave entre threads e entre processos."""
+    with _lock:
+        trava_thread = _travas_thread.setdefault(chave, threading.Lock())
+    with trava_thread:
+        caminho = _caminho_trava(chave)
+        while True:
+            f = open(caminho, "a+b")
+            _travar_arquivo(f)
+            try:
+                if os.path.samestat(os.fstat(f.fileno()), os.stat(caminho)):
+                    break
+            except FileNotFoundError:
+                pass
+            # O arquivo foi removido por um descarte enquanto esperávamos: trava o novo
+            _destravar_arquivo(f)
+            f.close()
+        try:
+            yield
+        finally:
+            _destravar_arquivo(f)
+            f.close()
+
+
+def _remover_trava(chave):
+    """Descarte LRU de uma entrada: apaga o arquivo de trava dela, se ninguém o estiver usando."""
+    try:
+        with open(_caminho_trava(chave), "r+b") as f:
+            if _travar_arquivo(f, bloquear=False):
+                try:
+                    os.remove(_caminho_trava(chave))
+                finally:
+                    _destravar_arquivo(f)
+    except OSError:
+        pass
+    with _lock:
+        trava_thread = _travas_thread.get(chave)
+        if trava_thread is not None and not trava_thread.locked():
+            del _travas_thread[chave]
+
+
+cache_ativos = CacheDisco(
+    nome="ativos",
+    diretorio=_DIRETORIO_ATIVOS,
+    tamanho_max_bytes=ATIVOS_CACHE_MAX_MB * 1024 * 1024,
+    ao_descartar=_remover_trava,
+)
+
+
+def obter_ativo(object_key, extensao, diretorio=None):
+    """
+    Caminho local descartável do ativo do R2, vindo do cache sempre que possível.
+    Sem R2 configurado (ou sem ETag), cai no download direto. Retorna None se falhar.
+    """
+    if not object_key:
+        return None
+    etag = _etag(object_key) if r2_configurado() else None
+    if not etag:
+        return download_from_cloudflare(object_key, extensao)
+
+    chave = hash_conteudo(object_key, etag)
+    if not cache_ativos.contem_local(chave, extensao):
+        with _trava(chave):
+            # Outro processo pode ter preenchido enquanto esperávamos a trava
+            if not cache_ativos.contem_local(chave, extensao):
+                logger.info(f"Baixando ativo para o cache: {object_key}")
+                caminho_baixado = download_from_cloudflare(object_key, extensao)
+                if not caminho_baixado:
+                    return None
+                cache_ativos.guardar(
+                    chave, extensao, caminho_baixado,
+                    metadados={"object_key": object_key, "etag": etag}, mover=True,
+                )
+
+    caminho_cache = cache_ativos.obter(chave, extensao)
+    if not caminho_cache:
+        # Descartado entre o preenchimento e a leitura (cache muito pequeno)
+        return download_from_cloudflare(object_key, extensao)
+    return cache_ativos.copiar_para_temp(caminho_cache, extensao, diretorio)
@@ -0,0 +1,225 @@
+"""
+Índice de disponibilidade das mídias da biblioteca (VideoBase / MusicaBase).
+
+Em vez de um HEAD no R2 por candidato a cada job, uma reconciliação periódica
+lista os prefixos da biblioteca com `list_objects_v2` (1000 chaves por página) e
+atualiza `disponivel` / `verificado_em` em lote. A escolha de mídia vira uma
+consulta indexada, sem chamadas de rede.
+
+A escolha aleatória não usa `ORDER BY RANDOM()` (que ordena a categoria inteira
+a cada job). Os ids disponíveis de cada categoria ficam num conjunto no Redis
+(o broker do Celery, compartilhado por web e workers), com TTL de
+MIDIA_IDS_TTL_SEGUNDOS. Como o worker recicla o processo a cada job
+(CELERY_WORKER_MAX_TASKS_PER_CHILD=1), um cache em memória estaria sempre frio.
+O sorteio é um SRANDMEMBER, as últimas mídias usadas (também no Redis) ficam de
+fora, e só a escolhida é buscada no banco, pela chave primária. A reconciliação
+apaga os conjuntos, então todos os processos veem o resultado na escolha
+seguinte. Com o Redis fora, a escolha consulta os ids no banco a cada vez.
+"""
+
+import logging
+import random
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import MusicaBase, VideoBase
+from .r2_client import get_r2_client
+from .redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+LOTE_ATUALIZACAO = 500
+
+MIDIA_IDS_TTL_SEGUNDOS = getattr(settings, "MIDIA_IDS_TTL_SEGUNDOS", 60)
+# Quantas mídias usadas por último (por categoria) ficam fora do sorteio
+MIDIA_RECENTES_EVITADAS = getattr(settings, "MIDIA_RECENTES_EVITADAS", 5)
+# Prefixo das chaves no Redis: <prefixo>:ids:<modelo>:<categoria> e <prefixo>:recentes:...
+MIDIA_REDIS_PREFIXO = getattr(settings, "MIDIA_REDIS_PREFIXO", "midia")
+MIDIA_RECENTES_TTL_SEGUNDOS = 24 * 60 * 60
+
+
+def _prefixo(object_key):
+    """
+    'media/videos_base/cat/x.mp4' -> 'media/videos_base/'. Chaves com menos de
+    três segmentos ('x.mp4', 'media/x.mp4') são listadas pela própria chave,
+    nunca pelo bucket inteiro.
+    """
+    partes = object_key.split("/")
+    return "/".join(partes[:2]) + "/" if len(partes) > 2 else object_key
+
+
+def _sem_redundantes(prefixos):
+    """Remove os prefixos já cobertos por outro menor (cada chave listada uma vez só)."""
+    resultado = []
+    for prefixo in sorted(set(prefixos)):
+        if not resultado or not prefixo.startswith(resultado[-1]):
+            resultado.append(prefixo)
+    return resultado
+
+
+def listar_chaves_r2(prefixos):
+    """Conjunto das chaves existentes no bucket sob os prefixos dados."""
+    paginador = get_r2_client().get_paginator("list_objects_v2")
+    chaves = set()
+    for prefixo in prefixos:
+        for pagina in paginador.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefixo):
+            chaves.update(obj["Key"] for obj in pagina.get("Contents", []))
+    return chaves
+
+
+def _atualizar_em_lotes(model, ids, **campos):
+    ids = list(ids)
+    for inicio in range(0, len(ids), LOTE_ATUALIZACAO):
+        model.objects.filter(id__in=ids[inicio:inicio + LOTE_ATUALIZACAO]).update(**campos)
+
+
+def reconciliar_disponibilidade(models=(VideoBase, MusicaBase)):
+    """
+    Marca cada mídia como disponível ou não conforme a listagem do R2.
+    Retorna {NomeDoModelo: {"disponiveis": n, "faltantes": [(id, object_key, titulo), ...]}}.
+    Se a listagem falhar, nada é alterado (a exceção sobe).
+    """
+    agora = timezone.now()
+    resumo = {}
+    for model in models:
+        midias = list(
+            model.objects.exclude(object_key__isnull=True)
+            .exclude(object_key__exact="")
+            .values_list("id", "object_key", "titulo", "disponivel")
+        )
+        existentes = listar_chaves_r2(_sem_redundantes(_prefixo(object_key) for _, object_key, _, _ in midias))
+
+        disponiveis = [id_ for id_, object_key, _, _ in midias if object_key in existentes]
+        faltantes = [(id_, object_key, titulo) for id_, object_key, titulo, _ in midias if object_key not in existentes]
+        _atualizar_em_lotes(model, disponiveis, disponivel=True, verificado_em=agora)
+        _atualizar_em_lotes(model, [f[0] for f in faltantes], disponivel=False, verificado_em=agora)
+        # Sem object_key não há o que servir
+        model.objects.filter(object_key__isnull=True).update(disponivel=False, verificado_em=agora)
+        model.objects.filter(object_key__exact="").update(disponivel=False, verificado_em=agora)
+
+        mudaram = sum(1 for id_, object_key, _, estava in midias if estava != (object_key in existentes))
+        logger.info(
+            f"Disponibilidade de {model.__name__}: {len(disponiveis)} no R2, "
+            f"{len(faltantes)} faltando, {mudaram} mudaram de estado."
+        )
+        resumo[model.__name__] = {"disponiveis": len(disponiveis), "faltantes": faltantes}
+    invalidar_ids()
+    return resumo
+
+
+# --- Escolha aleatória -----------------------------------------------------------
+
+def _chave_ids(model, categoria_id):
+    return f"{MIDIA_REDIS_PREFIXO}:ids:{model._meta.label}:{categoria_id}"
+
+
+def _chave_recentes(model, categoria_id):
+    return f"{MIDIA_REDIS_PREFIXO}:recentes:{model._meta.label}:{categoria_id}"
+
+
+def _consultar_ids(model, categoria_id):
+    return list(
+        model.objects.filter(categoria_id=categoria_id, disponivel=True)
+        .exclude(object_key__isnull=True)
+        .exclude(object_key__exact="")
+        .values_list("id", flat=True)
+    )
+
+
+def invalidar_ids(model=None, categoria_id=None):
+    """Apaga os ids guardados no Redis (todos, de um modelo ou de uma categoria)."""
+    try:
+        cliente = get_redis_client()
+        if model is not None and categoria_id is not None:
+            cliente.delete(_chave_ids(model, categoria_id))
+            return
+        padrao = f"{MIDIA_REDIS_PREFIXO}:ids:{model._meta.label if model is not None else '*'}:*"
+        chaves = list(cliente.scan_iter(match=padrao, count=500))
+        if chaves:
+            cliente.delete(*chaves)
+    except Exception as e:
+        logger.warning(f"Ids de mídia não invalidados no Redis ({e}); valem até o TTL.")
+
+
+def _carregar_ids(cliente, model, categoria_id):
+    """Consulta os ids no banco e grava o conjunto da categoria no Redis (com TTL)."""
+    ids = _consultar_ids(model, categoria_id)
+    if ids:
+        chave = _chave_ids(model, categoria_id)
+        pipe = cliente.pipeline()
+        pipe.delete(chave)
+        pipe.sadd(chave, *ids)
+        pipe.expire(chave, MIDIA_IDS_TTL_SEGUNDOS)
+        pipe.execute()
+    return ids
+
+
+def ids_disponiveis(model, categoria_id):
+    """Ids das mídias disponíveis da categoria (do Redis; do banco se não estiverem lá)."""
+    cliente = get_redis_client()
+    ids = cliente.smembers(_chave_ids(model, categoria_id))
+    if ids:
+        return sorted(int(id_) for id_ in ids)
+    return sorted(_carregar_ids(cliente, model, categoria_id))
+
+
+def _sortear(cliente, model, categoria_id):
+    """
+    Id sorteado do conjunto da categoria, fora das últimas MIDIA_RECENTES_EVITADAS
+    escolhas (se houver ids suficientes), ou None se a categoria está vazia.
+    Uma ida ao Redis para sortear e outra para registrar a escolha.
+    """
+    chave_recentes = _chave_recentes(model, categoria_id)
+    pipe = cliente.pipeline(transaction=False)
+    # N + 1 ids distintos: pelo menos um fica fora dos N recentes
+    pipe.srandmember(_chave_ids(model, categoria_id), MIDIA_RECENTES_EVITADAS + 1)
+    pipe.lrange(chave_recentes, 0, MIDIA_RECENTES_EVITADAS - 1)
+    candidatos, recentes = pipe.execute()
+    candidatos = [int(id_) for id_ in candidatos]
+    if not candidatos:
+        ids = _carregar_ids(cliente, model, categoria_id)
+        if not ids:
+            return None
+        candidatos = random.sample(ids, min(len(ids), MIDIA_RECENTES_EVITADAS + 1))
+
+    evitar = {int(id_) for id_ in recentes} if MIDIA_RECENTES_EVITADAS > 0 else set()
+    escolhido = next((id_ for id_ in candidatos if id_ not in evitar), candidatos[0])
+    if MIDIA_RECENTES_EVITADAS > 0:
+        pipe = cliente.pipeline(transaction=False)
+        pipe.lpush(chave_recentes, escolhido)
+        pipe.ltrim(chave_recentes, 0, MIDIA_RECENTES_EVITADAS - 1)
+        pipe.expire(chave_recentes, MIDIA_RECENTES_TTL_SEGUNDOS)
+        pipe.execute()
+    return escolhido
+
+
+def _escolher_sem_redis(model, categoria_id):
+    ids = _consultar_ids(model, categoria_id)
+    return model.objects.filter(id=random.choice(ids)).first() if ids else None
+
+
+def escolher_midia(model, categoria, tentativas=3):
+    """
+    Uma mídia disponível aleatória da categoria, evitando as usadas por último,
+    ou None. Só a escolhida é buscada no banco (pela chave primária).
+    """
+    categoria_id = getattr(categoria, "pk", categoria)
+    for _ in range(tentativas):
+        try:
+            cliente = get_redis_client()
+            escolhido = _sortear(cliente, model, categoria_id)
+        except Exception as e:
+            logger.warning(f"Redis indisponível para a escolha de mídia ({e}); consultando o banco.")
+            return _escolher_sem_redis(model, categoria_id)
+        if escolhido is None:
+            return None
+        midia = model.objects.filter(id=escolhido, disponivel=True).first()
+        if midia is not None:
+            return midia
+        # Apagada ou marcada indisponível depois do cache: sai do conjunto
+        try:
+            cliente.srem(_chave_ids(model, categoria_id), escolhido)
+        except Exception as e:
+            logger.warning(f"Id {escolhido} não removido do Redis ({e}).")
+    return None
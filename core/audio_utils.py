@@ -0,0 +1,87 @@
+"""
+Extração de áudio para o Whisper/VAD: PCM float32 mono em 16 kHz.
+
+O caminho principal lê o `s16le` direto da saída do ffmpeg para a memória, sem
+arquivo intermediário. A extração para WAV em disco continua disponível como
+fallback (e para quem precisa de um arquivo).
+"""
+
+import logging
+import os
+import subprocess
+import uuid
+import wave
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+def extrair_audio_pcm(video_path, timeout=600):
+    """
+    Extrai o áudio do vídeo como um array float32 mono em 16 kHz,
+    formato aceito diretamente pelo faster-whisper.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", video_path,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE), "-ac", "1", "pipe:1",
+    ]
+    resultado = subprocess.run(
+        cmd, check=True, capture_output=True, stdin=subprocess.DEVNULL, timeout=timeout
+    )
+    return np.frombuffer(resultado.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def extract_audio_from_video(video_path):
+    """
+    Extrai o áudio de um arquivo de vídeo usando ffmpeg.
+    Retorna o caminho para o arquivo de áudio temporário (nome único por chamada).
+    """
+    audio_temp_dir = os.path.join(settings.MEDIA_ROOT, "audio_temp")
+    os.makedirs(audio_temp_dir, exist_ok=True)
+    audio_path = os.path.join(audio_temp_dir, f"{uuid.uuid4().hex}.wav")
+
+    cmd = [
+        "ffmpeg", "-i", video_path, "-vn", "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE), "-ac", "1", "-y", audio_path
+    ]
+
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True, encoding='utf-8', stdin=subprocess.DEVNULL)
+        return audio_path
+    except subprocess.CalledProcessError as e:
+        print(f"Erro ao extrair áudio: {e.stderr}")
+        raise
+
+
+def obter_audio_para_transcricao(video_path):
+    """
+    Retorna (audio, caminho_temporario). Tenta a extração em memória; se falhar,
+    extrai para WAV e devolve o caminho, que o chamador deve apagar.
+    """
+    try:
+        return extrair_audio_pcm(video_path), None
+    except (subprocess.SubprocessError, OSError, MemoryError) as e:
+        logger.warning(f"Extração de áudio em memória falhou ({e}). Usando arquivo temporário.")
+        caminho = extract_audio_from_video(video_path)
+        return caminho, caminho
+
+
+def carregar_audio(audio):
+    """Aceita um array PCM (devolvido como está) ou um arquivo, lido como float32 mono 16 kHz."""
+    if not isinstance(audio, str):
+        return audio
+    try:
+        from faster_whisper.audio import decode_audio
+        return decode_audio(audio, sampling_rate=SAMPLE_RATE)
+    except ImportError:
+        # Sem faster-whisper: aceita o WAV pcm_s16le mono 16 kHz que nós mesmos extraímos
+        with wave.open(audio, "rb") as wav:
+            if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError(f"WAV fora do formato esperado (16 kHz, mono, 16 bits): {audio}")
+            dados = wav.readframes(wav.getnframes())
+        return np.frombuffer(dados, dtype=np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,234 @@
+"""
+Cache em disco endereçado por conteúdo, com descarte LRU e camada opcional no R2.
+
+Cada entrada é um arquivo `<chave><extensao>` (mais um `<chave>.json` opcional com
+metadados). O mtime do arquivo é atualizado a cada acerto e serve como relógio do LRU.
+As gravações são atômicas (arquivo temporário + os.replace), então leitores
+concorrentes nunca enxergam um arquivo pela metade.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def hash_conteudo(*partes):
+    """Gera uma chave sha256 estável a partir de strings/bytes."""
+    h = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, str):
+            parte = parte.encode("utf-8")
+        h.update(parte)
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class CacheDisco:
+    """Cache LRU em disco limitado por tamanho, com camada opcional no R2."""
+
+    def __init__(self, nome, diretorio, tamanho_max_bytes, prefixo_r2=None, ao_descartar=None):
+        self.nome = nome
+        self.diretorio = diretorio
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.prefixo_r2 = prefixo_r2
+        # Chamado com a chave de cada entrada removida pelo descarte LRU
+        self.ao_descartar = ao_descartar
+        self._lock = threading.Lock()
+        self._metricas = {"acertos": 0, "acertos_r2": 0, "falhas": 0, "descartes": 0}
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    # --- Métricas ---------------------------------------------------------
+
+    def _contar(self, chave_metrica):
+        with self._lock:
+            self._metricas[chave_metrica] += 1
+
+    def metricas(self):
+        with self._lock:
+            return dict(self._metricas)
+
+    # --- Caminhos ---------------------------------------------------------
+
+    def caminho(self, chave, extensao):
+        return os.path.join(self.diretorio, f"{chave}{extensao}")
+
+    def _caminho_metadados(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _object_key_r2(self, nome_arquivo):
+        return f"{self.prefixo_r2.rstrip('/')}/{nome_arquivo}"
+
+    # --- Leitura ----------------------------------------------------------
+
+    def obter(self, chave, extensao):
+        """Retorna o caminho local da entrada (buscando no R2 se preciso) ou None."""
+        caminho = self.caminho(chave, extensao)
+        if os.path.exists(caminho):
+            try:
+                os.utime(caminho)
+            except OSError:
+                pass
+            self._contar("acertos")
+            logger.info(f"[cache:{self.nome}] acerto {chave[:12]}")
+            return caminho
+
+        if self.prefixo_r2 and self._baixar_do_r2(chave, extensao):
+            self._contar("acertos_r2")
+            logger.info(f"[cache:{self.nome}] acerto no R2 {chave[:12]}")
+            return caminho
+
+        self._contar("falhas")
+        logger.info(f"[cache:{self.nome}] falha {chave[:12]}")
+        return None
+
+    def obter_metadados(self, chave):
+        try:
+            with open(self._caminho_metadados(chave), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def contem_local(self, chave, extensao):
+        """Verifica só o disco local (sem ir ao R2 nem contar nas métricas)."""
+        return os.path.exists(self.caminho(chave, extensao))
+
+    def copiar_para_temp(self, caminho_cache, extensao, diretorio=None):
+        """
+        Entrega uma cópia descartável da entrada (hardlink quando possível),
+        para que o chamador possa apagá-la no seu bloco `finally` sem afetar o cache
+        (e para que um descarte LRU concorrente não apague o arquivo em uso).
+        """
+        with tempfile.NamedTemporaryFile(delete=False, suffix=extensao, dir=diretorio) as temp_f:
+            caminho_temp = temp_f.name
+        os.remove(caminho_temp)
+        try:
+            os.link(caminho_cache, caminho_temp)
+        except OSError:
+            shutil.copyfile(caminho_cache, caminho_temp)
+        return caminho_temp
+
+    # --- Escrita ----------------------------------------------------------
+
+    def _substituir_atomicamente(self, destino, escrever):
+        fd, caminho_temp = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                escrever(f)
+            os.replace(caminho_temp, destino)
+        except Exception:
+            if os.path.exists(caminho_temp):
+                os.remove(caminho_temp)
+            raise
+
+    def guardar(self, chave, extensao, caminho_origem, metadados=None, mover=False):
+        """
+        Copia o arquivo para o cache (e para o R2, se habilitado) e retorna o caminho.
+        Com `mover`, a origem é movida (rename atômico no mesmo sistema de arquivos).
+        """
+        destino = self.caminho(chave, extensao)
+
+        def copiar(f):
+            with open(caminho_origem, "rb") as origem:
+                shutil.copyfileobj(origem, f, length=1024 * 1024)
+
+        if mover:
+            try:
+                os.replace(caminho_origem, destino)
+            except OSError:
+                # Outro sistema de arquivos: copia atomicamente e remove a origem
+                self._substituir_atomicamente(destino, copiar)
+                os.remove(caminho_origem)
+        else:
+            self._substituir_atomicamente(destino, copiar)
+        if metadados is not None:
+            conteudo = json.dumps(metadados).encode("utf-8")
+            self._substituir_atomicamente(self._caminho_metadados(chave), lambda f: f.write(conteudo))
+
+        if self.prefixo_r2:
+            self._enviar_para_r2(chave, extensao, metadados is not None)
+
+        self._descartar_excedente()
+        return destino
+
+    def _descartar_excedente(self):
+        """Remove as entradas menos usadas até o cache caber em tamanho_max_bytes."""
+        entradas = []
+        total = 0
+        with os.scandir(self.diretorio) as it:
+            for entrada in it:
+                if not entrada.is_file() or entrada.name.endswith((".json", ".tmp")):
+                    continue
+                info = entrada.stat()
+                entradas.append((info.st_mtime, info.st_size, entrada.path))
+                total += info.st_size
+
+        if total <= self.tamanho_max_bytes:
+            return
+
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.tamanho_max_bytes:
+                break
+            try:
+                os.remove(caminho)
+                chave = os.path.splitext(os.path.basename(caminho))[0]
+                caminho_meta = self._caminho_metadados(chave)
+                if os.path.exists(caminho_meta):
+                    os.remove(caminho_meta)
+                total -= tamanho
+                self._contar("descartes")
+                if self.ao_descartar:
+                    self.ao_descartar(chave)
+            except OSError as err:
+                logger.warning(f"[cache:{self.nome}] erro ao descartar {caminho}: {err}")
+
+    # --- Camada R2 --------------------------------------------------------
+
+    def _instalar_download(self, caminho_temp, destino):
+        """Move um download para o cache sem nunca expor um arquivo pela metade."""
+        try:
+            if os.path.dirname(os.path.abspath(caminho_temp)) == os.path.abspath(self.diretorio):
+                os.replace(caminho_temp, destino)
+                return
+
+            def copiar(f):
+                with open(caminho_temp, "rb") as origem:
+                    shutil.copyfileobj(origem, f, length=1024 * 1024)
+
+            self._substituir_atomicamente(destino, copiar)
+        finally:
+            if os.path.exists(caminho_temp):
+                os.remove(caminho_temp)
+
+    def _baixar_do_r2(self, chave, extensao):
+        from .utils import download_from_cloudflare
+
+        caminho_temp = download_from_cloudflare(self._object_key_r2(f"{chave}{extensao}"), extensao)
+        if not caminho_temp:
+            return False
+        # Metadados primeiro: quem vê a entrada já encontra o .json completo
+        caminho_meta_temp = download_from_cloudflare(self._object_key_r2(f"{chave}.json"), ".json")
+        if caminho_meta_temp:
+            self._instalar_download(caminho_meta_temp, self._caminho_metadados(chave))
+        self._instalar_download(caminho_temp, self.caminho(chave, extensao))
+        return True
+
+    def _enviar_para_r2(self, chave, extensao, com_metadados):
+        from .utils import upload_to_r2
+
+        if not upload_to_r2(self.caminho(chave, extensao), self._object_key_r2(f"{chave}{extensao}")):
+            logger.warning(f"[cache:{self.nome}] falha ao enviar {chave[:12]} para o R2")
+            return
+        if com_metadados:
+            upload_to_r2(self._caminho_metadados(chave), self._object_key_r2(f"{chave}.json"))
+
+
+def r2_configurado():
+    return bool(getattr(settings, "AWS_ACCESS_KEY_ID", None))
@@ -0,0 +1,72 @@
+"""
+Perfis de codificação (libx264, sem depender de GPU) usados por todo o pipeline.
+
+Os perfis finais ("rascunho", "padrao", "premium") são escolhidos por plano
+(`Plano.perfil_encoder`) ou por job (`data["perfil_encoder"]`). Os perfis
+intermediários valem para arquivos que ainda serão recodificados (fundo
+pré-renderizado, clipes normalizados do cache, segmentos de corte) e para a
+normalização dos vídeos da biblioteca no upload.
+
+Para comparar tempo, CPU, tamanho e qualidade dos perfis:
+`manage.py benchmark_encoders`.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class PerfilEncoder:
+    nome: str
+    rotulo: str
+    preset: str
+    crf: Optional[int] = None  # None = padrão do libx264 (23)
+    audio_kbps: int = 128
+
+    def args_video(self, fps=None):
+        args = ["-c:v", "libx264", "-preset", self.preset]
+        if self.crf is not None:
+            args += ["-crf", str(self.crf)]
+        if fps:
+            args += ["-r", str(fps)]
+        return args + ["-pix_fmt", "yuv420p"]
+
+    def args_audio(self):
+        return ["-c:a", "aac", "-b:a", f"{self.audio_kbps}k"]
+
+    def args(self, fps=None, com_audio=True):
+        return self.args_video(fps) + (self.args_audio() if com_audio else [])
+
+
+# Perfis do vídeo entregue ao usuário ("padrao" reproduz os parâmetros antigos)
+PERFIS = {
+    "rascunho": PerfilEncoder("rascunho", "Rascunho (mais rápido)", preset="veryfast", crf=30, audio_kbps=96),
+    "padrao": PerfilEncoder("padrao", "Padrão", preset="fast", crf=28, audio_kbps=128),
+    "premium": PerfilEncoder("premium", "Premium (melhor qualidade)", preset="slow", crf=22, audio_kbps=160),
+}
+
+# Perfis de arquivos intermediários (recodificados depois pelo perfil final)
+PERFIL_FUNDO = PerfilEncoder("fundo", "Fundo pré-renderizado", preset="ultrafast")
+PERFIL_CLIPE_CACHE = PerfilEncoder("clipe_cache", "Clipe normalizado do cache", preset="veryfast", crf=20)
+PERFIL_SEGMENTO_CORTE = PerfilEncoder("segmento_corte", "Segmento de corte", preset="fast", crf=23)
+# Vídeos da biblioteca, normalizados uma vez no upload (podem ir ao vídeo final sem recodificar)
+PERFIL_BIBLIOTECA = PerfilEncoder("biblioteca", "Vídeo da biblioteca", preset="medium", crf=23)
+
+PERFIL_CHOICES = [(perfil.nome, perfil.rotulo) for perfil in PERFIS.values()]
+
+ENCODER_PERFIL_PADRAO = getattr(settings, "ENCODER_PERFIL_PADRAO", "padrao")
+
+
+def obter_perfil(nome=None):
+    """Perfil final pelo nome; nomes desconhecidos caem no ENCODER_PERFIL_PADRAO."""
+    return PERFIS.get(nome) or PERFIS.get(ENCODER_PERFIL_PADRAO) or PERFIS["padrao"]
+
+
+def perfil_do_job(data=None, assinatura=None):
+    """Override do job > perfil do plano da assinatura > ENCODER_PERFIL_PADRAO."""
+    nome = (data or {}).get("perfil_encoder")
+    if nome not in PERFIS and assinatura is not None:
+        nome = getattr(assinatura.plano, "perfil_encoder", None)
+    return obter_perfil(nome)
@@ -1,9 +1,10 @@
 from django.http import JsonResponse
 from django.db import connection
 from django.conf import settings
-import boto3
 from botocore.exceptions import ClientError
 
+from .r2_client import get_r2_client
+
 
 def health_check(request):
     """
@@ -23,13 +24,7 @@ def health_check(request):
     # Check Cloudflare R2 connection
     try:
         if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
-            s3_client = boto3.client(
-                "s3",
-                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME,
-            )
+            s3_client = get_r2_client()
             s3_client.head_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
             health_status["checks"]["cloudflare_r2"] = "ok"
         else:
@@ -0,0 +1,201 @@
+"""
+Cliente HTTP compartilhado para as APIs externas (Pollinations, Pexels, URLs do R2).
+
+- Uma `requests.Session` por host (e por processo), com pool de conexões keep-alive.
+- Retentativas com backoff exponencial para erros de conexão e 429/5xx
+  (respeitando o Retry-After), só em métodos idempotentes e dentro de um prazo
+  total por chamada (HTTP_PRAZO_SEGUNDOS).
+- Timeout padrão sempre aplicado.
+- Concorrência limitada por host (BoundedSemaphore), para os pools de cenas em
+  paralelo não estourarem o rate limit das APIs.
+- Métricas de latência por endpoint (host + primeiro segmento do caminho).
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT_PADRAO = getattr(settings, "HTTP_TIMEOUT_PADRAO", (5, 30))  # (conexão, leitura)
+HTTP_TENTATIVAS = getattr(settings, "HTTP_TENTATIVAS", 3)
+HTTP_BACKOFF = getattr(settings, "HTTP_BACKOFF", 0.5)
+HTTP_CONEXOES_POR_HOST = getattr(settings, "HTTP_CONEXOES_POR_HOST", 8)
+# Tempo total de uma chamada, retentativas incluídas. Fica abaixo do limite de cada
+# cena (CENAS_TIMEOUT_SEGUNDOS = 90) para a cena falhar antes de ser descartada
+HTTP_PRAZO_SEGUNDOS = getattr(settings, "HTTP_PRAZO_SEGUNDOS", 75)
+# Requisições simultâneas por host; hosts fora da lista usam HTTP_CONEXOES_POR_HOST
+HTTP_CONCORRENCIA_POR_HOST = getattr(settings, "HTTP_CONCORRENCIA_POR_HOST", {
+    "gen.pollinations.ai": 4,
+    "api.pexels.com": 4,
+})
+
+_lock = threading.Lock()
+_sessoes = {}
+_semaforos = {}
+_metricas = {}
+# Prazo da chamada em andamento nesta thread (lido pelas retentativas)
+_prazo = threading.local()
+
+
+class _RetryComPrazo(Retry):
+    """Retry que não começa uma nova tentativa se ela puder terminar depois do prazo da chamada."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        proximo = super().increment(method, url, response, error, _pool, _stacktrace)
+        limite = getattr(_prazo, "limite", None)
+        if limite is not None:
+            espera = (response is not None and proximo.get_retry_after(response)) or proximo.get_backoff_time()
+            if time.monotonic() + espera + _prazo.duracao_tentativa > limite:
+                # Com raise_on_status=False, o urllib3 devolve a última resposta em vez do erro
+                raise MaxRetryError(_pool, url, error or ResponseError("prazo total da chamada esgotado"))
+        return proximo
+
+
+@contextmanager
+def _dentro_do_prazo(timeout, prazo):
+    """Registra o prazo da chamada para `_RetryComPrazo` (timeout: número ou (conexão, leitura))."""
+    _prazo.limite = time.monotonic() + (prazo or HTTP_PRAZO_SEGUNDOS)
+    _prazo.duracao_tentativa = sum(timeout) if isinstance(timeout, tuple) else (timeout or 0)
+    try:
+        yield
+    finally:
+        _prazo.limite = None
+
+
+def _host(url):
+    return urlsplit(url).hostname or ""
+
+
+def _endpoint(url):
+    partes = urlsplit(url)
+    segmento = partes.path.strip("/").split("/", 1)[0]
+    return f"{partes.hostname}/{segmento}" if segmento else (partes.hostname or "")
+
+
+def obter_sessao(host):
+    """Sessão com pool e retentativas para o host. Recriada após fork (chave inclui o PID)."""
+    chave = (os.getpid(), host)
+    sessao = _sessoes.get(chave)
+    if sessao is not None:
+        return sessao
+    with _lock:
+        sessao = _sessoes.get(chave)
+        if sessao is None:
+            retry = _RetryComPrazo(
+                total=HTTP_TENTATIVAS,
+                connect=HTTP_TENTATIVAS,
+                read=HTTP_TENTATIVAS,
+                status=HTTP_TENTATIVAS,
+                backoff_factor=HTTP_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                # POST não é idempotente (ex.: o LLM do roteiro cobraria/geraria de novo)
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adaptador = HTTPAdapter(
+                pool_connections=1, pool_maxsize=HTTP_CONEXOES_POR_HOST, max_retries=retry
+            )
+            sessao = requests.Session()
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            _sessoes[chave] = sessao
+    return sessao
+
+
+def _semaforo(host):
+    with _lock:
+        semaforo = _semaforos.get(host)
+        if semaforo is None:
+            limite = HTTP_CONCORRENCIA_POR_HOST.get(host, HTTP_CONEXOES_POR_HOST)
+            semaforo = _semaforos[host] = threading.BoundedSemaphore(limite)
+        return semaforo
+
+
+def _registrar(endpoint, duracao, erro):
+    with _lock:
+        dados = _metricas.setdefault(endpoint, {"chamadas": 0, "erros": 0, "tempo_total": 0.0, "tempo_max": 0.0})
+        dados["chamadas"] += 1
+        dados["erros"] += int(erro)
+        dados["tempo_total"] += duracao
+        dados["tempo_max"] = max(dados["tempo_max"], duracao)
+
+
+def metricas_http():
+    """{endpoint: {chamadas, erros, tempo_medio, tempo_max}} deste processo."""
+    with _lock:
+        return {
+            endpoint: {
+                "chamadas": dados["chamadas"],
+                "erros": dados["erros"],
+                "tempo_medio": round(dados["tempo_total"] / dados["chamadas"], 3) if dados["chamadas"] else 0.0,
+                "tempo_max": round(dados["tempo_max"], 3),
+            }
+            for endpoint, dados in _metricas.items()
+        }
+
+
+@contextmanager
+def _medir(url):
+    host = _host(url)
+    endpoint = _endpoint(url)
+    inicio = time.perf_counter()
+    estado = {"erro": False}
+    with _semaforo(host):
+        try:
+            yield obter_sessao(host), estado
+        except Exception:
+            estado["erro"] = True
+            raise
+        finally:
+            _registrar(endpoint, time.perf_counter() - inicio, estado["erro"])
+
+
+def requisitar(metodo, url, prazo=None, **kwargs):
+    """
+    Como `requests.request`, mas pela sessão do host, com timeout padrão e métricas.
+    `prazo` limita o tempo total com as retentativas (padrão HTTP_PRAZO_SEGUNDOS).
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT_PADRAO)
+    with _medir(url) as (sessao, estado), _dentro_do_prazo(kwargs["timeout"], prazo):
+        resposta = sessao.request(metodo, url, **kwargs)
+        estado["erro"] = resposta.status_code >= 500 or resposta.status_code == 429
+        return resposta
+
+
+def get(url, **kwargs):
+    return requisitar("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return requisitar("POST", url, **kwargs)
+
+
+def baixar_para_arquivo(url, destino, tamanho_bloco=1024 * 1024, cancelado=None, prazo=None, **kwargs):
+    """
+    Baixa `url` para `destino` em blocos, sem carregar o corpo na memória.
+    O limite de concorrência do host vale até o fim do download.
+    Se o evento `cancelado` for ligado, para entre dois blocos e retorna None.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT_PADRAO)
+    with _medir(url) as (sessao, _):
+        with _dentro_do_prazo(kwargs["timeout"], prazo):
+            resposta = sessao.get(url, stream=True, **kwargs)
+        with resposta:
+            resposta.raise_for_status()
+            with open(destino, "wb") as f:
+                for bloco in resposta.iter_content(chunk_size=tamanho_bloco):
+                    if cancelado is not None and cancelado.is_set():
+                        return None
+                    f.write(bloco)
+    return destino
@@ -0,0 +1,10 @@
+"""Medições compartilhadas pelos comandos de benchmark (benchmark_encoders, benchmark_ken_burns)."""
+
+import resource
+
+
+def tempo_cpu():
+    """CPU (usuário + sistema) deste processo e dos filhos (ffmpeg)."""
+    proprio = resource.getrusage(resource.RUSAGE_SELF)
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return proprio.ru_utime + proprio.ru_stime + filhos.ru_utime + filhos.ru_stime
@@ -0,0 +1,144 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.encoder_profiles import PERFIS
+from core.ken_burns import ALTURA, FPS, LARGURA
+from core.management.benchmark_utils import tempo_cpu
+from core.render_plan import Cena, PlanoRender
+
+# Referência sem perda: a qualidade de cada perfil é medida contra ela
+ARGS_REFERENCIA = [
+    "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", "-r", str(FPS), "-pix_fmt", "yuv420p",
+    "-c:a", "aac", "-b:a", "192k",
+]
+
+
+def _ffmpeg(*args):
+    subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", *args],
+        check=True, capture_output=True, stdin=subprocess.DEVNULL,
+    )
+
+
+def _midias_sinteticas(pasta, duracao):
+    """Imagem, clipe com movimento e áudio gerados pelo próprio ffmpeg (sempre os mesmos)."""
+    midias = {
+        "imagem": os.path.join(pasta, "imagem.jpg"),
+        "clipe": os.path.join(pasta, "clipe.mp4"),
+        "narracao": os.path.join(pasta, "narracao.wav"),
+        "musica": os.path.join(pasta, "musica.wav"),
+    }
+    _ffmpeg("-f", "lavfi", "-i", f"testsrc2=size={LARGURA}x{ALTURA},noise=alls=20:allf=u",
+            "-frames:v", "1", "-q:v", "2", midias["imagem"])
+    _ffmpeg("-f", "lavfi", "-i", f"mandelbrot=size=720x1280:rate={FPS}", "-t", str(duracao),
+            "-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", "-pix_fmt", "yuv420p", midias["clipe"])
+    _ffmpeg("-f", "lavfi", "-i", "sine=frequency=220:beep_factor=4", "-t", str(duracao), midias["narracao"])
+    _ffmpeg("-f", "lavfi", "-i", "anoisesrc=color=pink:amplitude=0.3", "-t", str(duracao), midias["musica"])
+    return midias
+
+
+def _jobs(midias, duracao):
+    """Jobs de exemplo fixos, um por tipo de fundo do gerador."""
+    def ia_imagens():
+        plano = PlanoRender()
+        plano.fundo_de_cenas([Cena("imagem", midias["imagem"], duracao / 3) for _ in range(3)])
+        plano.marca_dagua()
+        plano.definir_audio(midias["musica"], midias["narracao"], 0.2)
+        return plano
+
+    def clipes_pexels():
+        plano = PlanoRender()
+        plano.fundo_de_cenas([Cena("video", midias["clipe"], duracao / 2) for _ in range(2)])
+        plano.definir_audio(midias["musica"], None, 0.5)
+        return plano
+
+    def video_biblioteca():
+        plano = PlanoRender()
+        plano.fundo_de_video(midias["clipe"], loop=True)
+        plano.marca_dagua()
+        plano.definir_audio(midias["musica"], midias["narracao"], 0.2)
+        return plano
+
+    return {"ia_imagens": ia_imagens, "clipes_pexels": clipes_pexels, "video_biblioteca": video_biblioteca}
+
+
+def _tem_vmaf():
+    resultado = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True, stdin=subprocess.DEVNULL,
+    )
+    return "libvmaf" in resultado.stdout
+
+
+def _comparar(caminho, referencia, filtro, padrao):
+    resultado = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", caminho, "-i", referencia, "-lavfi", filtro, "-f", "null", "-"],
+        capture_output=True, text=True, stdin=subprocess.DEVNULL,
+    )
+    encontrado = re.search(padrao, resultado.stderr)
+    return float(encontrado.group(1)) if encontrado else None
+
+
+class Command(BaseCommand):
+    help = 'Renderiza jobs de exemplo em cada perfil de codificação e compara tempo, CPU, tamanho e qualidade.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfis', nargs='+', choices=list(PERFIS), default=list(PERFIS),
+                            help='Perfis comparados (padrão: todos).')
+        parser.add_argument('--duracao', type=float, default=9.0, help='Duração de cada job em segundos.')
+        parser.add_argument('--sem-vmaf', action='store_true', help='Mede só SSIM, mesmo com libvmaf disponível.')
+
+    def handle(self, *args, **options):
+        duracao = options['duracao']
+        usar_vmaf = not options['sem_vmaf'] and _tem_vmaf()
+        pasta = tempfile.mkdtemp(prefix="bench_enc_")
+        try:
+            midias = _midias_sinteticas(pasta, duracao)
+            self.stdout.write(
+                f"\n{duracao:.0f}s por job, qualidade contra referência sem perda (qp 0)"
+                f"{'' if usar_vmaf else ' — VMAF indisponível, só SSIM'}\n"
+            )
+            self.stdout.write(
+                f"{'job':<17} {'perfil':<9} {'tempo (s)':>10} {'CPU (s)':>8} {'x tempo real':>13} "
+                f"{'tamanho (KB)':>13} {'kbps':>7} {'SSIM':>7} {'VMAF':>6}"
+            )
+            totais = {perfil: {"tempo": 0.0, "cpu": 0.0, "bytes": 0} for perfil in options['perfis']}
+
+            for nome_job, montar in _jobs(midias, duracao).items():
+                referencia = os.path.join(pasta, f"{nome_job}_referencia.mp4")
+                montar().executar(referencia, duracao, ARGS_REFERENCIA)
+
+                for nome_perfil in options['perfis']:
+                    saida = os.path.join(pasta, f"{nome_job}_{nome_perfil}.mp4")
+                    cpu_inicio, relogio_inicio = tempo_cpu(), time.perf_counter()
+                    montar().executar(saida, duracao, PERFIS[nome_perfil].args(FPS))
+                    tempo = time.perf_counter() - relogio_inicio
+                    cpu = tempo_cpu() - cpu_inicio
+                    tamanho = os.path.getsize(saida)
+
+                    ssim = _comparar(saida, referencia, "ssim", r"All:([\d.]+)")
+                    vmaf = _comparar(saida, referencia, "libvmaf", r"VMAF score: ([\d.]+)") if usar_vmaf else None
+                    totais[nome_perfil]["tempo"] += tempo
+                    totais[nome_perfil]["cpu"] += cpu
+                    totais[nome_perfil]["bytes"] += tamanho
+
+                    self.stdout.write(
+                        f"{nome_job:<17} {nome_perfil:<9} {tempo:>10.2f} {cpu:>8.2f} {duracao / tempo:>13.1f} "
+                        f"{tamanho / 1024:>13.0f} {tamanho * 8 / duracao / 1000:>7.0f} "
+                        f"{ssim if ssim is not None else float('nan'):>7.4f} "
+                        f"{vmaf if vmaf is not None else float('nan'):>6.2f}"
+                    )
+
+            self.stdout.write("\nTotais por perfil")
+            for nome_perfil, dados in totais.items():
+                self.stdout.write(
+                    f"{nome_perfil:<9} tempo {dados['tempo']:.2f}s, CPU {dados['cpu']:.2f}s, "
+                    f"{dados['bytes'] / 1024:.0f} KB"
+                )
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
@@ -0,0 +1,79 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter
+
+from core.ken_burns import ALTURA, LARGURA, MOTORES
+from core.management.benchmark_utils import tempo_cpu
+from core.render_plan import Cena, renderizar_fundo
+
+# Mesma codificação para todos os motores: a diferença medida é só do efeito
+ARGS_BENCHMARK = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p"]
+
+
+def _imagem_sintetica(caminho):
+    """Imagem com bordas finas e textura, onde perda de nitidez e tremido aparecem."""
+    img = Image.effect_noise((LARGURA, ALTURA), 64).convert("RGB")
+    desenho = ImageDraw.Draw(img)
+    for i in range(0, LARGURA, 40):
+        desenho.line([(i, 0), (LARGURA - i, ALTURA)], fill=(255, 200, 40), width=2)
+    for j in range(0, ALTURA, 60):
+        desenho.rectangle([(100, j), (LARGURA - 100, j + 3)], outline=(30, 120, 255))
+    img.filter(ImageFilter.SMOOTH).save(caminho, quality=95)
+
+
+def _ssim(caminho_a, caminho_b):
+    resultado = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", caminho_a, "-i", caminho_b, "-lavfi", "ssim", "-f", "null", "-"],
+        capture_output=True, text=True, stdin=subprocess.DEVNULL,
+    )
+    encontrado = re.search(r"All:([\d.]+)", resultado.stderr)
+    return float(encontrado.group(1)) if encontrado else None
+
+
+class Command(BaseCommand):
+    help = 'Compara tempo e qualidade (SSIM contra o filtro antigo) dos motores de Ken Burns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--imagem', help='Imagem de teste (padrão: uma imagem sintética).')
+        parser.add_argument('--duracao', type=float, default=6.0, help='Duração de cada cena em segundos.')
+        parser.add_argument('--cenas', type=int, default=3, help='Quantidade de cenas renderizadas.')
+
+    def handle(self, *args, **options):
+        pasta = tempfile.mkdtemp(prefix="bench_kb_")
+        try:
+            imagem = options['imagem']
+            if not imagem:
+                imagem = os.path.join(pasta, "teste.jpg")
+                _imagem_sintetica(imagem)
+
+            resultados = {}
+            for motor in MOTORES:
+                cenas = [Cena("imagem", imagem, options['duracao']) for _ in range(options['cenas'])]
+                saida = os.path.join(pasta, f"{motor}.mp4")
+                cpu_inicio, relogio_inicio = tempo_cpu(), time.perf_counter()
+                renderizar_fundo(cenas, saida, ARGS_BENCHMARK, motor_ken_burns=motor)
+                resultados[motor] = {
+                    "tempo": time.perf_counter() - relogio_inicio,
+                    "cpu": tempo_cpu() - cpu_inicio,
+                    "arquivo": saida,
+                }
+
+            referencia = resultados["legado"]
+            segundos_video = options['duracao'] * options['cenas']
+            self.stdout.write(f"\n{segundos_video:.0f}s de vídeo, referência de qualidade: legado (scale=2160:3840)\n")
+            self.stdout.write(f"{'motor':<8} {'tempo (s)':>10} {'CPU (s)':>9} {'x tempo real':>13} {'vs legado':>10} {'SSIM':>7}")
+            for motor, dados in resultados.items():
+                ssim = 1.0 if motor == "legado" else _ssim(dados["arquivo"], referencia["arquivo"])
+                self.stdout.write(
+                    f"{motor:<8} {dados['tempo']:>10.2f} {dados['cpu']:>9.2f} "
+                    f"{segundos_video / dados['tempo']:>13.1f} {referencia['cpu'] / dados['cpu']:>9.2f}x "
+                    f"{ssim if ssim is not None else float('nan'):>7.4f}"
+                )
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
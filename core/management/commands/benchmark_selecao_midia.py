@@ -0,0 +1,87 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.asset_index import escolher_midia, invalidar_ids
+from core.models import CategoriaVideo, VideoBase
+
+
+class _Reverter(Exception):
+    pass
+
+
+def _medir(escolher, repeticoes):
+    tempos = []
+    with CaptureQueriesContext(connection) as consultas:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            escolher()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos, len(consultas.captured_queries) / repeticoes
+
+
+class Command(BaseCommand):
+    help = ('Compara a escolha aleatória de mídia (ORDER BY RANDOM() x ids no Redis) numa '
+            'categoria temporária com muitos vídeos. Tudo é revertido no fim.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--midias', type=int, default=10000, help='Vídeos criados na categoria de teste.')
+        parser.add_argument('--repeticoes', type=int, default=200, help='Escolhas medidas por estratégia.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._executar(options['midias'], options['repeticoes'])
+                raise _Reverter()
+        except _Reverter:
+            pass
+        invalidar_ids()
+
+    def _executar(self, quantidade, repeticoes):
+        categoria = CategoriaVideo.objects.create(nome=f"benchmark_{uuid.uuid4().hex[:8]}")
+        VideoBase.objects.bulk_create(
+            [
+                VideoBase(
+                    titulo=f"video {i}",
+                    categoria=categoria,
+                    object_key=f"media/videos_base/{categoria.pasta}/video_{i}.mp4",
+                    disponivel=i % 20 != 0,  # 5% indisponíveis, como depois de uma reconciliação
+                )
+                for i in range(quantidade)
+            ],
+            batch_size=2000,
+        )
+        self.stdout.write(f"\n{quantidade} vídeos na categoria de teste, {repeticoes} escolhas por estratégia\n")
+
+        def order_by_random():
+            return (
+                VideoBase.objects.filter(categoria=categoria, disponivel=True)
+                .exclude(object_key__isnull=True)
+                .exclude(object_key__exact="")
+                .order_by("?")
+                .first()
+            )
+
+        invalidar_ids()
+        inicio = time.perf_counter()
+        escolher_midia(VideoBase, categoria)
+        carga_ms = (time.perf_counter() - inicio) * 1000
+
+        resultados = {
+            "ORDER BY RANDOM()": _medir(order_by_random, repeticoes),
+            "ids no Redis": _medir(lambda: escolher_midia(VideoBase, categoria), repeticoes),
+        }
+
+        self.stdout.write(f"{'estratégia':<20} {'média (ms)':>11} {'p95 (ms)':>9} {'consultas':>10}")
+        for nome, (tempos, consultas) in resultados.items():
+            p95 = statistics.quantiles(tempos, n=20)[-1] if len(tempos) >= 20 else max(tempos)
+            self.stdout.write(f"{nome:<20} {statistics.mean(tempos):>11.3f} {p95:>9.3f} {consultas:>10.2f}")
+        self.stdout.write(f"\nCarga dos ids (1ª escolha após o TTL): {carga_ms:.1f} ms")
+
+        escolhidos = [escolher_midia(VideoBase, categoria).id for _ in range(50)]
+        repeticoes_proximas = sum(1 for i in range(1, len(escolhidos)) if escolhidos[i] in escolhidos[max(0, i - 5):i])
+        self.stdout.write(f"Repetições dentro de 5 escolhas seguidas (ids no Redis): {repeticoes_proximas}")
@@ -0,0 +1,37 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.forms import VOZES_KOKORO
+from core.services import obter_preview_voz
+
+
+class Command(BaseCommand):
+    help = 'Pré-renderiza os previews (MP3) de todas as vozes do formulário. Indicado para rodar no deploy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limpar-antigos',
+            action='store_true',
+            help='Apaga a pasta MEDIA_ROOT/audio_previews usada pela versão antiga do preview.',
+        )
+
+    def handle(self, *args, **options):
+        gerados = 0
+        for nome_voz, rotulo in VOZES_KOKORO:
+            try:
+                caminho = obter_preview_voz(nome_voz)
+                self.stdout.write(self.style.SUCCESS(f'  -> {nome_voz}: {caminho}'))
+                gerados += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  -> Erro ao gerar preview de {nome_voz}: {e}'))
+
+        if options['limpar_antigos'] and settings.MEDIA_ROOT:
+            pasta_antiga = os.path.join(settings.MEDIA_ROOT, 'audio_previews')
+            if os.path.isdir(pasta_antiga):
+                shutil.rmtree(pasta_antiga)
+                self.stdout.write(self.style.NOTICE(f'Pasta antiga removida: {pasta_antiga}'))
+
+        self.stdout.write(self.style.SUCCESS(f'\n{gerados}/{len(VOZES_KOKORO)} previews prontos.'))
@@ -0,0 +1,195 @@
+"""
+Ingestão das mídias da biblioteca (VideoBase / MusicaBase), feita uma vez por upload.
+
+O admin salva o arquivo original e enfileira `task_ingerir_midia`; a ingestão roda
+no worker, fora da requisição:
+
+- ffprobe do arquivo enviado; o formato fica salvo no modelo.
+- Vídeos são normalizados para o formato final (1080x1920, 30 fps, H.264
+  yuv420p, SAR 1, moov no início). Assim o render pula scale/pad/setsar e,
+  sem outros filtros, copia o vídeo sem recodificar. Os recodificados ganham
+  GOP de 2 s, o que deixa o `-stream_loop` barato; os que já estavam no formato
+  final são só remuxados e mantêm o GOP de origem.
+- Músicas em codecs fora de AAC/MP3 são convertidas para AAC.
+
+Se o ffprobe/ffmpeg falhar, o original fica como veio (sem metadados) e o
+render usa o caminho normal. Nos dois casos a mídia é marcada como disponível:
+o worker acabou de ler o arquivo do storage.
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from django.core.files import File
+from django.utils import timezone
+
+from .encoder_profiles import PERFIL_BIBLIOTECA
+from .ken_burns import ALTURA, FPS, LARGURA
+
+logger = logging.getLogger(__name__)
+
+CODECS_AUDIO_ACEITOS = ("aac", "mp3")
+INGESTAO_TIMEOUT = 900
+
+
+def _fps(taxa):
+    """'30000/1001' -> 29.97"""
+    try:
+        numerador, _, denominador = (taxa or "").partition("/")
+        return round(float(numerador) / float(denominador or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def sondar_midia(caminho):
+    """Formato do arquivo pelo ffprobe: dimensões, fps, codecs, pix_fmt, SAR e duração."""
+    resultado = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", caminho],
+        check=True, capture_output=True, text=True, stdin=subprocess.DEVNULL, timeout=60,
+    )
+    dados = json.loads(resultado.stdout)
+    video = next(
+        (s for s in dados.get("streams", [])
+         if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")),
+        None,
+    )
+    audio = next((s for s in dados.get("streams", []) if s.get("codec_type") == "audio"), None)
+    duracao = dados.get("format", {}).get("duration")
+    return {
+        "largura": video.get("width") if video else None,
+        "altura": video.get("height") if video else None,
+        "fps": _fps(video.get("avg_frame_rate")) if video else None,
+        "codec_video": video.get("codec_name", "") if video else "",
+        "pix_fmt": video.get("pix_fmt", "") if video else "",
+        "sar": video.get("sample_aspect_ratio", "") if video else "",
+        "codec_audio": audio.get("codec_name", "") if audio else "",
+        "duracao": float(duracao) if duracao else None,
+    }
+
+
+def video_no_formato_final(formato):
+    return (
+        formato["codec_video"] == "h264"
+        and formato["largura"] == LARGURA
+        and formato["altura"] == ALTURA
+        and formato["fps"] is not None and abs(formato["fps"] - FPS) < 0.01
+        and formato["pix_fmt"] == "yuv420p"
+        and formato["sar"] in ("", "1:1", "0:1", "N/A")
+    )
+
+
+def normalizar_video(origem, destino, formato):
+    """Converte para o formato final; se já estiver nele, só remuxa com faststart."""
+    audio = ["-c:a", "aac", "-b:a", "128k", "-ar", "44100"] if formato["codec_audio"] else ["-an"]
+    if formato["codec_audio"] == "aac":
+        audio = ["-c:a", "copy"]
+    if video_no_formato_final(formato):
+        video = ["-c:v", "copy"]
+    else:
+        video = [
+            "-vf",
+            f"scale={LARGURA}:{ALTURA}:force_original_aspect_ratio=decrease,"
+            f"pad={LARGURA}:{ALTURA}:-1:-1,setsar=1,fps={FPS}",
+            *PERFIL_BIBLIOTECA.args_video(), "-g", str(FPS * 2),
+        ]
+    subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", origem,
+         "-map", "0:v:0", "-map", "0:a:0?", *video, *audio,
+         "-avoid_negative_ts", "make_zero", "-movflags", "+faststart", destino],
+        check=True, capture_output=True, stdin=subprocess.DEVNULL, timeout=INGESTAO_TIMEOUT,
+    )
+
+
+def normalizar_musica(origem, destino):
+    subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", origem,
+         "-map", "0:a:0", "-c:a", "aac", "-b:a", "160k", "-ar", "44100", "-movflags", "+faststart", destino],
+        check=True, capture_output=True, stdin=subprocess.DEVNULL, timeout=INGESTAO_TIMEOUT,
+    )
+
+
+def _campos_video(formato):
+    return {
+        "largura": formato["largura"], "altura": formato["altura"], "fps": formato["fps"],
+        "codec_video": formato["codec_video"], "codec_audio": formato["codec_audio"],
+        "duracao": formato["duracao"],
+    }
+
+
+def _campos_musica(formato):
+    return {"codec_audio": formato["codec_audio"], "duracao": formato["duracao"]}
+
+
+def _ingerir(origem, nome, tipo, pasta):
+    """
+    Sonda e, se preciso, normaliza `origem`. Retorna `(destino, nome_final, campos)`:
+    `destino` é None quando o original já serve, e `campos` fica vazio se o
+    ffprobe/ffmpeg falhar (o original é mantido, sem metadados).
+    """
+    nome_base, _ = os.path.splitext(nome)
+    try:
+        formato = sondar_midia(origem)
+        if tipo == "video":
+            destino = os.path.join(pasta, "normalizado.mp4")
+            normalizar_video(origem, destino, formato)
+            return destino, f"{nome_base}.mp4", {**_campos_video(sondar_midia(destino)), "normalizado": True}
+        if formato["codec_audio"] in CODECS_AUDIO_ACEITOS:
+            return None, nome, {**_campos_musica(formato), "normalizado": True}
+        destino = os.path.join(pasta, "normalizado.m4a")
+        normalizar_musica(origem, destino)
+        return destino, f"{nome_base}.m4a", {**_campos_musica(sondar_midia(destino)), "normalizado": True}
+    except (subprocess.SubprocessError, OSError, ValueError) as e:
+        logger.warning(f"Ingestão de '{nome}' falhou ({e}). Mantendo o arquivo original.")
+        return None, nome, {}
+
+
+def ingerir_midia(tipo, midia_id):
+    """
+    Executado por `task_ingerir_midia`: baixa o original já salvo, grava o formato
+    e, se o arquivo foi convertido, troca-o no storage. `tipo` é "video" ou "musica".
+    Como o arquivo foi lido do storage, a mídia passa a `disponivel` (novas
+    mídias nascem indisponíveis até aqui ou até a reconciliação com o R2).
+    Retorna True se a mídia ficou normalizada.
+    """
+    from .asset_index import invalidar_ids
+    from .models import MusicaBase, VideoBase
+
+    if tipo == "video":
+        midia = VideoBase.objects.get(pk=midia_id)
+        arquivo = midia.arquivo_video
+    else:
+        midia = MusicaBase.objects.get(pk=midia_id)
+        arquivo = midia.arquivo_musica
+    if not arquivo:
+        return False
+
+    pasta = tempfile.mkdtemp(prefix="ingestao_")
+    try:
+        nome = os.path.basename(arquivo.name)
+        origem = os.path.join(pasta, f"original{os.path.splitext(nome)[1].lower()}")
+        with arquivo.open("rb") as f_origem, open(origem, "wb") as f:
+            shutil.copyfileobj(f_origem, f, length=1024 * 1024)
+
+        destino, nome_final, campos = _ingerir(origem, nome, tipo, pasta)
+        normalizado = bool(campos)
+
+        nome_original = arquivo.name
+        if destino:
+            with open(destino, "rb") as f:
+                arquivo.save(nome_final, File(f), save=False)
+        # O arquivo acabou de ser lido do storage (ou regravado nele): está no R2
+        campos = {**campos, "disponivel": True, "verificado_em": timezone.now()}
+        for campo, valor in campos.items():
+            setattr(midia, campo, valor)
+        midia.save()  # recalcula o object_key a partir do novo arquivo
+        if arquivo.name != nome_original:
+            arquivo.storage.delete(nome_original)
+        invalidar_ids(type(midia), midia.categoria_id)
+
+        logger.info(f"Ingestão de '{nome}' concluída: {campos}")
+        return normalizado
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
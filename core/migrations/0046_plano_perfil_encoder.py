@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_cortegerado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plano',
+            name='perfil_encoder',
+            field=models.CharField(choices=[('rascunho', 'Rascunho (mais rápido)'), ('padrao', 'Padrão'), ('premium', 'Premium (melhor qualidade)')], default='padrao', help_text='Perfil de codificação dos vídeos gerados pelos assinantes deste plano.', max_length=20),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_plano_perfil_encoder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='musicabase',
+            name='codec_audio',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='musicabase',
+            name='duracao',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='musicabase',
+            name='normalizado',
+            field=models.BooleanField(default=False, help_text='Arquivo já convertido para o formato final na ingestão.'),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='altura',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='codec_audio',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='codec_video',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='duracao',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='fps',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='largura',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='normalizado',
+            field=models.BooleanField(default=False, help_text='Arquivo já convertido para o formato final na ingestão.'),
+        ),
+    ]
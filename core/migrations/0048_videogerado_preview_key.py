@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_midia_formato'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videogerado',
+            name='preview_key',
+            field=models.CharField(blank=True, help_text='Caminho da prévia animada (WebP) no R2', max_length=500, null=True),
+        ),
+    ]
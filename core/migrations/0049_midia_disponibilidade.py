@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_videogerado_preview_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='musicabase',
+            name='disponivel',
+            field=models.BooleanField(db_index=True, default=True, help_text='Arquivo encontrado no R2 na última verificação.'),
+        ),
+        migrations.AddField(
+            model_name='musicabase',
+            name='verificado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='disponivel',
+            field=models.BooleanField(db_index=True, default=True, help_text='Arquivo encontrado no R2 na última verificação.'),
+        ),
+        migrations.AddField(
+            model_name='videobase',
+            name='verificado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_midia_disponibilidade'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='musicabase',
+            name='disponivel',
+            field=models.BooleanField(db_index=True, default=False, help_text='Arquivo encontrado no R2 na última verificação.'),
+        ),
+        migrations.AlterField(
+            model_name='videobase',
+            name='disponivel',
+            field=models.BooleanField(db_index=True, default=False, help_text='Arquivo encontrado no R2 na última verificação.'),
+        ),
+    ]
@@ -4,12 +4,13 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from storages.backends.s3boto3 import S3Boto3Storage
-import boto3
 from botocore.exceptions import ClientError
 import os
 import unicodedata  # <-- IMPORT MOVIDO PARA CIMA
 import re          # <-- IMPORT MOVIDO PARA CIMA
 
+from .encoder_profiles import PERFIL_CHOICES
+
 
 # ================================================================
 # STORAGE CONFIGURATION
@@ -120,6 +121,18 @@ class BaseMedia(models.Model):
     titulo = models.CharField(max_length=200)
     object_key = models.CharField(max_length=500, blank=True, null=True)
 
+    # Formato do arquivo (ffprobe na ingestão, ver core/media_ingest.py)
+    duracao = models.FloatField(blank=True, null=True)
+    codec_audio = models.CharField(max_length=20, blank=True, default="")
+    normalizado = models.BooleanField(
+        default=False, help_text="Arquivo já convertido para o formato final na ingestão."
+    )
+
+    # Mantidos pela reconciliação periódica com o R2 (core/asset_index.py)
+    # Nasce False: só a ingestão (que lê o arquivo) ou a reconciliação a liberam para sorteio
+    disponivel = models.BooleanField(default=False, db_index=True, help_text="Arquivo encontrado no R2 na última verificação.")
+    verificado_em = models.DateTimeField(blank=True, null=True)
+
     class Meta:
         abstract = True
 
@@ -134,6 +147,10 @@ class VideoBase(BaseMedia):
         blank=True,
         null=True,
     )
+    largura = models.PositiveIntegerField(blank=True, null=True)
+    altura = models.PositiveIntegerField(blank=True, null=True)
+    fps = models.FloatField(blank=True, null=True)
+    codec_video = models.CharField(max_length=20, blank=True, default="")
 
     def save(self, *args, **kwargs):
         if self.arquivo_video:
@@ -173,6 +190,7 @@ class VideoGerado(models.Model):
     status = models.CharField(max_length=50, default="PROCESSANDO")
     arquivo_final = models.CharField(max_length=500, blank=True, null=True, help_text="Caminho do vídeo gerado (local ou R2)")
     thumbnail_key = models.CharField(max_length=500, blank=True, null=True, help_text="Caminho da thumbnail do vídeo no R2")
+    preview_key = models.CharField(max_length=500, blank=True, null=True, help_text="Caminho da prévia animada (WebP) no R2")
     criado_em = models.DateTimeField(auto_now_add=True)
     duracao_segundos = models.IntegerField(blank=True, null=True)
     loop = models.BooleanField(default=False)
@@ -206,6 +224,12 @@ class VideoGerado(models.Model):
             return f"{settings.CLOUDFLARE_R2_PUBLIC_URL}/{self.thumbnail_key}"
         return None
 
+    @property
+    def preview_url(self):
+        if self.preview_key and settings.CLOUDFLARE_R2_PUBLIC_URL:
+            return f"{settings.CLOUDFLARE_R2_PUBLIC_URL}/{self.preview_key}"
+        return None
+
 class CorteGerado(models.Model):
     video_gerado = models.OneToOneField(VideoGerado, on_delete=models.CASCADE, primary_key=True)
     youtube_url = models.URLField(max_length=255)
@@ -230,6 +254,13 @@ class Plano(models.Model):
     # --- CORREÇÃO ADICIONADA AQUI ---
     stripe_price_id = models.CharField(max_length=255, blank=True, null=True, help_text="ID do Preço deste plano no Stripe (ex: price_123abc...)")
 
+    perfil_encoder = models.CharField(
+        max_length=20,
+        choices=PERFIL_CHOICES,
+        default="padrao",
+        help_text="Perfil de codificação dos vídeos gerados pelos assinantes deste plano.",
+    )
+
     def __str__(self):
         return self.nome
 
@@ -0,0 +1,70 @@
+"""
+Cliente boto3 do R2 compartilhado pelo processo.
+
+- Um cliente por processo (chave inclui o PID), criado uma vez sob lock. Clientes
+  boto3 são thread-safe; depois de um fork (workers prefork do Celery) o filho
+  cria o seu, sem reaproveitar conexões herdadas do pai.
+- Pool de conexões e retentativas ajustados (botocore Config).
+- `TRANSFERENCIA`: TransferConfig para uploads/downloads grandes (multipart em
+  partes paralelas).
+"""
+
+import os
+import threading
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+
+R2_CONEXOES = getattr(settings, "R2_CONEXOES", 20)
+R2_TENTATIVAS = getattr(settings, "R2_TENTATIVAS", 3)
+R2_MULTIPART_MB = getattr(settings, "R2_MULTIPART_MB", 16)
+R2_TRANSFERENCIA_THREADS = getattr(settings, "R2_TRANSFERENCIA_THREADS", 8)
+
+TRANSFERENCIA = TransferConfig(
+    multipart_threshold=R2_MULTIPART_MB * 1024 * 1024,
+    multipart_chunksize=R2_MULTIPART_MB * 1024 * 1024,
+    max_concurrency=R2_TRANSFERENCIA_THREADS,
+    use_threads=True,
+)
+
+_lock = threading.Lock()
+_clientes = {}
+
+
+def get_r2_client():
+    """Cliente S3 do R2 deste processo."""
+    chave = os.getpid()
+    cliente = _clientes.get(chave)
+    if cliente is not None:
+        return cliente
+    with _lock:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            # Entradas de outros PIDs vieram do processo pai: descarta
+            _clientes.clear()
+            cliente = _clientes[chave] = boto3.session.Session().client(
+                "s3",
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_S3_REGION_NAME,
+                config=Config(
+                    max_pool_connections=R2_CONEXOES,
+                    retries={"max_attempts": R2_TENTATIVAS, "mode": "standard"},
+                    connect_timeout=5,
+                    read_timeout=60,
+                    tcp_keepalive=True,
+                ),
+            )
+    return cliente
+
+
+if hasattr(os, "register_at_fork"):
+    # O lock pode ter sido herdado travado por outra thread do pai
+    def _apos_fork():
+        global _lock
+        _lock = threading.Lock()
+
+    os.register_at_fork(after_in_child=_apos_fork)
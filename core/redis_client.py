@@ -0,0 +1,43 @@
+"""
+Cliente Redis (o mesmo do broker do Celery) compartilhado pelo processo.
+
+- Um cliente por processo (chave inclui o PID), criado uma vez sob lock, com o
+  seu pool de conexões: a conexão TLS com o Redis é aberta uma vez e reaproveitada.
+  Clientes redis-py são thread-safe; depois de um fork (workers prefork do
+  Celery) o filho cria o seu, sem reaproveitar conexões herdadas do pai.
+- Usado pela fila de transcrição em lote e pelos ids da biblioteca (asset_index).
+"""
+
+import os
+import threading
+
+from django.conf import settings
+
+REDIS_CONEXOES = getattr(settings, "REDIS_CONEXOES", 10)
+
+_lock = threading.Lock()
+_clientes = {}
+
+
+def get_redis_client():
+    """Cliente Redis deste processo."""
+    chave = os.getpid()
+    cliente = _clientes.get(chave)
+    if cliente is not None:
+        return cliente
+    with _lock:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            import redis
+
+            # Entradas de outros PIDs vieram do processo pai: descarta
+            _clientes.clear()
+            cliente = _clientes[chave] = redis.Redis.from_url(
+                settings.CELERY_BROKER_URL,
+                max_connections=REDIS_CONEXOES,
+                socket_connect_timeout=5,
+                socket_timeout=10,
+                health_check_interval=30,
+                socket_keepalive=True,
+            )
+    return cliente
@@ -0,0 +1,371 @@
+"""
+Planejador de renderização: monta um único grafo `filter_complex` do ffmpeg.
+
+Em vez de codificar cada cena, concatenar num fundo e recodificar tudo no comando
+final (e ainda decodificar o resultado de novo para a thumbnail), o plano
+descreve o vídeo inteiro num grafo só:
+
+    cenas (imagens com Ken Burns / clipes Pexels) -> concat -> legendas ASS
+    -> marca d'água -> overlay de texto -> [vídeo final] + [thumbnail]
+    narração + música -> mix -> [áudio final]
+
+e o ffmpeg faz uma única codificação.
+"""
+
+import itertools
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import List, Optional
+
+from django.conf import settings
+
+from .encoder_profiles import PERFIL_FUNDO, obter_perfil
+from .ken_burns import (
+    ALTURA, FPS, KEN_BURNS_MOTOR, LARGURA, entrada_quadros_crus, filtro_ken_burns, quadros_ken_burns,
+)
+
+logger = logging.getLogger(__name__)
+
+# Codificação do vídeo final quando o job não escolhe um perfil (ENCODER_PERFIL_PADRAO)
+ARGS_CODIFICACAO_PADRAO = obter_perfil().args(FPS)
+
+# Busca das cenas (download/geração de imagem) em paralelo
+CENAS_CONCORRENCIA = getattr(settings, "CENAS_CONCORRENCIA", 4)
+CENAS_TIMEOUT_SEGUNDOS = getattr(settings, "CENAS_TIMEOUT_SEGUNDOS", 90)
+
+# A passagem única processa todas as cenas no mesmo comando, então ganha mais tempo
+RENDER_TIMEOUT = getattr(settings, "RENDER_TIMEOUT", 900)
+
+MARCA_DAGUA = (
+    "drawtext=text='LUNDERON.COM':x=(w-text_w-10):y=(h-text_h-10):fontsize=32:"
+    "fontcolor=white@0.5:shadowcolor=black@0.5:shadowx=2:shadowy=2"
+)
+
+
+@dataclass
+class Cena:
+    """Uma cena do fundo: 'imagem' (ganha Ken Burns) ou 'video' (clipe em loop/cortado)."""
+    tipo: str
+    caminho: str
+    duracao: float = 0.0
+
+
+def distribuir_duracao(cenas, duracao_total):
+    """Divide a duração total igualmente entre as cenas que de fato foram obtidas."""
+    if cenas:
+        duracao = duracao_total / len(cenas)
+        for cena in cenas:
+            cena.duracao = duracao
+    return cenas
+
+
+def buscar_cenas_em_paralelo(obter_cena, itens, concorrencia=None, timeout_por_cena=None, descricao="cenas"):
+    """
+    Executa `obter_cena(indice, item, cancelado)` para cada item num pool limitado
+    de threads e devolve as cenas obtidas na ordem dos índices. Cenas que falham,
+    retornam None ou passam de `timeout_por_cena` segundos (contados do início de
+    cada uma) ficam de fora, sem travar as demais.
+
+    `cancelado` é um `threading.Event` ligado quando a cena é descartada ou a busca
+    termina. A thread não pode ser interrompida, então `obter_cena` deve checá-lo
+    entre as etapas e escrever em arquivos próprios (`arquivo_temporario`), movidos
+    para o lugar só se a cena ainda for esperada (`entregar_arquivo`).
+    """
+    concorrencia = max(1, concorrencia or CENAS_CONCORRENCIA)
+    timeout_por_cena = timeout_por_cena or CENAS_TIMEOUT_SEGUNDOS
+    inicios = {}
+    cancelados = {indice: threading.Event() for indice in range(len(itens))}
+
+    def executar(indice, item):
+        inicios[indice] = time.monotonic()
+        if cancelados[indice].is_set():
+            return None
+        return obter_cena(indice, item, cancelados[indice])
+
+    resultados = {}
+    executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix=f"cena-{descricao}")
+    try:
+        pendentes = {executor.submit(executar, i, item): i for i, item in enumerate(itens)}
+        while pendentes:
+            concluidos, _ = wait(pendentes, timeout=1.0, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                indice = pendentes.pop(futuro)
+                try:
+                    cena = futuro.result()
+                    if cena is not None:
+                        resultados[indice] = cena
+                except Exception as e:
+                    logger.error(f"Erro na cena {indice} ({descricao}): {e}")
+
+            agora = time.monotonic()
+            for futuro, indice in list(pendentes.items()):
+                if indice in inicios and agora - inicios[indice] > timeout_por_cena:
+                    logger.warning(f"Cena {indice} ({descricao}) passou de {timeout_por_cena}s e foi descartada.")
+                    cancelados[indice].set()
+                    del pendentes[futuro]
+    finally:
+        # Threads ainda em andamento (ou que nem começaram) desistem e não publicam nada
+        for evento in cancelados.values():
+            evento.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [resultados[i] for i in sorted(resultados)]
+
+
+def arquivo_temporario(diretorio, sufixo):
+    """Arquivo exclusivo da thread de uma cena, para escrever antes de `entregar_arquivo`."""
+    fd, caminho = tempfile.mkstemp(prefix="parcial_", suffix=sufixo, dir=diretorio)
+    os.close(fd)
+    return caminho
+
+
+def entregar_arquivo(caminho_temp, destino, cancelado):
+    """Move o arquivo para `destino` se a cena ainda é esperada; senão o apaga e retorna None."""
+    if cancelado.is_set():
+        try:
+            os.remove(caminho_temp)
+        except FileNotFoundError:
+            pass
+        return None
+    os.replace(caminho_temp, destino)
+    return destino
+
+
+def escapar_caminho_filtro(caminho):
+    """Escapa um caminho para uso dentro de um filtro (ass=filename=...)."""
+    return caminho.replace('\\', '/').replace(':', '\\:')
+
+
+def filtro_clipe(duracao):
+    """Clipe de vídeo preenchendo a tela vertical, cortado na duração da cena."""
+    return (
+        f"scale={LARGURA}:{ALTURA}:force_original_aspect_ratio=increase,crop={LARGURA}:{ALTURA},"
+        f"fps={FPS},trim=duration={duracao:.3f}"
+    )
+
+
+# Opções de codificação de vídeo (com valor) trocadas por `-c:v copy` na cópia direta
+_OPCOES_VIDEO = {"-c:v", "-preset", "-crf", "-qp", "-r", "-pix_fmt", "-g", "-b:v"}
+
+
+def args_copia_de_video(args_codificacao):
+    """Mesmos argumentos, mas com o vídeo copiado (o áudio continua codificado)."""
+    resultado = ["-c:v", "copy"]
+    pares = iter(args_codificacao)
+    for opcao in pares:
+        valor = next(pares, None)
+        if opcao not in _OPCOES_VIDEO:
+            resultado.extend([opcao, valor])
+    return resultado
+
+
+class PlanoRender:
+    """Acumula entradas e filtros e gera o comando ffmpeg de passagem única."""
+
+    def __init__(self):
+        self._entradas = []
+        self._filtros = []
+        self._contador = 0
+        self.video = None
+        self.audio = None
+        # Quadros crus enviados pelo stdin (motor Ken Burns "pillow")
+        self._quadros_stdin = None
+        # Entrada de vídeo já no formato final (pode ser copiada sem recodificar)
+        self._entrada_formato_final = None
+
+    def _rotulo(self, prefixo):
+        self._contador += 1
+        return f"[{prefixo}{self._contador}]"
+
+    def adicionar_entrada(self, caminho, opcoes=()):
+        """Registra um `-i` (com opções de entrada) e retorna o índice dele."""
+        self._entradas.append([*opcoes, "-i", caminho])
+        return len(self._entradas) - 1
+
+    def adicionar_filtro(self, entrada, filtro, prefixo="v"):
+        saida = self._rotulo(prefixo)
+        self._filtros.append(f"{entrada}{filtro}{saida}")
+        return saida
+
+    # --- Vídeo --------------------------------------------------------------
+
+    def fundo_de_cenas(self, cenas: List[Cena], motor_ken_burns=None):
+        """Cada cena vira um ramo do grafo; os ramos são unidos por `concat`."""
+        motor_ken_burns = motor_ken_burns or KEN_BURNS_MOTOR
+        if motor_ken_burns == "pillow" and self._quadros_stdin is None and all(c.tipo == "imagem" for c in cenas):
+            # Todas as cenas viram um único fluxo de quadros crus no stdin do ffmpeg
+            self._quadros_stdin = itertools.chain.from_iterable(
+                quadros_ken_burns(cena.caminho, cena.duracao) for cena in cenas
+            )
+            indice = self.adicionar_entrada("pipe:0", entrada_quadros_crus())
+            self.video = self.adicionar_filtro(f"[{indice}:v]", "setsar=1,format=yuv420p,settb=AVTB,setpts=PTS-STARTPTS", "fundo")
+            return self.video
+
+        rotulos = []
+        for cena in cenas:
+            if cena.tipo == "imagem":
+                indice = self.adicionar_entrada(cena.caminho)
+                filtro = filtro_ken_burns(cena.duracao, "legado" if motor_ken_burns == "legado" else "filtro")
+            else:
+                indice = self.adicionar_entrada(
+                    cena.caminho, ["-stream_loop", "-1", "-t", f"{cena.duracao:.3f}"]
+                )
+                filtro = filtro_clipe(cena.duracao)
+            rotulos.append(self.adicionar_filtro(
+                f"[{indice}:v]", f"{filtro},setsar=1,format=yuv420p,settb=AVTB,setpts=PTS-STARTPTS", "cena"
+            ))
+
+        if len(rotulos) == 1:
+            self.video = rotulos[0]
+        else:
+            self.video = self.adicionar_filtro("".join(rotulos), f"concat=n={len(rotulos)}:v=1:a=0", "fundo")
+        return self.video
+
+    def fundo_de_video(self, caminho, loop=False, formato_final=False):
+        """
+        Vídeo de fundo pronto (biblioteca/upload), ajustado para 1080x1920.
+        Com `formato_final` (normalizado na ingestão) não há scale/pad/setsar e,
+        se nenhum outro filtro for aplicado, o vídeo é copiado sem recodificar.
+        """
+        opcoes = ["-stream_loop", "-1"] if loop else []
+        indice = self.adicionar_entrada(caminho, opcoes)
+        if formato_final:
+            self._entrada_formato_final = indice
+            self.video = f"[{indice}:v]"
+            return self.video
+        self.video = self.adicionar_filtro(
+            f"[{indice}:v]",
+            f"scale={LARGURA}:{ALTURA}:force_original_aspect_ratio=decrease,pad={LARGURA}:{ALTURA}:-1:-1,setsar=1",
+        )
+        return self.video
+
+    def legendas_ass(self, caminho_ass):
+        self.video = self.adicionar_filtro(self.video, f"ass=filename='{escapar_caminho_filtro(caminho_ass)}'")
+
+    def marca_dagua(self):
+        self.video = self.adicionar_filtro(self.video, MARCA_DAGUA)
+
+    def sobrepor_imagem(self, caminho_imagem):
+        indice = self.adicionar_entrada(caminho_imagem)
+        self.video = self.adicionar_filtro(f"{self.video}[{indice}:v]", "overlay=(W-w)/2:(H-h)/2")
+
+    # --- Áudio --------------------------------------------------------------
+
+    def definir_audio(self, caminho_musica=None, caminho_narrador=None, volume_musica=0.2):
+        """Narração, música (com volume) ou a mistura das duas."""
+        indice_musica = self.adicionar_entrada(caminho_musica) if caminho_musica else None
+        indice_narrador = self.adicionar_entrada(caminho_narrador) if caminho_narrador else None
+
+        if indice_musica is not None:
+            musica = self.adicionar_filtro(f"[{indice_musica}:a]", f"volume={volume_musica}", "a")
+            if indice_narrador is not None:
+                self.audio = self.adicionar_filtro(
+                    f"[{indice_narrador}:a]{musica}", "amix=inputs=2:duration=first:dropout_transition=3", "a"
+                )
+            else:
+                self.audio = musica
+        elif indice_narrador is not None:
+            self.audio = self.adicionar_filtro(f"[{indice_narrador}:a]", "acopy", "a")
+
+    # --- Comando ------------------------------------------------------------
+
+    def comando(self, caminho_saida, duracao, args_codificacao=None, caminho_thumbnail=None, segundo_thumbnail=1.0):
+        """
+        Monta o comando completo. Com `caminho_thumbnail`, o vídeo final passa por
+        um `split` e um quadro de `segundo_thumbnail` é salvo como JPEG na mesma execução.
+        """
+        filtros = list(self._filtros)
+        video_final = self.video
+        args_codificacao = args_codificacao or ARGS_CODIFICACAO_PADRAO
+        copiar_video = self.video == f"[{self._entrada_formato_final}:v]"
+        if copiar_video:
+            # Nenhum filtro sobre o fundo: o vídeo vai direto para a saída
+            video_final = f"{self._entrada_formato_final}:v"
+            args_codificacao = args_copia_de_video(args_codificacao)
+
+        mapas_thumbnail = []
+        if caminho_thumbnail:
+            quadro = int(min(segundo_thumbnail, max(0.0, duracao - 0.1)) * FPS)
+            if copiar_video:
+                filtros.append(f"{self.video}trim=start_frame={quadro}:end_frame={quadro + 1}[v_thumb]")
+            else:
+                filtros.append(f"{self.video}split=2[v_final][v_thumb_src]")
+                filtros.append(f"[v_thumb_src]trim=start_frame={quadro}:end_frame={quadro + 1}[v_thumb]")
+                video_final = "[v_final]"
+            mapas_thumbnail = ["-map", "[v_thumb]", "-frames:v", "1", "-q:v", "2", caminho_thumbnail]
+
+        cmd = ["ffmpeg", "-y", "-hide_banner"]
+        for entrada in self._entradas:
+            cmd.extend(entrada)
+        if filtros:
+            cmd.extend(["-filter_complex", ";".join(filtros)])
+        cmd.extend(["-map", video_final])
+        if self.audio:
+            cmd.extend(["-map", self.audio])
+        else:
+            cmd.append("-an")
+        cmd.extend(args_codificacao)
+        cmd.extend(["-t", str(duracao), caminho_saida])
+        cmd.extend(mapas_thumbnail)
+        return cmd
+
+    def _executar_com_quadros(self, cmd):
+        """Roda o ffmpeg escrevendo os quadros crus no stdin; stderr vai para arquivo (sem risco de deadlock)."""
+        with tempfile.TemporaryFile() as stderr_f:
+            processo = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_f)
+            try:
+                try:
+                    for quadro in self._quadros_stdin:
+                        processo.stdin.write(quadro)
+                except BrokenPipeError:
+                    pass  # o ffmpeg encerrou antes (erro ou -t atingido); o código de saída decide
+                finally:
+                    try:
+                        processo.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                retorno = processo.wait(timeout=RENDER_TIMEOUT)
+            finally:
+                # Timeout, erro ao gerar os quadros ou interrupção: o ffmpeg não fica órfão
+                if processo.poll() is None:
+                    processo.kill()
+                    processo.wait()
+            if retorno != 0:
+                stderr_f.seek(0)
+                raise subprocess.CalledProcessError(
+                    retorno, cmd, output="", stderr=stderr_f.read().decode("utf-8", errors="replace")
+                )
+
+    def executar(self, caminho_saida, duracao, args_codificacao=None, caminho_thumbnail=None, prefixo_log=""):
+        cmd = self.comando(caminho_saida, duracao, args_codificacao, caminho_thumbnail)
+        logger.info(f"{prefixo_log}Executando comando FFMPEG: {' '.join(cmd)}")
+        if self._quadros_stdin is not None:
+            self._executar_com_quadros(cmd)
+        else:
+            subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=RENDER_TIMEOUT, stdin=subprocess.DEVNULL)
+        if caminho_thumbnail and not (os.path.exists(caminho_thumbnail) and os.path.getsize(caminho_thumbnail)):
+            logger.warning(f"{prefixo_log}Thumbnail não foi gerada na passagem única.")
+        return caminho_saida
+
+
+def renderizar_fundo(cenas: List[Cena], caminho_saida, args_codificacao=None, motor_ken_burns=None) -> Optional[str]:
+    """
+    Codifica só o fundo (cenas + concat) num arquivo, também numa única execução.
+    Usado quando a passagem única está desligada (RENDER_PASSAGEM_UNICA=False).
+    """
+    if not cenas:
+        return None
+    plano = PlanoRender()
+    plano.fundo_de_cenas(cenas, motor_ken_burns)
+    duracao = sum(cena.duracao for cena in cenas)
+    plano.executar(
+        caminho_saida, duracao,
+        args_codificacao or PERFIL_FUNDO.args(FPS, com_audio=False),
+    )
+    return caminho_saida
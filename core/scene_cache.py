@@ -0,0 +1,150 @@
+"""
+Cache das cenas de fundo: imagens Flux (chave: prompt normalizado) e clipes
+do Pexels já normalizados em 1080x1920 a 30 fps (chave: id do vídeo).
+
+Temas frequentes passam a sair do disco (ou do R2) em vez de rede + transcodificação.
+Para não repetir sempre o mesmo fundo, cada prompt guarda até CENAS_CACHE_VARIANTES
+imagens e uma entrada só é reaproveitada com probabilidade CENAS_CACHE_REUSO.
+"""
+
+import logging
+import os
+import random
+import re
+import subprocess
+import tempfile
+import unicodedata
+
+from django.conf import settings
+
+from .cache_utils import CacheDisco, hash_conteudo, r2_configurado
+from .encoder_profiles import PERFIL_CLIPE_CACHE
+from .ken_burns import ALTURA, FPS, LARGURA
+from .media_ingest import sondar_midia, video_no_formato_final
+
+logger = logging.getLogger(__name__)
+
+VERSAO_CACHE_CENAS = "1"
+
+# Probabilidade de usar uma cena em cache quando ela existe (0 = sempre buscar nova)
+CENAS_CACHE_REUSO = getattr(settings, "CENAS_CACHE_REUSO", 0.7)
+# Quantas imagens diferentes cada prompt pode ter no cache
+CENAS_CACHE_VARIANTES = getattr(settings, "CENAS_CACHE_VARIANTES", 3)
+# Duração máxima guardada de cada clipe do Pexels (o grafo faz loop se precisar)
+CENAS_CACHE_CLIPE_MAX_SEGUNDOS = getattr(settings, "CENAS_CACHE_CLIPE_MAX_SEGUNDOS", 20)
+
+cache_cenas = CacheDisco(
+    nome="cenas",
+    diretorio=os.path.join(getattr(settings, "CACHE_LOCAL_DIR", os.path.join(settings.BASE_DIR, "cache")), "cenas"),
+    tamanho_max_bytes=getattr(settings, "CENAS_CACHE_MAX_MB", 4096) * 1024 * 1024,
+    prefixo_r2="cache/cenas" if getattr(settings, "CENAS_CACHE_R2", False) and r2_configurado() else None,
+)
+
+
+def normalizar_prompt(prompt):
+    """Minúsculas, sem acentos/pontuação e com espaços únicos."""
+    texto = unicodedata.normalize("NFKD", prompt or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9\s]", " ", texto.lower())).strip()
+
+
+def _reusar():
+    return random.random() < CENAS_CACHE_REUSO
+
+
+# --- Imagens (Pollinations/Flux) ---------------------------------------------
+
+def chave_imagem(prompt, variante):
+    return hash_conteudo("imagem", VERSAO_CACHE_CENAS, normalizar_prompt(prompt), str(variante))
+
+
+def obter_imagem(prompt, temp_dir):
+    """
+    Retorna (variante, caminho). `caminho` é uma cópia em `temp_dir` quando a cena
+    sai do cache; None significa que o chamador deve gerar a imagem e depois chamar
+    `guardar_imagem` com a mesma variante.
+    """
+    variante = random.randrange(max(1, CENAS_CACHE_VARIANTES))
+    if not _reusar():
+        return variante, None
+    chave = chave_imagem(prompt, variante)
+    caminho = cache_cenas.obter(chave, ".jpg")
+    if not caminho:
+        return variante, None
+    return variante, cache_cenas.copiar_para_temp(caminho, ".jpg", diretorio=temp_dir)
+
+
+def guardar_imagem(prompt, variante, caminho):
+    try:
+        cache_cenas.guardar(chave_imagem(prompt, variante), ".jpg", caminho)
+    except OSError as e:
+        logger.warning(f"Falha ao guardar imagem no cache de cenas: {e}")
+
+
+# --- Clipes (Pexels) -----------------------------------------------------------
+
+def chave_clipe_pexels(video_id):
+    return hash_conteudo("pexels", VERSAO_CACHE_CENAS, str(video_id), f"{LARGURA}x{ALTURA}@{FPS}")
+
+
+def escolher_video_pexels(videos):
+    """Prefere (com probabilidade CENAS_CACHE_REUSO) um dos resultados que já está no cache local."""
+    em_cache = [v for v in videos if cache_cenas.contem_local(chave_clipe_pexels(v.get("id")), ".mp4")]
+    if em_cache and _reusar():
+        return random.choice(em_cache)
+    return random.choice(videos)
+
+
+def obter_clipe_pexels(video_id, temp_dir):
+    caminho = cache_cenas.obter(chave_clipe_pexels(video_id), ".mp4")
+    if not caminho:
+        return None
+    return cache_cenas.copiar_para_temp(caminho, ".mp4", diretorio=temp_dir)
+
+
+def _clipe_no_formato_final(caminho_bruto):
+    """ffprobe do clipe (arquivo ou URL): True se já é H.264 1080x1920/30 fps yuv420p."""
+    try:
+        return video_no_formato_final(sondar_midia(caminho_bruto))
+    except (subprocess.SubprocessError, OSError, ValueError) as e:
+        logger.debug(f"ffprobe do clipe falhou ({e}); normalizando.")
+        return False
+
+
+def normalizar_e_guardar_clipe(video_id, caminho_bruto, temp_dir):
+    """
+    Converte o download cru para o intermediário 1080x1920/30 fps, guarda no cache
+    e retorna o caminho normalizado (ou o cru, se a conversão falhar).
+    `caminho_bruto` também pode ser a URL do vídeo: o ffmpeg lê por HTTP (com Range),
+    sem o arquivo cru passar pelo disco.
+    Se o clipe já estiver no formato final, o vídeo é só copiado (sem recodificar).
+    """
+    e_url = caminho_bruto.startswith(("http://", "https://"))
+    fd, caminho_normalizado = tempfile.mkstemp(suffix=".mp4", dir=temp_dir)
+    os.close(fd)
+    entrada = ["-reconnect", "1", "-reconnect_streamed", "1", "-rw_timeout", "30000000"] if e_url else []
+    if _clipe_no_formato_final(caminho_bruto):
+        video = ["-c:v", "copy"]
+    else:
+        video = [
+            "-vf", f"scale={LARGURA}:{ALTURA}:force_original_aspect_ratio=increase,crop={LARGURA}:{ALTURA},fps={FPS},setsar=1,format=yuv420p",
+            *PERFIL_CLIPE_CACHE.args_video(),
+        ]
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error", *entrada, "-i", caminho_bruto,
+        "-t", str(CENAS_CACHE_CLIPE_MAX_SEGUNDOS), "-an", *video, "-movflags", "+faststart",
+        caminho_normalizado,
+    ]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, stdin=subprocess.DEVNULL, timeout=300)
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"Falha ao normalizar clipe Pexels {video_id}: {e}")
+        os.remove(caminho_normalizado)
+        return caminho_bruto
+
+    try:
+        cache_cenas.guardar(chave_clipe_pexels(video_id), ".mp4", caminho_normalizado)
+    except OSError as e:
+        logger.warning(f"Falha ao guardar clipe no cache de cenas: {e}")
+    if not e_url:
+        os.remove(caminho_bruto)
+    return caminho_normalizado
@@ -0,0 +1,233 @@
+"""
+Roteiro visual das cenas de fundo (termos de busca do Pexels ou descrições para o Flux).
+
+Uma única chamada ao LLM do Pollinations, pedindo JSON estruturado, com cache por
+hash da história. Se a chamada demorar mais que ROTEIRO_TIMEOUT_SEGUNDOS (ou falhar),
+usa na hora um roteiro local: palavras-chave (TF-IDF sobre trechos da história) para
+o Pexels, que aceita buscas em português, e descrições genéricas em inglês para o
+Flux. A chamada remota continua em segundo plano e alimenta o cache para a próxima vez.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from dataclasses import dataclass, field
+from typing import List
+
+from django.conf import settings
+
+from . import http_client
+from .cache_utils import CacheDisco, hash_conteudo
+
+logger = logging.getLogger(__name__)
+
+VERSAO_ROTEIRO = "1"
+
+ROTEIRO_LLM_URL = getattr(settings, "ROTEIRO_LLM_URL", "https://gen.pollinations.ai/v1/chat/completions")
+ROTEIRO_LLM_MODELO = getattr(settings, "ROTEIRO_LLM_MODELO", "openai")
+# Quanto esperamos pelo LLM antes de usar o roteiro local
+ROTEIRO_TIMEOUT_SEGUNDOS = getattr(settings, "ROTEIRO_TIMEOUT_SEGUNDOS", 8)
+
+ESTILO_PEXELS = "pexels"
+ESTILO_IMAGEM = "imagem"
+
+cache_roteiros = CacheDisco(
+    nome="roteiros",
+    diretorio=os.path.join(getattr(settings, "CACHE_LOCAL_DIR", os.path.join(settings.BASE_DIR, "cache")), "roteiros"),
+    tamanho_max_bytes=16 * 1024 * 1024,
+)
+
+# Chamadas remotas que passaram do tempo seguem aqui, sem segurar o vídeo.
+# Criado no primeiro uso (não no import, que acontece também no web e antes do fork)
+_executor = None
+_executor_lock = threading.Lock()
+
+INSTRUCOES = {
+    ESTILO_PEXELS: (
+        "Create exactly {n} short English search terms (1-2 words each) for a stock video site, "
+        "following the chronological flow of the story."
+    ),
+    ESTILO_IMAGEM: (
+        "Create exactly {n} highly visual scene descriptions in English, following the chronological "
+        "flow of the story. Focus on environments, characters and atmosphere."
+    ),
+}
+
+# Roteiro de imagens sem o LLM: o Flux entende inglês, e palavras-chave em português
+# geram imagens piores que uma cena genérica bem descrita
+CENAS_GENERICAS_IMAGEM = [
+    "mystical dark forest with soft volumetric light",
+    "ancient city street at dusk, warm lanterns",
+    "vast mountain landscape under a dramatic sky",
+    "lonely figure walking along a misty road",
+    "candlelit room with old books and long shadows",
+    "stormy ocean waves crashing against cliffs",
+    "quiet village at night under a starry sky",
+    "sunlight breaking through clouds over golden fields",
+    "abandoned castle ruins covered in ivy",
+    "glowing lake reflecting the moon",
+]
+
+STOPWORDS_PT = set("""
+a à ao aos as às até com como da das de dela dele deles depois do dos e é ela elas ele eles em
+entre era eram essa essas esse esses esta estas este estes eu foi foram há isso isto já lhe lhes
+mais mas me mesmo meu minha muito na nas nem no nos nós o os ou para pela pelas pelo pelos por
+porque quando que quem se sem ser seu seus só sua suas também te tem tinha um uma umas uns você
+vocês ainda então onde sobre sempre nunca cada todo toda todos todas outro outra outros outras
+aqui ali lá assim agora vai vou ser sido está estão estava estavam ter tinham havia pode podia
+disse diz fez faz ficou fica seria seja sejam num numa dum duma pra pro coisa coisas vez vezes
+""".split())
+
+
+@dataclass
+class RoteiroCenas:
+    """Cenas planejadas e o idioma delas ('en' do LLM ou genéricas, 'pt' das palavras-chave locais)."""
+    cenas: List[str] = field(default_factory=list)
+    idioma: str = "en"
+    origem: str = "llm"
+
+
+# --- Chamada remota --------------------------------------------------------------
+
+def _obter_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="roteiro")
+        return _executor
+
+
+def _pedir_ao_llm(texto, quantidade, estilo):
+    api_key = os.getenv("POLLINATIONS_API_KEY")
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    corpo = {
+        "model": ROTEIRO_LLM_MODELO,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {
+                "role": "system",
+                "content": INSTRUCOES[estilo].format(n=quantidade)
+                + ' Answer ONLY with JSON in the form {"cenas": ["...", "..."]}.',
+            },
+            {"role": "user", "content": texto[:1500]},
+        ],
+    }
+    resp = http_client.post(ROTEIRO_LLM_URL, json=corpo, headers=headers, timeout=(5, 40))
+    resp.raise_for_status()
+    conteudo = resp.json()["choices"][0]["message"]["content"]
+    dados = json.loads(conteudo)
+    cenas = dados.get("cenas") if isinstance(dados, dict) else dados
+    cenas = [str(c).strip() for c in (cenas or []) if str(c).strip()]
+    if not cenas:
+        raise ValueError("LLM retornou um roteiro vazio")
+    return cenas[:quantidade]
+
+
+def _chave(texto, quantidade, estilo):
+    return hash_conteudo(VERSAO_ROTEIRO, estilo, str(quantidade), texto[:1500])
+
+
+def _ler_cache(chave):
+    caminho = cache_roteiros.obter(chave, ".roteiro")
+    if not caminho:
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_cache(chave, cenas):
+    fd, caminho_temp = tempfile.mkstemp(suffix=".roteiro")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cenas, f, ensure_ascii=False)
+        cache_roteiros.guardar(chave, ".roteiro", caminho_temp)
+    finally:
+        os.remove(caminho_temp)
+
+
+def _pedir_e_guardar(texto, quantidade, estilo, chave):
+    cenas = _pedir_ao_llm(texto, quantidade, estilo)
+    _gravar_cache(chave, cenas)
+    return cenas
+
+
+# --- Fallback local ------------------------------------------------------------
+
+def _tokens(texto):
+    texto = unicodedata.normalize("NFC", texto.lower())
+    return [t for t in re.findall(r"[^\W\d_]+", texto) if len(t) > 3 and t not in STOPWORDS_PT]
+
+
+def palavras_chave_locais(texto, quantidade, termos_por_cena=2):
+    """
+    Divide a história em `quantidade` trechos consecutivos e escolhe, para cada um,
+    os termos de maior TF-IDF (trechos como documentos), mantendo a ordem da narrativa.
+    """
+    tokens = _tokens(texto)
+    if not tokens:
+        return []
+    quantidade = max(1, min(quantidade, len(tokens)))
+    tamanho = math.ceil(len(tokens) / quantidade)
+    trechos = [tokens[i:i + tamanho] for i in range(0, len(tokens), tamanho)][:quantidade]
+
+    documentos_com_termo = Counter()
+    for trecho in trechos:
+        documentos_com_termo.update(set(trecho))
+    total = len(trechos)
+
+    cenas = []
+    usados = set()
+    for trecho in trechos:
+        frequencias = Counter(trecho)
+        pontuacao = {
+            termo: (freq / len(trecho)) * (math.log((1 + total) / (1 + documentos_com_termo[termo])) + 1)
+            for termo, freq in frequencias.items()
+        }
+        # Termos já usados em cenas anteriores vão para o fim, para variar as buscas
+        melhores = sorted(pontuacao, key=lambda t: (t in usados, -pontuacao[t]))[:termos_por_cena]
+        usados.update(melhores)
+        cenas.append(" ".join(melhores))
+    return cenas
+
+
+def cenas_genericas(quantidade):
+    """`quantidade` descrições de CENAS_GENERICAS_IMAGEM, em ordem e repetindo se preciso."""
+    return [CENAS_GENERICAS_IMAGEM[i % len(CENAS_GENERICAS_IMAGEM)] for i in range(quantidade)]
+
+
+# --- API -----------------------------------------------------------------------
+
+def planejar_cenas(texto, quantidade, estilo=ESTILO_IMAGEM):
+    """Retorna um RoteiroCenas com até `quantidade` cenas para a história."""
+    texto = (texto or "").strip()
+    if not texto:
+        return RoteiroCenas([], "en", "vazio")
+
+    chave = _chave(texto, quantidade, estilo)
+    em_cache = _ler_cache(chave)
+    if em_cache:
+        return RoteiroCenas(em_cache, "en", "cache")
+
+    futuro = _obter_executor().submit(_pedir_e_guardar, texto, quantidade, estilo, chave)
+    try:
+        cenas = futuro.result(timeout=ROTEIRO_TIMEOUT_SEGUNDOS)
+        logger.info(f"Roteiro de {len(cenas)} cenas gerado pelo LLM.")
+        return RoteiroCenas(cenas, "en", "llm")
+    except FuturesTimeout:
+        logger.warning(f"LLM do roteiro passou de {ROTEIRO_TIMEOUT_SEGUNDOS}s. Usando roteiro local.")
+    except Exception as e:
+        logger.warning(f"Falha ao gerar roteiro pelo LLM ({e}). Usando roteiro local.")
+
+    if estilo == ESTILO_IMAGEM:
+        return RoteiroCenas(cenas_genericas(quantidade), "en", "generico")
+    return RoteiroCenas(palavras_chave_locais(texto, quantidade), "pt", "local")
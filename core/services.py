@@ -4,19 +4,19 @@ import os
 import re
 import urllib.parse
 import time
-import requests
 import shutil
+import threading
 
 import logging
 import tempfile
 import subprocess
 import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import yt_dlp
 import numpy as np
-import torch
 import soundfile as sf
 from PIL import Image, ImageDraw, ImageFont
-from kokoro import KPipeline
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 
@@ -31,13 +31,50 @@ from .models import (
     CorteGerado,
 )
 from .utils import (
-    verificar_arquivo_existe_no_r2,
+    delete_from_r2,
     download_from_cloudflare,
     upload_to_r2,
     generate_thumbnail_from_video_r2,
     get_valid_media_from_category,
+    publicar_thumbnail_e_preview,
 )
-from .transcription_utils import get_word_timestamps, extract_audio_from_video, transcribe_audio_to_srt
+from .audio_utils import obter_audio_para_transcricao
+from .transcription_utils import (
+    TRANSCRICAO_REMOTA,
+    enfileirar_transcricao,
+    escrever_srt,
+    get_word_timestamps,
+    transcribe_audio_to_srt,
+)
+from .tts_utils import (
+    usar_pipeline,
+    obter_voz,
+    voz_em_memoria,
+    registrar_sintese,
+    alinhar_palavras_kokoro,
+    normalizar_texto_narracao,
+    chave_narracao,
+    cache_narracao,
+    KOKORO_SAMPLE_RATE,
+    VOZES_CUSTOM_DIR,
+)
+from .cache_utils import hash_conteudo
+from . import http_client, scene_cache
+from .asset_cache import obter_ativo
+from .scene_planner import ESTILO_IMAGEM, ESTILO_PEXELS, planejar_cenas
+from .encoder_profiles import PERFIL_SEGMENTO_CORTE, perfil_do_job
+from .ken_burns import FPS
+from .render_plan import (
+    Cena, PlanoRender, arquivo_temporario, buscar_cenas_em_paralelo, distribuir_duracao, entregar_arquivo,
+    renderizar_fundo,
+)
+
+# Vídeo inteiro (cenas, legendas, overlays, áudio e thumbnail) numa única execução do ffmpeg
+RENDER_PASSAGEM_UNICA = getattr(settings, "RENDER_PASSAGEM_UNICA", True)
+# Clipes do Pexels: o ffmpeg lê a URL direto ao normalizar, sem baixar o arquivo cru antes
+PEXELS_FFMPEG_DIRETO = getattr(settings, "PEXELS_FFMPEG_DIRETO", False)
+# Status do corte enquanto espera a transcrição (o callback só age nele)
+ETAPA_LEGENDAS_CORTE = "PROCESSANDO (2/4 - Gerando legendas)"
 
 logger = logging.getLogger(__name__)
 
@@ -76,62 +113,48 @@ FONT_PATHS = {
 def carregar_embedding_voz(pipeline, nome_voz):
     """
     Carrega o vetor da voz. Prioriza arquivos .npy personalizados.
-    Retorna o Tensor ou Numpy Array dos dados da voz.
+    Retorna o Tensor dos dados da voz, vindo do banco de vozes em memória (core.tts_utils).
     """
-    # 1. Tenta carregar arquivo personalizado (.npy)
-    path_custom = os.path.join(settings.BASE_DIR, 'core', 'voices_custom', f"{nome_voz}.npy")
-    
-    if os.path.exists(path_custom):
-        try:
-            logger.info(f"🎤 Carregando voz personalizada do disco: {nome_voz}")
-            return np.load(path_custom)
-        except Exception as e:
-            logger.error(f"Erro ao ler arquivo .npy {nome_voz}: {e}")
+    return obter_voz(pipeline, nome_voz)
+
 
-    # 2. Tenta carregar voz padrão do sistema Kokoro
+def _fator_velocidade(velocidade):
     try:
-        logger.info(f"🎤 Tentando carregar voz padrão: {nome_voz}")
-        # O load_voice do Kokoro retorna um Tensor se achar, ou baixa do HF
-        voice = pipeline.load_voice(nome_voz)
-        return voice
-    except Exception as e:
-        # 3. Fallback final
-        logger.warning(f"⚠️ Voz {nome_voz} não encontrada nem em disco nem no sistema. Usando 'pf_dora'. Erro: {e}")
-        return pipeline.load_voice('pf_dora')
+        return float(velocidade) / 100.0
+    except:
+        return 1.0
 
 
-def gerar_audio_e_tempos(texto, voz, velocidade, obter_tempos=False):
+def _carregar_voz_para_sintese(voz):
     """
-    Gera áudio a partir do texto usando o modelo Kokoro.
-    CORREÇÃO APLICADA: Injeta o embedding no pipeline e passa o NOME (string).
+    Retorna o Tensor da voz (do banco de vozes em memória).
+    Voz já carregada não espera o lock do pipeline (que pode estar sintetizando);
+    só a primeira carga de uma voz do Kokoro passa por ele.
     """
-    caminho_audio_final = None
-    
-    try:
-        # 1. Inicializa Pipeline (Português)
-        pipeline = KPipeline(lang_code="p", repo_id='hexgrad/Kokoro-82M')
-        
-        # 2. Carrega os dados brutos da voz (Array ou Tensor)
-        dados_da_voz = carregar_embedding_voz(pipeline, voz)
-        
+    tensor = voz_em_memoria(voz)
+    if tensor is not None:
+        return tensor
+    with usar_pipeline("p") as pipeline:
+        return carregar_embedding_voz(pipeline, voz)
+
+
+def sintetizar_em_blocos(texto, voz, dados_da_voz, speed_factor):
+    """
+    Gera (bloco_pcm, resultado) à medida que o Kokoro produz cada trecho do texto.
+    `bloco_pcm` é um array float32 mono a 24 kHz; `resultado` é o objeto do Kokoro
+    (grafemas, fonemas e durações previstas). Nada é acumulado em memória aqui.
+    """
+    tempo_sintese = 0.0
+    total_amostras = 0
+
+    # Usa o Pipeline (Português) já carregado neste processo
+    with usar_pipeline("p") as pipeline:
         # O Kokoro espera que passemos uma STRING como 'voice', não o array.
         # Mas para vozes customizadas ('br_imperador'), o pipeline não conhece esse nome.
         # Então injetamos manualmente os dados no dicionário interno do pipeline.
-        
-        # Garante que é um Tensor do PyTorch (Kokoro usa Torch internamente)
-        if isinstance(dados_da_voz, np.ndarray):
-            dados_da_voz = torch.from_numpy(dados_da_voz).float()
-            
-        # Injeta no dicionário de vozes do pipeline
         pipeline.voices[voz] = dados_da_voz
-        
-        # 3. Configura velocidade
-        try:
-            speed_factor = float(velocidade) / 100.0
-        except:
-            speed_factor = 1.0
 
-        # 4. Gera o áudio passando o NOME DA VOZ (String), pois agora ela existe no pipeline
+        # Gera o áudio passando o NOME DA VOZ (String), pois agora ela existe no pipeline
         generator = pipeline(
             texto, 
             voice=voz,  # <--- Passamos a STRING 'br_imperador', não o array
@@ -139,26 +162,125 @@ def gerar_audio_e_tempos(texto, voz, velocidade, obter_tempos=False):
             split_pattern=r"\n+"
         )
 
-        audio_segments = []
-        for i, (gs, ps, audio) in enumerate(generator):
-            audio_segments.append(audio)
-        
-        if not audio_segments:
-            raise Exception("Nenhum áudio foi gerado pelo pipeline.")
+        while True:
+            inicio = time.perf_counter()
+            try:
+                resultado = next(generator)
+            except StopIteration:
+                break
+            tempo_sintese += time.perf_counter() - inicio
+
+            gs, ps, audio = resultado
+            if audio is None:
+                continue
+            bloco = audio.numpy() if hasattr(audio, "numpy") else np.asarray(audio)
+            bloco = bloco.astype(np.float32, copy=False)
+            total_amostras += len(bloco)
+            yield bloco, resultado
+
+    registrar_sintese(tempo_sintese, total_amostras / KOKORO_SAMPLE_RATE)
+
 
-        full_audio = np.concatenate(audio_segments)
+def escrever_pcm_narracao(texto, voz, velocidade, destino):
+    """
+    Sintetiza o texto escrevendo PCM cru (f32le, 24 kHz, mono) em `destino`,
+    um arquivo binário aberto: o stdin de um ffmpeg ou um FIFO (os.mkfifo).
+    Assim a codificação acontece em paralelo com a síntese.
+    Retorna a duração em segundos, calculada pela contagem de amostras.
+    """
+    dados_da_voz = _carregar_voz_para_sintese(voz)
+    texto = normalizar_texto_narracao(texto)
+
+    total_amostras = 0
+    for bloco, _ in sintetizar_em_blocos(texto, voz, dados_da_voz, _fator_velocidade(velocidade)):
+        destino.write(bloco.tobytes())
+        total_amostras += len(bloco)
+    return total_amostras / KOKORO_SAMPLE_RATE
+
+
+def sintetizar_para_ffmpeg(texto, voz, velocidade, args_saida, timeout=300):
+    """
+    Sintetiza o texto direto para um ffmpeg (`args_saida` = opções de saída + arquivo).
+    Retorna a duração do áudio em segundos.
+    """
+    # -loglevel error: o stderr só é lido no final, então não pode encher o pipe
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-f", "f32le", "-ar", str(KOKORO_SAMPLE_RATE), "-ac", "1",
+        "-i", "pipe:0", *args_saida,
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        duracao = escrever_pcm_narracao(texto, voz, velocidade, proc.stdin)
+        proc.stdin.close()
+        _, stderr = proc.communicate(timeout=timeout)
+    except Exception:
+        proc.kill()
+        proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr.decode("utf-8", "replace"))
+    if duracao <= 0:
+        raise Exception("Nenhum áudio foi gerado pelo pipeline.")
+    return duracao
 
-        # 5. Salva o arquivo final
+
+def gerar_audio_e_tempos(texto, voz, velocidade, obter_tempos=False):
+    """
+    Gera áudio a partir do texto usando o modelo Kokoro.
+    CORREÇÃO APLICADA: Injeta o embedding no pipeline e passa o NOME (string).
+    O pipeline vem do registro por processo (core.tts_utils), sem recarregar o modelo,
+    e narrações repetidas (mesmo texto, voz e velocidade) saem direto do cache.
+    O WAV é escrito bloco a bloco, sem concatenar a forma de onda inteira na memória.
+    """
+    caminho_audio_final = None
+    
+    try:
+        # 1. Configura velocidade e voz
+        speed_factor = _fator_velocidade(velocidade)
+        texto = normalizar_texto_narracao(texto)
+        dados_da_voz = _carregar_voz_para_sintese(voz)
+
+        # 2. Consulta o cache de narrações antes de sintetizar
+        chave = chave_narracao(texto, dados_da_voz, speed_factor)
+        caminho_cache = cache_narracao.obter(chave, ".wav")
+        if caminho_cache:
+            metadados = cache_narracao.obter_metadados(chave)
+            caminho_audio_final = cache_narracao.copiar_para_temp(caminho_cache, ".wav")
+            duracao = metadados.get("duracao") or sf.info(caminho_audio_final).duration
+            timepoints = metadados.get("palavras") if obter_tempos else None
+            return caminho_audio_final, timepoints, duracao
+
+        # 3. Sintetiza gravando cada bloco direto no arquivo final
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_f:
             caminho_audio_final = temp_f.name
-        
-        sf.write(caminho_audio_final, full_audio, 24000)
 
-        # Calcula duração
-        info = sf.info(caminho_audio_final)
-        duracao = info.duration
+        total_amostras = 0
+        palavras = []
+        with sf.SoundFile(caminho_audio_final, mode="w", samplerate=KOKORO_SAMPLE_RATE, channels=1, subtype="PCM_16") as arquivo_wav:
+            for bloco, resultado in sintetizar_em_blocos(texto, voz, dados_da_voz, speed_factor):
+                arquivo_wav.write(bloco)
+                # Tempos por palavra saem das durações que o próprio Kokoro previu
+                try:
+                    palavras.extend(alinhar_palavras_kokoro(
+                        resultado, total_amostras / KOKORO_SAMPLE_RATE, len(bloco) / KOKORO_SAMPLE_RATE
+                    ))
+                except Exception as e:
+                    logger.warning(f"Falha ao alinhar palavras do trecho: {e}")
+                total_amostras += len(bloco)
+
+        if total_amostras == 0:
+            raise Exception("Nenhum áudio foi gerado pelo pipeline.")
+
+        # Duração pela contagem de amostras (sem reler o arquivo)
+        duracao = total_amostras / KOKORO_SAMPLE_RATE
         
-        timepoints = None
+        timepoints = palavras if obter_tempos else None
+
+        try:
+            cache_narracao.guardar(chave, ".wav", caminho_audio_final, metadados={"duracao": duracao, "palavras": palavras})
+        except Exception as e:
+            logger.warning(f"Não foi possível guardar a narração no cache: {e}")
 
         return caminho_audio_final, timepoints, duracao
 
@@ -171,226 +293,357 @@ def gerar_audio_e_tempos(texto, voz, velocidade, obter_tempos=False):
                 pass
         return None, None, 0
 
+# ==============================================================================
+# PREVIEWS DE VOZ (renderizados uma vez por voz)
+# ==============================================================================
+
+TEXTO_PREVIEW_VOZ = "Olá! Esta é uma demonstração da voz que você escolheu para o seu vídeo."
+PREVIEWS_VOZ_DIR = os.path.join(getattr(settings, "CACHE_LOCAL_DIR", os.path.join(settings.BASE_DIR, "cache")), "previews_voz")
+_previews_locks = {}
+_previews_locks_guard = threading.Lock()
+# Previews ainda não gerados são sintetizados fora da thread da requisição
+_previews_pendentes = set()
+_previews_executor = None
+# Falhas recentes (voz -> instante): sem nova síntese a cada poll do navegador
+_previews_falhas = {}
+PREVIEW_VOZ_FALHA_SEGUNDOS = getattr(settings, "PREVIEW_VOZ_FALHA_SEGUNDOS", 300)
+
+
+def versao_preview_voz(nome_voz):
+    """
+    Identificador estável do preview (usado no nome do arquivo e como ETag).
+    Muda quando o texto de demonstração ou o arquivo .npy da voz muda.
+    """
+    caminho_custom = os.path.join(VOZES_CUSTOM_DIR, f"{nome_voz}.npy")
+    mtime = str(os.path.getmtime(caminho_custom)) if os.path.exists(caminho_custom) else ""
+    return hash_conteudo(TEXTO_PREVIEW_VOZ, nome_voz, mtime)[:16]
+
+
+def caminho_preview_voz(nome_voz):
+    return os.path.join(PREVIEWS_VOZ_DIR, f"preview_{nome_voz}_{versao_preview_voz(nome_voz)}.mp3")
+
+
+def obter_preview_voz(nome_voz):
+    """
+    Retorna o MP3 de demonstração da voz, sintetizando-o apenas na primeira vez.
+    Chamadas seguintes não tocam no modelo TTS.
+    """
+    caminho_final = caminho_preview_voz(nome_voz)
+    if os.path.exists(caminho_final):
+        return caminho_final
+
+    with _previews_locks_guard:
+        lock = _previews_locks.setdefault(nome_voz, threading.Lock())
+
+    with lock:
+        if os.path.exists(caminho_final):
+            return caminho_final
+
+        os.makedirs(PREVIEWS_VOZ_DIR, exist_ok=True)
+        caminho_temp = f"{caminho_final}.{os.getpid()}.tmp.mp3"
+        try:
+            # A síntese alimenta o encoder MP3 diretamente, sem WAV intermediário
+            sintetizar_para_ffmpeg(
+                TEXTO_PREVIEW_VOZ, nome_voz, 100,
+                ["-c:a", "libmp3lame", "-b:a", "64k", caminho_temp],
+            )
+            os.replace(caminho_temp, caminho_final)
+        finally:
+            if os.path.exists(caminho_temp):
+                os.remove(caminho_temp)
+
+        # Remove versões antigas do preview desta voz
+        prefixo = f"preview_{nome_voz}_"
+        for arquivo in os.listdir(PREVIEWS_VOZ_DIR):
+            caminho = os.path.join(PREVIEWS_VOZ_DIR, arquivo)
+            if arquivo.startswith(prefixo) and ".tmp." not in arquivo and caminho != caminho_final:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+        logger.info(f"Preview da voz '{nome_voz}' renderizado em: {caminho_final}")
+        return caminho_final
+
+
+def _gerar_preview_em_segundo_plano(nome_voz):
+    try:
+        obter_preview_voz(nome_voz)
+    except Exception as e:
+        logger.error(f"Erro ao gerar preview de voz '{nome_voz}': {e}", exc_info=True)
+        with _previews_locks_guard:
+            _previews_falhas[nome_voz] = time.monotonic()
+    finally:
+        with _previews_locks_guard:
+            _previews_pendentes.discard(nome_voz)
+
+
+def preview_voz_falhou(nome_voz):
+    """True se a última síntese do preview falhou há menos de PREVIEW_VOZ_FALHA_SEGUNDOS."""
+    with _previews_locks_guard:
+        falhou_em = _previews_falhas.get(nome_voz)
+        if falhou_em is None:
+            return False
+        if time.monotonic() - falhou_em < PREVIEW_VOZ_FALHA_SEGUNDOS:
+            return True
+        del _previews_falhas[nome_voz]
+        return False
+
+
+def preview_voz_pronto(nome_voz):
+    """
+    True se o MP3 da voz já existe. Se não existe, agenda a síntese num thread
+    de fundo (uma por voz) e retorna False: a view responde 202 até ficar pronto.
+    Depois de uma falha, nada é agendado por PREVIEW_VOZ_FALHA_SEGUNDOS
+    (ver `preview_voz_falhou`; a view responde 500).
+    """
+    global _previews_executor
+    if os.path.exists(caminho_preview_voz(nome_voz)):
+        return True
+    if preview_voz_falhou(nome_voz):
+        return False
+    with _previews_locks_guard:
+        if nome_voz not in _previews_pendentes:
+            if _previews_executor is None:
+                _previews_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview_voz")
+            _previews_pendentes.add(nome_voz)
+            _previews_executor.submit(_gerar_preview_em_segundo_plano, nome_voz)
+    return False
+
 # ==============================================================================
 # FUNÇÕES DE TEXTO E IMAGEM
 # ==============================================================================
 # 
-def obter_video_pexels(texto, duracao_total, temp_dir):
-    """Busca múltiplos vídeos reais no Pexels para criar um fundo dinâmico que acompanha a história."""
+def escolher_rendicao_pexels(video_files, largura=1080, altura=1920):
+    """
+    Escolhe o menor MP4 que ainda cobre largura x altura depois do
+    scale(increase)+crop do grafo (ou seja, sem precisar ampliar).
+    Se nenhum cobrir, fica com o maior disponível.
+    """
+    mp4s = [
+        f for f in video_files
+        if f.get('link') and f.get('width') and f.get('height') and f.get('file_type', 'video/mp4') == 'video/mp4'
+    ]
+    if not mp4s:
+        return video_files[0] if video_files else None
+    suficientes = [f for f in mp4s if f['width'] >= largura and f['height'] >= altura]
+    if suficientes:
+        return min(suficientes, key=lambda f: f['width'] * f['height'])
+    return max(mp4s, key=lambda f: f['width'] * f['height'])
+
+
+def _baixar_cena_pexels(i, termo, num_clipes, headers, temp_dir, cancelado, locale=None):
+    """
+    Busca um termo no Pexels e baixa um dos vídeos encontrados (uma cena).
+    Desiste (retorna None) se `cancelado` for ligado pela busca em paralelo.
+    """
+    url_api = f"https://api.pexels.com/videos/search?query={urllib.parse.quote(termo)}&orientation=portrait&size=large&per_page=5"
+    if locale:
+        url_api += f"&locale={locale}"
+
+    resp = http_client.get(url_api, headers=headers, timeout=(5, 20))
+    if resp.status_code != 200:
+        return None
+    dados = resp.json()
+    
+    # Se o Pexels não achar nada com o termo da IA, tenta um termo genérico para não deixar buracos
+    if not dados.get('videos'):
+        termo_salva_vidas = random.choice(["cinematic video", "beautiful scenery", "dark background"])
+        resp = http_client.get(f"https://api.pexels.com/videos/search?query={urllib.parse.quote(termo_salva_vidas)}&orientation=portrait", headers=headers, timeout=(5, 20))
+        dados = resp.json()
+
+    if not dados.get('videos') or cancelado.is_set():
+        return None
+
+    # Pega um vídeo aleatório entre os primeiros resultados (de preferência um que já está no cache)
+    video_escolhido = scene_cache.escolher_video_pexels(dados['videos'])
+    video_id = video_escolhido.get('id')
+    caminho_cache = scene_cache.obter_clipe_pexels(video_id, temp_dir) if video_id else None
+    if caminho_cache:
+        logger.info(f"Cena {i+1}/{num_clipes} (Termo: {termo}) reaproveitada do cache (Pexels {video_id}).")
+        return Cena("video", caminho_cache)
+    
+    arquivo = escolher_rendicao_pexels(video_escolhido.get('video_files', []))
+    if not arquivo:
+        return None
+    video_url = arquivo['link']
+    logger.info(
+        f"Baixando cena {i+1}/{num_clipes} (Termo: {termo}, "
+        f"{arquivo.get('width')}x{arquivo.get('height')})..."
+    )
+
+    destino = os.path.join(temp_dir, f"pexels_{i:03d}.mp4")
+    if video_id and PEXELS_FFMPEG_DIRETO:
+        # O ffmpeg lê a URL direto e grava só o intermediário normalizado (sem o arquivo cru no disco)
+        caminho_normalizado = scene_cache.normalizar_e_guardar_clipe(video_id, video_url, temp_dir)
+        if caminho_normalizado != video_url:
+            caminho = entregar_arquivo(caminho_normalizado, destino, cancelado)
+            return Cena("video", caminho) if caminho else None
+        logger.warning(f"Leitura direta da cena {i+1} pelo ffmpeg falhou. Baixando o arquivo.")
+
+    # Baixa o vídeo cru em blocos (o timeout de leitura vale por bloco, não para o arquivo inteiro)
+    raw_vid = arquivo_temporario(temp_dir, ".mp4")
+    if not http_client.baixar_para_arquivo(video_url, raw_vid, timeout=(5, 30), cancelado=cancelado):
+        os.remove(raw_vid)
+        return None
+    
+    if os.path.getsize(raw_vid) == 0:
+        os.remove(raw_vid)
+        return None
+    if video_id:
+        # Guarda o intermediário 1080x1920/30 fps para os próximos vídeos com o mesmo clipe
+        raw_vid = scene_cache.normalizar_e_guardar_clipe(video_id, raw_vid, temp_dir)
+    caminho = entregar_arquivo(raw_vid, destino, cancelado)
+    return Cena("video", caminho) if caminho else None
+
+
+def buscar_cenas_pexels(texto, duracao_total, temp_dir):
+    """
+    Busca múltiplos vídeos reais no Pexels para criar um fundo dinâmico que acompanha a história.
+    Só baixa os clipes: a codificação fica a cargo do plano de renderização (core.render_plan).
+    """
     logger.info("Iniciando busca de múltiplos vídeos reais (Pexels)...")
     api_key = os.getenv("PEXELS_API_KEY")
     
     if not api_key:
         logger.error("ERRO: PEXELS_API_KEY não encontrada no .env")
-        return None
+        return []
 
     # 1. Define quantos vídeos vamos baixar (Ex: 1 clipe a cada 5 segundos, máximo de 6 para não estourar a API)
     num_clipes = max(3, min(int(duracao_total / 5), 6))
-    tempo_por_clipe = duracao_total / num_clipes
-
-    # 2. Pede para a IA criar as palavras-chave em inglês baseadas na progressão da história
-    prompt_ia = (
-        f"Based on this story, create exactly {num_clipes} short English search terms (1-2 words max) "
-        "for a stock video site. Represent the chronological flow of the story. "
-        "Return ONLY the terms separated by '|'. Example: dark forest|jumping fish|calm lake. "
-        f"Story: {texto[:1500]}"
-    )
-    
+
+    # 2. Roteiro com os termos de busca (LLM em JSON, com cache; palavras-chave locais se demorar)
+    roteiro = planejar_cenas(texto, num_clipes, ESTILO_PEXELS)
     termos_busca = []
-    try:
-        url_termo = f"https://gen.pollinations.ai/text/{urllib.parse.quote(prompt_ia)}"
-        resp_text = requests.get(url_termo, timeout=15).text.strip()
-        # Limpa e separa os termos gerados
-        termos_brutos = resp_text.split('|')
-        for t in termos_brutos:
-            t_limpo = re.sub(r'[^a-zA-Z\s]', '', t).strip()
-            if t_limpo:
-                termos_busca.append(t_limpo)
-    except Exception as e:
-        logger.warning(f"Falha ao gerar termos múltiplos: {e}")
+    for t in roteiro.cenas:
+        t_limpo = re.sub(r'[^\w\s]|\d|_', '', t).strip()
+        if t_limpo:
+            termos_busca.append(t_limpo)
+    # Termos extraídos do texto em português: o Pexels precisa saber o idioma da busca
+    locale_busca = "pt-BR" if roteiro.idioma == "pt" else None
+    locales = [locale_busca] * len(termos_busca)
 
     # Fallback: Se a IA falhar ou retornar menos termos, preenchemos com temas genéricos cinematográficos
     termos_fallback = ["cinematic nature", "urban city", "people walking", "abstract light", "beautiful landscape", "ocean waves"]
     if len(termos_busca) < num_clipes:
-        termos_busca.extend(termos_fallback[:num_clipes - len(termos_busca)])
+        faltando = termos_fallback[:num_clipes - len(termos_busca)]
+        termos_busca.extend(faltando)
+        locales.extend([None] * len(faltando))
     
-    termos_busca = termos_busca[:num_clipes]
-    logger.info(f"Termos de busca gerados para o Pexels ({len(termos_busca)} cenas): {termos_busca}")
+    termos_busca = list(zip(termos_busca, locales))[:num_clipes]
+    logger.info(f"Termos de busca gerados para o Pexels ({len(termos_busca)} cenas, roteiro: {roteiro.origem}): {termos_busca}")
 
     headers = {"Authorization": api_key}
-    video_clips = []
 
-    # 3. Baixa e corta cada vídeo para formar a sequência
-    for i, termo in enumerate(termos_busca):
-        url_api = f"https://api.pexels.com/videos/search?query={urllib.parse.quote(termo)}&orientation=portrait&size=large&per_page=5"
-        clip_path = os.path.join(temp_dir, f"pexels_clip_{i:03d}.mp4")
-        
-        try:
-            resp = requests.get(url_api, headers=headers, timeout=20)
-            if resp.status_code == 200:
-                dados = resp.json()
-                
-                # Se o Pexels não achar nada com o termo da IA, tenta um termo genérico para não deixar buracos
-                if not dados.get('videos'):
-                    termo_salva_vidas = random.choice(["cinematic video", "beautiful scenery", "dark background"])
-                    resp = requests.get(f"https://api.pexels.com/videos/search?query={urllib.parse.quote(termo_salva_vidas)}&orientation=portrait", headers=headers, timeout=20)
-                    dados = resp.json()
-
-                if dados.get('videos'):
-                    # Pega um vídeo aleatório entre os primeiros resultados
-                    video_escolhido = random.choice(dados['videos'])
-                    
-                    # Busca a qualidade HD
-                    hd_files = [f for f in video_escolhido['video_files'] if f['quality'] == 'hd' and f['width'] >= 720]
-                    video_url = hd_files[0]['link'] if hd_files else video_escolhido['video_files'][0]['link']
-                    
-                    # Baixa o vídeo cru
-                    logger.info(f"Baixando cena {i+1}/{num_clipes} (Termo: {termo})...")
-                    raw_vid = os.path.join(temp_dir, f"pexels_raw_{i:03d}.mp4")
-                    with open(raw_vid, 'wb') as f:
-                        f.write(requests.get(video_url, timeout=30).content)
-                    
-                    # Formata o vídeo (loop se for muito curto, corta no tempo exato, ajusta tamanho)
-                    raw_vid_clean = raw_vid.replace('\\', '/')
-                    clip_path_clean = clip_path.replace('\\', '/')
-                    
-                    cmd = [
-                        "ffmpeg", "-y", "-stream_loop", "-1", "-i", raw_vid_clean,
-                        "-t", f"{tempo_por_clipe:.2f}", 
-                        "-vf", "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920,format=yuv420p",
-                        "-c:v", "libx264", "-preset", "ultrafast", "-r", "30", clip_path_clean
-                    ]
-                    subprocess.run(cmd, check=True, capture_output=True)
-                    video_clips.append(clip_path)
-        except Exception as e:
-            logger.error(f"Erro na cena {i} (Pexels): {e}")
+    # 3. Baixa os vídeos da sequência em paralelo (o corte/ajuste de tamanho acontece no grafo do ffmpeg)
+    cenas = buscar_cenas_em_paralelo(
+        lambda i, item, cancelado: _baixar_cena_pexels(
+            i, item[0], len(termos_busca), headers, temp_dir, cancelado, locale=item[1]
+        ),
+        termos_busca, descricao="Pexels",
+    )
 
-    # 4. Junta todas as cenas em um único vídeo final
-    if not video_clips:
+    if not cenas:
         logger.error("Falha total: Nenhum vídeo pôde ser processado do Pexels.")
-        return None
+    return distribuir_duracao(cenas, duracao_total)
 
-    logger.info("Unindo cenas do Pexels...")
-    concat_file = os.path.join(temp_dir, "lista_pexels.txt")
-    with open(concat_file, "w", encoding="utf-8") as f:
-        for clip in video_clips:
-            caminho_limpo = clip.replace('\\', '/')
-            f.write(f"file '{caminho_limpo}'\n")
 
-    video_final_path = os.path.join(temp_dir, "fundo_pexels_sequencia.mp4")
-    
-    # Comando de concatenação ultra-rápido do FFmpeg
-    cmd_concat = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file, "-c", "copy", video_final_path]
-    subprocess.run(cmd_concat, check=True)
-    
+def obter_video_pexels(texto, duracao_total, temp_dir):
+    """Fundo Pexels já codificado num único arquivo (usado fora da passagem única)."""
+    cenas = buscar_cenas_pexels(texto, duracao_total, temp_dir)
+    if not cenas:
+        return None
+    logger.info("Unindo cenas do Pexels...")
+    video_final_path = renderizar_fundo(cenas, os.path.join(temp_dir, "fundo_pexels_sequencia.mp4"))
     logger.info("✓ Sequência dinâmica de vídeos Pexels gerada com sucesso!")
     return video_final_path
 
-def gerar_fundo_hibrido(texto, duracao_total, temp_dir, modo='imagem'):
+def buscar_cenas_hibrido(texto, duracao_total, temp_dir, modo='imagem'):
     """
     Função Maestro: Decide se vai chamar a API do Pexels (Vídeo Real) 
-    ou a API do Pollinations (Imagens IA c/ Ken Burns).
+    ou a API do Pollinations (Imagens IA c/ Ken Burns). Retorna as cenas, sem codificar.
     """
     if modo == 'video':
-        caminho_pexels = obter_video_pexels(texto, duracao_total, temp_dir)
-        if caminho_pexels:
-            return caminho_pexels
+        cenas = buscar_cenas_pexels(texto, duracao_total, temp_dir)
+        if cenas:
+            return cenas
         logger.warning("Pexels falhou ou não encontrou vídeo. Usando Pollinations Imagem como fallback.")
     
     # Se escolheu 'imagem' ou se o Pexels deu erro, cai na função de imagens que já criamos
-    return gerar_fundo_com_ia_pollinations(texto, duracao_total, temp_dir)
+    return buscar_cenas_pollinations(texto, duracao_total, temp_dir)
 
 
+def gerar_fundo_hibrido(texto, duracao_total, temp_dir, modo='imagem'):
+    """Mesma escolha de `buscar_cenas_hibrido`, mas entrega o fundo já codificado."""
+    cenas = buscar_cenas_hibrido(texto, duracao_total, temp_dir, modo)
+    return renderizar_fundo(cenas, os.path.join(temp_dir, "fundo_cenas.mp4"))
 
 
+def _gerar_cena_pollinations(i, prompt_en, total_cenas, api_key, temp_dir, cancelado):
+    """Gera uma imagem Flux para uma descrição de cena (None se `cancelado` for ligado)."""
+    variante, caminho_cache = scene_cache.obter_imagem(prompt_en, temp_dir)
+    if caminho_cache:
+        logger.info(f"Cena {i+1}/{total_cenas} reaproveitada do cache de imagens.")
+        return Cena("imagem", caminho_cache)
 
-def gerar_fundo_com_ia_pollinations(texto, duracao_total, temp_dir):
+    img_path = os.path.join(temp_dir, f"ia_raw_{i:03d}.jpg")
+    
+    # 🌟 O GRANDE SEGREDO: Injetamos modificadores de alta qualidade em cada cena!
+    prompt_premium = f"{prompt_en}, cinematic masterpiece, photorealistic, 8k resolution, highly detailed, dramatic lighting, epic movie scene, unreal engine 5 render, depth of field"
+    
+    # Continuamos usando o Flux gratuito do Pollinations
+    url_img = f"https://gen.pollinations.ai/image/{urllib.parse.quote(prompt_premium)}?model=flux&width=1080&height=1920&nologo=true&seed={random.randint(1,99999)}"
+    if api_key: url_img += f"&key={api_key}"
+
+    logger.info(f"Renderizando cena {i+1}/{total_cenas} (Ultra Qualidade)...")
+    resp = http_client.get(url_img, timeout=(5, 45))
+    if resp.status_code != 200:
+        return None
+    caminho_temp = arquivo_temporario(temp_dir, ".jpg")
+    with open(caminho_temp, 'wb') as f:
+        f.write(resp.content)
+    # A imagem já foi paga: fica no cache mesmo que a cena tenha sido descartada
+    scene_cache.guardar_imagem(prompt_en, variante, caminho_temp)
+    if not entregar_arquivo(caminho_temp, img_path, cancelado):
+        return None
+    return Cena("imagem", img_path)
+
+
+def buscar_cenas_pollinations(texto, duracao_total, temp_dir):
     """
     Versão Ultra Storytelling Cinematográfico: Gera até 10 cenas coordenadas por IA
-    com qualidade hiper-realista e efeito Ken Burns.
+    com qualidade hiper-realista. O efeito Ken Burns é aplicado no plano de renderização.
     """
     logger.info("Iniciando inteligência visual para 10 cenas cinematográficas...")
     api_key = os.getenv("POLLINATIONS_API_KEY")
-    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
 
     # --- PASSO 1: IA CRIA UM ROTEIRO DE 10 CENAS VISUAIS ---
-    # Aprimoramos o prompt para forçar descrições mais focadas em ambiente e atmosfera
-    prompt_roteirista = (
-        "Based on this story, create exactly 10 highly visual scene descriptions in ENGLISH. "
-        "Focus on environments, characters, and atmosphere. "
-        "Return ONLY the descriptions separated by '|'. "
-        f"Story: {texto[:1500]}"
-    )
-    
-    frases_visuais = []
-    try:
-        url_text = f"https://gen.pollinations.ai/text/{urllib.parse.quote(prompt_roteirista)}"
-        resp_text = requests.get(url_text, headers=headers, timeout=40)
-        if resp_text.status_code == 200:
-            frases_visuais = [f.strip() for f in resp_text.text.split('|') if len(f) > 5]
-            frases_visuais = frases_visuais[:10]
-            logger.info(f"Roteiro de {len(frases_visuais)} cenas identificadas com sucesso.")
-    except Exception as e:
-        logger.error(f"Falha ao gerar roteiro visual: {e}")
+    # Uma chamada em JSON, com cache por história; se o LLM demorar, cenas genéricas em inglês
+    roteiro = planejar_cenas(texto, 10, ESTILO_IMAGEM)
+    frases_visuais = [f for f in roteiro.cenas if len(f) > 5][:10]
+    logger.info(f"Roteiro de {len(frases_visuais)} cenas identificadas (origem: {roteiro.origem}).")
 
     if not frases_visuais:
         frases_visuais = ["mystical dark forest", "ancient ruined castle", "glowing magic lake"]
 
-    tempo_por_imagem = duracao_total / len(frases_visuais)
-    video_clips = []
-
-    # --- PASSO 2: RENDERIZAÇÃO HIPER-REALISTA COM FLUX ---
-    for i, prompt_en in enumerate(frases_visuais):
-        img_path = os.path.join(temp_dir, f"ia_raw_{i:03d}.jpg")
-        clip_path = os.path.join(temp_dir, f"ia_move_{i:03d}.mp4")
-        
-        # 🌟 O GRANDE SEGREDO: Injetamos modificadores de alta qualidade em cada cena!
-        prompt_premium = f"{prompt_en}, cinematic masterpiece, photorealistic, 8k resolution, highly detailed, dramatic lighting, epic movie scene, unreal engine 5 render, depth of field"
-        
-        # Continuamos usando o Flux gratuito do Pollinations
-        url_img = f"https://gen.pollinations.ai/image/{urllib.parse.quote(prompt_premium)}?model=flux&width=1080&height=1920&nologo=true&seed={random.randint(1,99999)}"
-        if api_key: url_img += f"&key={api_key}"
-
-        try:
-            logger.info(f"Renderizando cena {i+1}/{len(frases_visuais)} (Ultra Qualidade)...")
-            resp = requests.get(url_img, timeout=45)
-            if resp.status_code == 200:
-                with open(img_path, 'wb') as f:
-                    f.write(resp.content)
-                
-                total_frames = int(tempo_por_imagem * 30)
-                
-                # Ken Burns suave para manter a qualidade 8k sem pixelar
-                kb_filter = (
-                    f"scale=2160:3840,zoompan=z='min(zoom+0.001,1.15)':"
-                    f"d={total_frames}:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s=1080x1920,format=yuv420p"
-                )
-                
-                cmd_clip = [
-                    "ffmpeg", "-y", "-loop", "1", "-i", img_path,
-                    "-t", f"{tempo_por_imagem:.2f}",
-                    "-vf", kb_filter,
-                    "-c:v", "libx264", "-preset", "ultrafast", "-r", "30", clip_path
-                ]
-                subprocess.run(cmd_clip, check=True, capture_output=True)
-                video_clips.append(clip_path)
-        except Exception as e:
-            logger.error(f"Erro na cena {i}: {e}")
+    # --- PASSO 2: RENDERIZAÇÃO HIPER-REALISTA COM FLUX (cenas em paralelo) ---
+    cenas = buscar_cenas_em_paralelo(
+        lambda i, prompt_en, cancelado: _gerar_cena_pollinations(
+            i, prompt_en, len(frases_visuais), api_key, temp_dir, cancelado
+        ),
+        frases_visuais, descricao="Pollinations",
+    )
 
-    # --- PASSO 3: CONCATENAÇÃO FINAL ---
-    if not video_clips:
+    if not cenas:
         raise Exception("Nenhuma imagem pôde ser processada.")
+    return distribuir_duracao(cenas, duracao_total)
 
-    concat_file = os.path.join(temp_dir, "lista_videos.txt")
-    with open(concat_file, "w", encoding="utf-8") as f:
-        for clip in video_clips:
-            caminho_limpo = clip.replace('\\', '/')
-            f.write(f"file '{caminho_limpo}'\n")
 
-    video_final = os.path.join(temp_dir, "fundo_ia_10_cenas.mp4")
-    subprocess.run(["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file, "-c", "copy", video_final], check=True)
-    
-    return video_final
+def gerar_fundo_com_ia_pollinations(texto, duracao_total, temp_dir):
+    """Fundo de imagens IA já codificado num único arquivo (usado fora da passagem única)."""
+    cenas = buscar_cenas_pollinations(texto, duracao_total, temp_dir)
+    return renderizar_fundo(cenas, os.path.join(temp_dir, "fundo_ia_10_cenas.mp4"))
+
 
 def wrap_text_by_width(text, font, max_width, draw):
     """Wraps text to fit within a specified width, using the draw object."""
@@ -654,15 +907,17 @@ def processar_geracao_video(
         logger.info(f"[{video_gerado_id}] Tipo de conteúdo: {tipo_conteudo}, Duração: {duracao_video}s")
 
         caminho_narrador_input = None
+        tempos_narracao = None
         if (tipo_conteudo == "narrador" or tipo_conteudo == "vendedor") and data.get("narrador_texto"):
             logger.info(f"[{video_gerado_id}] Gerando áudio de narração...")
             texto_narrador_limpo = re.sub(r'{{{\d+}}}', '', data["narrador_texto"])
             
-            # Geração de áudio
-            caminho_narrador_input, _, duracao_audio = gerar_audio_e_tempos(
+            # Geração de áudio (com os tempos por palavra, se a legenda sincronizada foi pedida)
+            caminho_narrador_input, tempos_narracao, duracao_audio = gerar_audio_e_tempos(
                 texto_narrador_limpo,
                 data["narrador_voz"],
                 data["narrador_velocidade"],
+                obter_tempos=bool(data.get("legenda_sincronizada")),
             )
             
             if caminho_narrador_input:
@@ -677,7 +932,12 @@ def processar_geracao_video(
         if data.get("legenda_sincronizada") and caminho_narrador_input:
             logger.info(f"[{video_gerado_id}] Gerando legenda sincronizada...")
             try:
-                word_timestamps = get_word_timestamps(caminho_narrador_input)
+                # O texto é conhecido: usa os tempos do próprio Kokoro e só
+                # recorre ao Whisper se o alinhamento não estiver disponível.
+                word_timestamps = tempos_narracao
+                if not word_timestamps:
+                    logger.info(f"[{video_gerado_id}] Tempos do Kokoro indisponíveis, transcrevendo com Whisper...")
+                    word_timestamps = get_word_timestamps(caminho_narrador_input)
                 if word_timestamps:
                     caminho_legenda_ass = gerar_legenda_karaoke_ass(
                         word_timestamps, data, data.get("cor_da_fonte", "#FFFFFF"),
@@ -691,6 +951,8 @@ def processar_geracao_video(
                 logger.error(f"[{video_gerado_id}] Erro ao gerar legenda precisa: {e}", exc_info=True)
 
         caminho_video_input = None
+        cenas_fundo = None
+        video_base = None
         logger.info(f"[{video_gerado_id}] Obtendo vídeo de fundo...")
         
         if tipo_conteudo in ["narrador", "texto"]:
@@ -710,15 +972,19 @@ def processar_geracao_video(
                 caminhos_para_limpar.append(temp_dir_ia) # Adicionado para limpeza futura
                 
                 # 2. CHAMA A FUNÇÃO HÍBRIDA (Maestro) em vez de forçar o Pollinations
-                caminho_video_input = gerar_fundo_hibrido(texto_base, duracao_video, temp_dir_ia, modo=modo_visual)
+                cenas_fundo = buscar_cenas_hibrido(texto_base, duracao_video, temp_dir_ia, modo=modo_visual)
+                # Com a passagem única as cenas entram direto no grafo final e
+                # nenhum clipe intermediário é codificado
+                if not RENDER_PASSAGEM_UNICA:
+                    caminho_video_input = renderizar_fundo(cenas_fundo, os.path.join(temp_dir_ia, "fundo_cenas.mp4"))
+                    cenas_fundo = None
             else:
                 # Lógica existente: Baixa do Cloudflare R2
                 video_base_id = data.get("video_base_id")
-                video_base = None
                 if video_base_id:
                     try:
                         video_base = VideoBase.objects.get(id=video_base_id)
-                        if not verificar_arquivo_existe_no_r2(video_base.object_key):
+                        if not (video_base.object_key and video_base.disponivel):
                             logger.warning(f"[{video_gerado_id}] Vídeo escolhido (ID: {video_base_id}) não encontrado no R2. Selecionando um aleatório.")
                             video_base = None
                     except VideoBase.DoesNotExist:
@@ -738,7 +1004,7 @@ def processar_geracao_video(
                     raise Exception("Não foi possível encontrar um vídeo de fundo válido para a categoria.")
                 
                 logger.info(f"[{video_gerado_id}] Baixando vídeo de fundo: {video_base.object_key}")
-                caminho_video_input = download_from_cloudflare(video_base.object_key, ".mp4")
+                caminho_video_input = obter_ativo(video_base.object_key, ".mp4")
 
         elif tipo_conteudo == "vendedor":
             video_upload_key = data.get("video_upload_key")
@@ -748,7 +1014,9 @@ def processar_geracao_video(
             else:
                 raise Exception("Nenhuma 'video_upload_key' fornecida para o tipo 'vendedor'.")
         
-        if caminho_video_input:
+        if cenas_fundo:
+            logger.info(f"[{video_gerado_id}] {len(cenas_fundo)} cenas de fundo prontas para a renderização.")
+        elif caminho_video_input:
             logger.info(f"[{video_gerado_id}] Vídeo de fundo obtido em: {caminho_video_input}")
             # Se for do Pollinations, já está na pasta temp que será limpa, mas não faz mal adicionar
             caminhos_para_limpar.append(caminho_video_input)
@@ -773,7 +1041,7 @@ def processar_geracao_video(
                 musica_base = get_valid_media_from_category(MusicaBase, categoria_musica)
                 if musica_base:
                     logger.info(f"[{video_gerado_id}] Baixando música: {musica_base.object_key}")
-                    caminho_musica_input = download_from_cloudflare(musica_base.object_key, ".mp3")
+                    caminho_musica_input = obter_ativo(musica_base.object_key, ".mp3")
                     if caminho_musica_input:
                         logger.info(f"[{video_gerado_id}] Música obtida em: {caminho_musica_input}")
                         caminhos_para_limpar.append(caminho_musica_input)
@@ -785,86 +1053,44 @@ def processar_geracao_video(
         with tempfile.NamedTemporaryFile(delete=False, suffix="_temp.mp4") as temp_f:
             caminho_video_temp = temp_f.name
         caminhos_para_limpar.append(caminho_video_temp)
-
-        cmd = ["ffmpeg", "-y"]
-        if tipo_conteudo == "narrador" or data.get("loop_video", False):
-            cmd.extend(["-stream_loop", "-1", "-i", caminho_video_input])
+        with tempfile.NamedTemporaryFile(delete=False, suffix="_thumb.jpg") as temp_f:
+            caminho_thumbnail_temp = temp_f.name
+        caminhos_para_limpar.append(caminho_thumbnail_temp)
+
+        # Um único grafo: fundo -> legendas -> marca d'água -> texto, mais o áudio e a thumbnail
+        plano = PlanoRender()
+        if cenas_fundo:
+            plano.fundo_de_cenas(cenas_fundo)
         else:
-            cmd.extend(["-i", caminho_video_input])
-
-        inputs_adicionais = []
-        if caminho_musica_input: inputs_adicionais.append(caminho_musica_input)
-        if caminho_imagem_texto: inputs_adicionais.insert(0, caminho_imagem_texto)
-        if caminho_narrador_input: inputs_adicionais.append(caminho_narrador_input)
-        for f in inputs_adicionais:
-            if f: cmd.extend(["-i", f])
-
-        video_chain_parts = ["[0:v]scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:-1:-1,setsar=1[v_scaled]"]
-        current_stream = "[v_scaled]"
+            # Vídeos da biblioteca normalizados na ingestão dispensam scale/pad
+            plano.fundo_de_video(
+                caminho_video_input,
+                loop=tipo_conteudo == "narrador" or data.get("loop_video", False),
+                formato_final=bool(video_base and video_base.normalizado),
+            )
 
         if caminho_legenda_ass:
-            # Escapa o caminho do arquivo de legenda para o filtro do FFMPEG
-            escaped_ass_path = caminho_legenda_ass.replace('\\', '/').replace(':', '\\:')
-            video_chain_parts.append(f"{current_stream}ass=filename='{escaped_ass_path}'[v_subtitled]")
-            current_stream = "[v_subtitled]"
+            plano.legendas_ass(caminho_legenda_ass)
 
         if not assinatura_ativa:
             # Adiciona marca d'água para usuários não assinantes
-            video_chain_parts.append(f"{current_stream}drawtext=text='LUNDERON.COM':x=(w-text_w-10):y=(h-text_h-10):fontsize=32:fontcolor=white@0.5:shadowcolor=black@0.5:shadowx=2:shadowy=2[v_watermarked]")
-            current_stream = "[v_watermarked]"
+            plano.marca_dagua()
 
-        video_input_offset = 1
         if caminho_imagem_texto:
-            video_chain_parts.append(f"{current_stream}[{video_input_offset}:v]overlay=(W-w)/2:(H-h)/2[final_v]")
-            video_input_offset += 1
-        else:
-            video_chain_parts.append(f"{current_stream}copy[final_v]")
-        final_video_stream = "[final_v]"
-
-        audio_chain_parts = []
-        final_audio_stream = None
-        music_input_index, narrator_input_index = -1, -1
-        current_audio_input_index = video_input_offset
-        if caminho_musica_input:
-            music_input_index = current_audio_input_index
-            current_audio_input_index += 1
-        if caminho_narrador_input:
-            narrator_input_index = current_audio_input_index
-
-        if music_input_index != -1 and narrator_input_index != -1:
-            # Mixa a música de fundo com o narrador
-            volume_musica = data.get("volume_musica", 20) / 100.0
-            audio_chain_parts.append(f"[{music_input_index}:a]volume={volume_musica}[bg_audio]")
-            audio_chain_parts.append(f"[{narrator_input_index}:a][bg_audio]amix=inputs=2:duration=first:dropout_transition=3[aout]")
-            final_audio_stream = "[aout]"
-        elif music_input_index != -1:
-            # Apenas música de fundo
-            volume_musica = data.get("volume_musica", 50) / 100.0
-            audio_chain_parts.append(f"[{music_input_index}:a]volume={volume_musica}[aout]")
-            final_audio_stream = "[aout]"
-        elif narrator_input_index != -1:
-            # Apenas áudio do narrador
-            audio_chain_parts.append(f"[{narrator_input_index}:a]acopy[aout]")
-            final_audio_stream = "[aout]"
-
-        video_chain = ";".join(video_chain_parts)
-        if audio_chain_parts:
-            audio_chain = ";".join(audio_chain_parts)
-            cmd.extend(["-filter_complex", f"{video_chain};{audio_chain}"])
-        else:
-            cmd.extend(["-filter_complex", video_chain])
+            plano.sobrepor_imagem(caminho_imagem_texto)
 
-        cmd.extend(["-map", final_video_stream])
-        if final_audio_stream:
-            cmd.extend(["-map", final_audio_stream])
-        else:
-            cmd.extend(["-an"])
-        
-        cmd.extend(["-c:v", "libx264", "-preset", "fast", "-crf", "28", "-r", "30", "-pix_fmt", "yuv420p",
-                    "-c:a", "aac", "-b:a", "128k", "-t", str(duracao_video), caminho_video_temp])
+        # Mixando com o narrador a música fica mais baixa por padrão
+        volume_padrao = 20 if caminho_narrador_input else 50
+        plano.definir_audio(
+            caminho_musica_input, caminho_narrador_input, data.get("volume_musica", volume_padrao) / 100.0
+        )
 
-        logger.info(f"[{video_gerado_id}] Executando comando FFMPEG: {' '.join(cmd)}")
-        subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=300, stdin=subprocess.DEVNULL)
+        perfil = perfil_do_job(data, assinatura_ativa)
+        logger.info(f"[{video_gerado_id}] Perfil de codificação: {perfil.nome}")
+        plano.executar(
+            caminho_video_temp, duracao_video, perfil.args(FPS),
+            caminho_thumbnail=caminho_thumbnail_temp, prefixo_log=f"[{video_gerado_id}] ",
+        )
         logger.info(f"[{video_gerado_id}] FFMPEG concluído com sucesso.")
 
         object_key_r2 = f"videos_gerados/video_{user.id}_{random.randint(10000, 99999)}.mp4"
@@ -873,13 +1099,20 @@ def processar_geracao_video(
             raise Exception("Falha no upload do vídeo final para o Cloudflare R2.")
         logger.info(f"[{video_gerado_id}] Upload para R2 concluído.")
 
-        logger.info(f"[{video_gerado_id}] Gerando thumbnail...")
-        thumbnail_key = generate_thumbnail_from_video_r2(object_key_r2)
-        logger.info(f"[{video_gerado_id}] Thumbnail gerada: {thumbnail_key}")
+        # A thumbnail saiu da mesma execução do ffmpeg e a prévia vem do arquivo
+        # local; só baixa o vídeo de novo do R2 se a thumbnail faltar
+        thumbnail_key, preview_key = publicar_thumbnail_e_preview(
+            caminho_video_temp, object_key_r2, duracao_video, caminho_thumbnail_temp
+        )
+        if not thumbnail_key:
+            logger.info(f"[{video_gerado_id}] Gerando thumbnail a partir do R2...")
+            thumbnail_key = generate_thumbnail_from_video_r2(object_key_r2)
+        logger.info(f"[{video_gerado_id}] Thumbnail: {thumbnail_key}, prévia: {preview_key}")
 
         video.status = "CONCLUIDO"
         video.arquivo_final = object_key_r2
         video.thumbnail_key = thumbnail_key
+        video.preview_key = preview_key
         video.notificacao_vista = False
         video.save()
         logger.info(f"[{video_gerado_id}] Processamento concluído com SUCESSO.")
@@ -908,6 +1141,7 @@ def processar_geracao_video(
                 except OSError as err:
                     logger.error(f"[{video_gerado_id}] Erro ao remover arquivo/pasta temporária {caminho}: {err}")
         logger.info(f"[{video_gerado_id}] Limpeza de arquivos temporários finalizada.")
+        logger.info(f"[{video_gerado_id}] Latência das APIs externas neste worker: {http_client.metricas_http()}")
 
 
 def processar_corte_youtube(
@@ -923,8 +1157,6 @@ def processar_corte_youtube(
     caminho_video_segmento = None
     caminho_audio_extraido = None
     caminho_legenda_srt = None
-    caminho_video_local_final = None
-    caminho_musica_input = None
     caminhos_para_limpar = []
 
     try:
@@ -1008,16 +1240,7 @@ def processar_corte_youtube(
                 str(segment["end"]),
                 "-i",
                 caminho_video_full,
-                "-c:v",
-                "libx264",
-                "-preset",
-                "fast",
-                "-crf",
-                "23",
-                "-c:a",
-                "aac",
-                "-b:a",
-                "128k",
+                *PERFIL_SEGMENTO_CORTE.args(),
                 caminho_video_segmento,
             ]
             logger.info(
@@ -1043,148 +1266,233 @@ def processar_corte_youtube(
 
         # --- ETAPA 2: Gerar legendas (se solicitado) ---
         if gerar_legendas:
-            video.status = "PROCESSANDO (2/4 - Gerando legendas)"
+            video.status = ETAPA_LEGENDAS_CORTE
             video.save()
-            caminho_audio_extraido = extract_audio_from_video(caminho_video_segmento)
+            # Áudio direto da saída do ffmpeg para a memória (WAV em disco só como fallback)
+            audio_corte, caminho_audio_extraido = obter_audio_para_transcricao(caminho_video_segmento)
             caminhos_para_limpar.append(caminho_audio_extraido)
-            caminho_legenda_srt = transcribe_audio_to_srt(caminho_audio_extraido)
+            if TRANSCRICAO_REMOTA and _enviar_corte_para_transcricao(
+                audio_corte, caminho_video_segmento, corte_gerado_id, musica_base_id, volume_musica
+            ):
+                # O worker de transcrição retoma o corte em task_finalizar_corte_youtube
+                return
+            caminho_legenda_srt = transcribe_audio_to_srt(audio_corte)
             caminhos_para_limpar.append(caminho_legenda_srt)
 
-        # --- ETAPA 3: Processar vídeo final (redimensionar, música, legendas) ---
-        video.status = "PROCESSANDO (3/4 - Finalizando vídeo)"
-        video.save()
+        _finalizar_corte(
+            video, segment, caminho_video_segmento, caminho_legenda_srt,
+            musica_base_id, volume_musica, caminhos_para_limpar,
+        )
 
-        if musica_base_id:
-            musica_base = get_object_or_404(MusicaBase, id=musica_base_id)
-            caminho_musica_input = download_from_cloudflare(
-                musica_base.object_key, ".mp3"
-            )
-            if not caminho_musica_input:
-                raise Exception("Falha ao baixar a música de fundo.")
-            caminhos_para_limpar.append(caminho_musica_input)
-
-        nome_base = f"corte_{video.usuario.id}_{random.randint(10000, 99999)}"
-        nome_arquivo_final = f"{nome_base}.mp4"
-        caminho_video_local_final = os.path.join(
-            settings.MEDIA_ROOT, "videos_gerados", nome_arquivo_final
+    except Exception as e:
+        _registrar_erro_corte(video, corte_gerado_id, e)
+
+    finally:
+        _limpar_arquivos(caminhos_para_limpar)
+
+
+def _enviar_corte_para_transcricao(audio_corte, caminho_video_segmento, corte_gerado_id, musica_base_id, volume_musica):
+    """
+    Guarda o segmento no R2 e enfileira o áudio no worker de transcrição. O job
+    termina aqui: task_finalizar_corte_youtube retoma com as legendas. Retorna
+    False se não deu para enfileirar (o corte segue com a transcrição local).
+    """
+    from .tasks import task_finalizar_corte_youtube
+
+    segmento_key = f"cortes_temp/{uuid.uuid4().hex}{os.path.splitext(caminho_video_segmento)[1]}"
+    try:
+        if not upload_to_r2(caminho_video_segmento, segmento_key):
+            raise Exception("falha no upload do segmento")
+        enfileirar_transcricao(
+            audio_corte,
+            task_finalizar_corte_youtube.s(corte_gerado_id, musica_base_id, volume_musica, segmento_key),
         )
-        caminhos_para_limpar.append(caminho_video_local_final)
-        object_key_r2 = f"videos_gerados/{nome_arquivo_final}"
-        os.makedirs(os.path.dirname(caminho_video_local_final), exist_ok=True)
-
-        cmd = ["ffmpeg", "-y", "-i", caminho_video_segmento]
-        if caminho_musica_input:
-            cmd.extend(["-i", caminho_musica_input])
-
-        video_filters = "scale=720:1280:force_original_aspect_ratio=decrease,pad=720:1280:-1:-1,setsar=1"
-        if caminho_legenda_srt:
-            escaped_srt_path = caminho_legenda_srt.replace("\\", "/").replace(
-                ":", "\\:"
-            )
-            style_options = "FontName=impact,FontSize=9,PrimaryColour=&H00FFFFFF,Bold=-1,MarginV=60,BorderStyle=3,Outline=2,Shadow=1"
-            video_filters += (
-                f",subtitles='{escaped_srt_path}':force_style='{style_options}'"
-            )
+        return True
+    except Exception as e:
+        logger.warning(f"Transcrição remota indisponível ({e}). Transcrevendo localmente.")
+        delete_from_r2(segmento_key)
+        return False
 
-        filter_complex_parts = [f"[0:v]{video_filters}[v]"]
 
-        if caminho_musica_input:
-            volume_musica_decimal = float(volume_musica) / 100.0
-            audio_filters = (
-                f"[0:a]loudnorm[audio_original_norm]" 
-                f";[1:a]loudnorm[audio_musica_norm]" 
-                f";[audio_musica_norm]volume={volume_musica_decimal}[audio_musica_final]" 
-                f";[audio_original_norm][audio_musica_final]amix=inputs=2:duration=longest:dropout_transition=2[audio_mix]" 
-            )
-            filter_complex_parts.append(audio_filters)
-
-            filter_complex_str = ";".join(filter_complex_parts)
-            cmd.extend(
-                [
-                    "-filter_complex",
-                    filter_complex_str,
-                    "-map",
-                    "[v]",
-                    "-map",
-                    "[audio_mix]",
-                ]
-            )
-        else:  # Sem música
-            cmd.extend(["-vf", video_filters, "-map", "0:v", "-map", "0:a?"])
+def finalizar_corte_youtube(segmentos, corte_gerado_id, musica_base_id, volume_musica, segmento_key):
+    """
+    Continuação do corte depois da transcrição no worker dedicado: baixa o
+    segmento guardado no R2, grava o SRT e segue para as etapas 3 e 4.
+    `segmentos` é None quando a transcrição remota falhou (transcreve aqui).
+    Um callback repetido (pedido devolvido à fila depois de já atendido) não
+    mexe em cortes que já saíram da etapa 2.
+    """
+    corte_gerado = get_object_or_404(CorteGerado, pk=corte_gerado_id)
+    video = corte_gerado.video_gerado
+    segment = {"start": corte_gerado.start_time, "end": corte_gerado.end_time}
+    caminhos_para_limpar = []
+
+    if not (video.status or "").startswith(ETAPA_LEGENDAS_CORTE):
+        logger.warning(f"Corte {corte_gerado_id} já está em '{video.status}'; callback de transcrição ignorado.")
+        return
+
+    try:
+        caminho_video_segmento = download_from_cloudflare(segmento_key, os.path.splitext(segmento_key)[1])
+        if not caminho_video_segmento:
+            raise Exception("Falha ao baixar o segmento do corte para finalizar.")
+        caminhos_para_limpar.append(caminho_video_segmento)
+
+        if segmentos is None:
+            logger.warning(f"Transcrição remota do corte {corte_gerado_id} falhou. Transcrevendo localmente.")
+            audio_corte, caminho_audio_extraido = obter_audio_para_transcricao(caminho_video_segmento)
+            caminhos_para_limpar.append(caminho_audio_extraido)
+            caminho_legenda_srt = transcribe_audio_to_srt(audio_corte)
+        else:
+            caminho_legenda_srt = escrever_srt(segmentos) if segmentos else None
+        caminhos_para_limpar.append(caminho_legenda_srt)
+
+        _finalizar_corte(
+            video, segment, caminho_video_segmento, caminho_legenda_srt,
+            musica_base_id, volume_musica, caminhos_para_limpar,
+        )
+
+    except Exception as e:
+        _registrar_erro_corte(video, corte_gerado_id, e)
+
+    finally:
+        delete_from_r2(segmento_key)
+        _limpar_arquivos(caminhos_para_limpar)
+
+
+def _finalizar_corte(
+    video, segment, caminho_video_segmento, caminho_legenda_srt, musica_base_id, volume_musica, caminhos_para_limpar
+):
+    """Etapas 3 e 4 do corte: vídeo final (formato, música, legendas) e upload."""
+    caminho_musica_input = None
+
+    # --- ETAPA 3: Processar vídeo final (redimensionar, música, legendas) ---
+    video.status = "PROCESSANDO (3/4 - Finalizando vídeo)"
+    video.save()
+
+    if musica_base_id:
+        musica_base = get_object_or_404(MusicaBase, id=musica_base_id)
+        caminho_musica_input = obter_ativo(musica_base.object_key, ".mp3")
+        if not caminho_musica_input:
+            raise Exception("Falha ao baixar a música de fundo.")
+        caminhos_para_limpar.append(caminho_musica_input)
+
+    nome_base = f"corte_{video.usuario.id}_{random.randint(10000, 99999)}"
+    nome_arquivo_final = f"{nome_base}.mp4"
+    caminho_video_local_final = os.path.join(
+        settings.MEDIA_ROOT, "videos_gerados", nome_arquivo_final
+    )
+    caminhos_para_limpar.append(caminho_video_local_final)
+    object_key_r2 = f"videos_gerados/{nome_arquivo_final}"
+    os.makedirs(os.path.dirname(caminho_video_local_final), exist_ok=True)
+
+    cmd = ["ffmpeg", "-y", "-i", caminho_video_segmento]
+    if caminho_musica_input:
+        cmd.extend(["-i", caminho_musica_input])
+
+    video_filters = "scale=720:1280:force_original_aspect_ratio=decrease,pad=720:1280:-1:-1,setsar=1"
+    if caminho_legenda_srt:
+        escaped_srt_path = caminho_legenda_srt.replace("\\", "/").replace(
+            ":", "\\:"
+        )
+        style_options = "FontName=impact,FontSize=9,PrimaryColour=&H00FFFFFF,Bold=-1,MarginV=60,BorderStyle=3,Outline=2,Shadow=1"
+        video_filters += (
+            f",subtitles='{escaped_srt_path}':force_style='{style_options}'"
+        )
+
+    filter_complex_parts = [f"[0:v]{video_filters}[v]"]
+
+    if caminho_musica_input:
+        volume_musica_decimal = float(volume_musica) / 100.0
+        audio_filters = (
+            f"[0:a]loudnorm[audio_original_norm]" 
+            f";[1:a]loudnorm[audio_musica_norm]" 
+            f";[audio_musica_norm]volume={volume_musica_decimal}[audio_musica_final]" 
+            f";[audio_original_norm][audio_musica_final]amix=inputs=2:duration=longest:dropout_transition=2[audio_mix]" 
+        )
+        filter_complex_parts.append(audio_filters)
 
+        filter_complex_str = ";".join(filter_complex_parts)
         cmd.extend(
             [
-                "-c:v",
-                "libx264",
-                "-preset",
-                "fast",
-                "-crf",
-                "28",
-                "-r",
-                "30",
-                "-pix_fmt",
-                "yuv420p",
-                "-c:a",
-                "aac",
-                "-b:a",
-                "128k",
-                "-shortest",
-                caminho_video_local_final,
+                "-filter_complex",
+                filter_complex_str,
+                "-map",
+                "[v]",
+                "-map",
+                "[audio_mix]",
             ]
         )
+    else:  # Sem música
+        cmd.extend(["-vf", video_filters, "-map", "0:v", "-map", "0:a?"])
 
-        logger.info(f"Comando FFMPEG a ser executado: {' '.join(cmd)}")
-        try:
-            result = subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=300,
-                stdin=subprocess.DEVNULL,
-            )
-            if result.stdout:
-                logger.info(f"FFMPEG stdout: {result.stdout}")
-            if result.stderr:
-                logger.warning(f"FFMPEG stderr: {result.stderr}")
-        except subprocess.CalledProcessError as e:
-            logger.error(
-                f"FFMPEG falhou (returncode={e.returncode}). stdout: {e.stdout} stderr: {e.stderr}"
-            )
-            raise
+    assinatura = (
+        Assinatura.objects.filter(usuario=video.usuario, status="ativo")
+        .select_related("plano")
+        .first()
+    )
+    perfil = perfil_do_job(assinatura=assinatura)
+    logger.info(f"Perfil de codificação do corte: {perfil.nome}")
+    cmd.extend([*perfil.args(FPS), "-shortest", caminho_video_local_final])
 
-        # --- ETAPA 4: Upload para o R2 ---
-        video.status = "PROCESSANDO (4/4 - Enviando para nuvem)"
-        video.save()
+    logger.info(f"Comando FFMPEG a ser executado: {' '.join(cmd)}")
+    try:
+        result = subprocess.run(
+            cmd,
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=300,
+            stdin=subprocess.DEVNULL,
+        )
+        if result.stdout:
+            logger.info(f"FFMPEG stdout: {result.stdout}")
+        if result.stderr:
+            logger.warning(f"FFMPEG stderr: {result.stderr}")
+    except subprocess.CalledProcessError as e:
+        logger.error(
+            f"FFMPEG falhou (returncode={e.returncode}). stdout: {e.stdout} stderr: {e.stderr}"
+        )
+        raise
+
+    # --- ETAPA 4: Upload para o R2 ---
+    video.status = "PROCESSANDO (4/4 - Enviando para nuvem)"
+    video.save()
 
-        if not upload_to_r2(caminho_video_local_final, object_key_r2):
-            raise Exception("Falha no upload do corte para o Cloudflare R2.")
+    if not upload_to_r2(caminho_video_local_final, object_key_r2):
+        raise Exception("Falha no upload do corte para o Cloudflare R2.")
 
-        # Gerar e salvar a thumbnail
+    # Thumbnail e prévia a partir do arquivo local, ainda antes da limpeza
+    thumbnail_key, preview_key = publicar_thumbnail_e_preview(
+        caminho_video_local_final, object_key_r2, segment["end"] - segment["start"]
+    )
+    if not thumbnail_key:
         thumbnail_key = generate_thumbnail_from_video_r2(object_key_r2)
 
-        video.status = "CONCLUIDO"
-        video.arquivo_final = object_key_r2
-        video.thumbnail_key = thumbnail_key
-        video.mensagem_erro = None
-        video.save()
+    video.status = "CONCLUIDO"
+    video.arquivo_final = object_key_r2
+    video.thumbnail_key = thumbnail_key
+    video.preview_key = preview_key
+    video.mensagem_erro = None
+    video.save()
 
-    except Exception as e:
-        video.status = "ERRO"
-        video.mensagem_erro = str(e)
-        video.save()
 
-        logger.error(f"!!!!!!!!!! ERRO AO PROCESSAR CORTE (ID: {corte_gerado_id}) !!!!!!!!!!")
-        if isinstance(e, subprocess.CalledProcessError):
-            logger.error(f"--- ERRO FFMPEG (STDOUT) ---\n{e.stdout}")
-            logger.error(f"--- ERRO FFMPEG (STDERR) ---\n{e.stderr}")
-        else:
-            logger.error(f"Exceção: {e}")
+def _registrar_erro_corte(video, corte_gerado_id, e):
+    video.status = "ERRO"
+    video.mensagem_erro = str(e)
+    video.save()
 
-    finally:
-        for path in caminhos_para_limpar:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                except OSError as err:
-                    print(f"Erro ao remover arquivo temporário {path}: {err}")
\ No newline at end of file
+    logger.error(f"!!!!!!!!!! ERRO AO PROCESSAR CORTE (ID: {corte_gerado_id}) !!!!!!!!!!")
+    if isinstance(e, subprocess.CalledProcessError):
+        logger.error(f"--- ERRO FFMPEG (STDOUT) ---\n{e.stdout}")
+        logger.error(f"--- ERRO FFMPEG (STDERR) ---\n{e.stderr}")
+    else:
+        logger.error(f"Exceção: {e}")
+
+
+def _limpar_arquivos(caminhos):
+    for path in caminhos:
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as err:
+                print(f"Erro ao remover arquivo temporário {path}: {err}")
\ No newline at end of file
@@ -8,12 +8,14 @@ import tempfile
 import subprocess
 
 try:
-    import whisper
+    from .transcription_utils import get_whisper_model
 except ImportError:
     print(
-        "AVISO: Biblioteca whisper não encontrada. Instale com: pip install openai-whisper"
+        "AVISO: Biblioteca faster-whisper não encontrada. Instale com: pip install faster-whisper"
     )
-    whisper = None
+    get_whisper_model = None
+from .audio_utils import carregar_audio, extract_audio_from_video, obter_audio_para_transcricao
+from .vad_utils import detectar_fala, duracao_fala
 import json
 from typing import List, Dict, Tuple, Optional
 from django.conf import settings
@@ -23,16 +25,45 @@ import random
 class SubtitleProcessor:
     """Processador de legendas automáticas usando Whisper"""
 
-    def __init__(self):
-        # Carrega o modelo Whisper (pequeno para ser mais rápido)
-        if whisper is not None:
-            try:
-                self.model = whisper.load_model("large-v3")
-            except Exception as e:
-                print(f"Erro ao carregar modelo Whisper: {e}")
-                self.model = None
-        else:
-            self.model = None
+    def __init__(self, tarefa: str = "legendas"):
+        # O modelo não é carregado aqui: vem do registro compartilhado
+        # (core.transcription_utils) apenas no primeiro uso.
+        self.tarefa = tarefa
+
+    @property
+    def disponivel(self) -> bool:
+        return get_whisper_model is not None
+
+    @property
+    def model(self):
+        """Modelo faster-whisper compartilhado, carregado sob demanda."""
+        if not self.disponivel:
+            return None
+        try:
+            return get_whisper_model(self.tarefa)
+        except Exception as e:
+            print(f"Erro ao carregar modelo Whisper: {e}")
+            return None
+
+    def _transcrever(self, audio_path: str, word_timestamps: bool = False) -> Optional[Dict]:
+        """Transcreve com faster-whisper e devolve no formato {'segments': [...]}."""
+        model = self.model
+        if model is None:
+            return None
+
+        segments, info = model.transcribe(
+            audio_path, language="pt", word_timestamps=word_timestamps
+        )
+        resultado = {"language": info.language, "segments": []}
+        for segment in segments:
+            dados = {"start": segment.start, "end": segment.end, "text": segment.text}
+            if word_timestamps and segment.words:
+                dados["words"] = [
+                    {"word": w.word, "start": w.start, "end": w.end}
+                    for w in segment.words
+                ]
+            resultado["segments"].append(dados)
+        return resultado
 
     def extract_audio_from_video(self, video_path: str) -> str:
         """
@@ -48,38 +79,9 @@ class SubtitleProcessor:
             print(f"Erro: Arquivo de vídeo não encontrado: {video_path}")
             return None
 
-        # Cria arquivo temporário para o áudio
-        audio_temp_dir = os.path.join(settings.MEDIA_ROOT, "audio_temp")
-        os.makedirs(audio_temp_dir, exist_ok=True)
-
-        audio_path = os.path.join(
-            audio_temp_dir, f"extracted_audio_{random.randint(1000, 9999)}.wav"
-        )
-
-        # Comando FFmpeg para extrair áudio
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            video_path,
-            "-vn",  # Sem vídeo
-            "-acodec",
-            "pcm_s16le",  # Codec de áudio
-            "-ar",
-            "16000",  # Sample rate para Whisper
-            "-ac",
-            "1",  # Mono
-            audio_path,
-        ]
-
         try:
-            subprocess.run(
-                cmd, check=True, capture_output=True, text=True, encoding="utf-8"
-            )
-            return audio_path
-        except subprocess.CalledProcessError as e:
-            print(f"Erro ao extrair áudio: {e}")
-            print(f"STDERR: {e.stderr}")
+            return extract_audio_from_video(video_path)
+        except subprocess.CalledProcessError:
             return None
         except FileNotFoundError:
             print(
@@ -87,33 +89,45 @@ class SubtitleProcessor:
             )
             return None
 
+    def extract_audio_pcm(self, video_path: str) -> Optional[Tuple[object, Optional[str]]]:
+        """
+        Extrai o áudio direto para a memória (array float32 16 kHz), caindo para
+        um WAV temporário se necessário.
+
+        Returns:
+            (audio, caminho_temporario) — o caminho é None quando não houve arquivo
+        """
+        if not os.path.exists(video_path):
+            print(f"Erro: Arquivo de vídeo não encontrado: {video_path}")
+            return None
+
+        try:
+            return obter_audio_para_transcricao(video_path)
+        except Exception as e:
+            print(f"Erro ao extrair áudio: {e}")
+            return None
+
     def transcribe_audio(self, audio_path: str) -> Optional[Dict]:
         """
         Transcreve áudio usando Whisper
 
         Args:
-            audio_path: Caminho para o arquivo de áudio
+            audio_path: Caminho para o arquivo de áudio ou array PCM de 16 kHz
 
         Returns:
             Resultado da transcrição com timestamps
         """
-        if self.model is None:
+        if not self.disponivel:
             print("Erro: Modelo Whisper não carregado")
             return None
 
-        if not os.path.exists(audio_path):
+        if isinstance(audio_path, str) and not os.path.exists(audio_path):
             print(f"Erro: Arquivo de áudio não encontrado: {audio_path}")
             return None
 
         try:
             # Transcreve com timestamps de palavras
-            result = self.model.transcribe(
-                audio_path,
-                language="pt",  # Português
-                word_timestamps=True,
-                verbose=False,
-            )
-            return result
+            return self._transcrever(audio_path, word_timestamps=True)
         except Exception as e:
             print(f"Erro na transcrição: {e}")
             return None
@@ -270,22 +284,23 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         Returns:
             Caminho para o arquivo de legenda gerado ou None se houver erro
         """
-        if self.model is None:
+        if not self.disponivel:
             print("Erro: Modelo Whisper não disponível")
             return None
 
         audio_path = None
         try:
             print(f"Extraindo áudio de: {video_path}")
-            # 1. Extrai áudio do vídeo
-            audio_path = self.extract_audio_from_video(video_path)
-            if not audio_path:
+            # 1. Extrai áudio do vídeo (em memória; WAV temporário só no fallback)
+            extraido = self.extract_audio_pcm(video_path)
+            if not extraido:
                 print("Falha na extração de áudio")
                 return None
+            audio, audio_path = extraido
 
-            print(f"Transcrevendo áudio: {audio_path}")
+            print("Transcrevendo áudio")
             # 2. Transcreve o áudio
-            transcription = self.transcribe_audio(audio_path)
+            transcription = self.transcribe_audio(audio)
             if not transcription:
                 print("Falha na transcrição")
                 return None
@@ -326,25 +341,16 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         Returns:
             True se o vídeo tem fala suficiente
         """
-        if self.model is None:
-            print("Erro: Modelo Whisper não disponível")
-            return False
-
         audio_path = None
         try:
             # Extrai áudio
-            audio_path = self.extract_audio_from_video(video_path)
-            if not audio_path:
+            extraido = self.extract_audio_pcm(video_path)
+            if not extraido:
                 return False
+            audio, audio_path = extraido
 
-            # Transcreve apenas para verificar
-            result = self.model.transcribe(audio_path, language="pt")
-
-            # Calcula duração total de fala
-            total_speech_duration = 0
-            for segment in result.get("segments", []):
-                total_speech_duration += segment["end"] - segment["start"]
-
+            # VAD sobre o PCM: não precisa transcrever para saber se há fala
+            total_speech_duration = duracao_fala(detectar_fala(carregar_audio(audio)))
             return total_speech_duration >= min_speech_duration
 
         except Exception as e:
@@ -358,7 +364,7 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
                     pass
 
 
-# Instância global do processador
+# Instância global do processador (barata: o modelo só carrega no primeiro uso)
 try:
     subtitle_processor = SubtitleProcessor()
 except Exception as e:
@@ -1,8 +1,45 @@
 from celery import shared_task
+from celery.signals import worker_process_init, worker_ready
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _aquecer_tts():
+    if not getattr(settings, "KOKORO_AQUECER_WORKER", True):
+        return
+    from .tts_utils import aquecer_pipelines
+    logger.info("Aquecendo pipelines Kokoro do worker...")
+    aquecer_pipelines()
+
+
+def _aquecer_whisper():
+    if not getattr(settings, "WHISPER_AQUECER_WORKER", False):
+        return
+    from .transcription_utils import get_whisper_model
+    logger.info("Aquecendo modelos Whisper do worker de transcrição...")
+    for tarefa in ("transcricao", "palavras"):
+        get_whisper_model(tarefa)
+
+
+@worker_process_init.connect
+def aquecer_worker_prefork(**kwargs):
+    """Pool prefork: cada processo filho carrega o modelo antes de receber tarefas."""
+    _aquecer_tts()
+    _aquecer_whisper()
+
+
+@worker_ready.connect
+def aquecer_worker_solo(sender=None, **kwargs):
+    """Pools solo/threads executam as tarefas no próprio processo principal."""
+    from celery.concurrency.solo import TaskPool as SoloPool
+    from celery.concurrency.thread import TaskPool as ThreadPool
+
+    if isinstance(getattr(sender, "pool", None), (SoloPool, ThreadPool)):
+        _aquecer_tts()
+        _aquecer_whisper()
+
 @shared_task(bind=True)
 def task_processar_geracao_video(self, video_gerado_id, data, user_id, assinatura_id, limite_testes_config=0, **kwargs):
     """
@@ -47,4 +84,57 @@ def task_processar_corte_youtube(self, corte_gerado_id, musica_base_id, volume_m
     except Exception as e:
         logger.error(f"ERRO na task_processar_corte_youtube para o ID {corte_gerado_id}: {e}", exc_info=True)
         # Tenta novamente em 60 segundos, no máximo 3 vezes
-        self.retry(exc=e, countdown=60, max_retries=3)
\ No newline at end of file
+        self.retry(exc=e, countdown=60, max_retries=3)
+
+
+@shared_task
+def task_transcrever_lote():
+    """
+    Tarefa da fila 'transcricao', atendida por um worker de vida longa
+    (`celery -A gerador_videos worker -Q transcricao --pool=solo`) que mantém o
+    modelo Whisper carregado. Transcreve em lote todos os pedidos pendentes
+    (ver transcription_utils.enfileirar_transcricao) e dispara os callbacks.
+    Com TRANSCRICAO_REMOTA, o beat também a agenda periodicamente para esvaziar
+    pedidos cujo gatilho falhou e recuperar os abandonados por um worker morto.
+    """
+    from .transcription_utils import processar_pedidos_transcricao
+
+    atendidos = processar_pedidos_transcricao()
+    logger.info(f"Pedidos de transcrição atendidos: {atendidos}")
+    return atendidos
+
+
+@shared_task
+def task_finalizar_corte_youtube(segmentos, corte_gerado_id, musica_base_id, volume_musica, segmento_key):
+    """
+    Callback do worker de transcrição: termina o corte (etapas 3 e 4) com os
+    segmentos da legenda, sem que o job original fique esperando.
+    """
+    from .services import finalizar_corte_youtube
+
+    logger.info(f"Retomando o corte {corte_gerado_id} após a transcrição")
+    finalizar_corte_youtube(segmentos, corte_gerado_id, musica_base_id, volume_musica, segmento_key)
+
+
+@shared_task
+def task_ingerir_midia(tipo, midia_id):
+    """
+    Ingestão de um upload da biblioteca (ffprobe + normalização), fora da
+    requisição do admin. `tipo` é "video" ou "musica".
+    """
+    from .media_ingest import ingerir_midia
+
+    return ingerir_midia(tipo, midia_id)
+
+
+@shared_task
+def task_reconciliar_midias_r2():
+    """
+    Tarefa periódica (celery beat, CELERY_BEAT_SCHEDULE): atualiza o índice de
+    disponibilidade da biblioteca a partir de uma listagem do R2.
+    """
+    from .asset_index import reconciliar_disponibilidade
+
+    resumo = reconciliar_disponibilidade()
+    return {modelo: {"disponiveis": dados["disponiveis"], "faltantes": len(dados["faltantes"])}
+            for modelo, dados in resumo.items()}
@@ -0,0 +1,159 @@
+"""
+Redis em memória com só os comandos usados pelo projeto (listas, conjuntos,
+hashes e pipeline). Devolve bytes, como o redis-py sem decode_responses.
+"""
+
+import fnmatch
+import random
+
+
+def _bytes(valor):
+    if isinstance(valor, bytes):
+        return valor
+    return str(valor).encode("utf-8")
+
+
+class RedisFalso:
+    def __init__(self):
+        self.dados = {}
+        self.ttls = {}
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    # --- Chaves -----------------------------------------------------------
+
+    def delete(self, *chaves):
+        removidas = 0
+        for chave in chaves:
+            removidas += self.dados.pop(_bytes(chave), None) is not None
+            self.ttls.pop(_bytes(chave), None)
+        return removidas
+
+    def expire(self, chave, segundos):
+        self.ttls[_bytes(chave)] = segundos
+        return _bytes(chave) in self.dados
+
+    def scan_iter(self, match="*", count=None):
+        return [chave for chave in list(self.dados) if fnmatch.fnmatchcase(chave.decode(), match)]
+
+    # --- Listas -----------------------------------------------------------
+
+    def _lista(self, chave):
+        return self.dados.setdefault(_bytes(chave), [])
+
+    def _limpar_vazia(self, chave):
+        if not self.dados.get(_bytes(chave)):
+            self.dados.pop(_bytes(chave), None)
+
+    def rpush(self, chave, *valores):
+        lista = self._lista(chave)
+        lista.extend(_bytes(v) for v in valores)
+        return len(lista)
+
+    def lpush(self, chave, *valores):
+        lista = self._lista(chave)
+        for valor in valores:
+            lista.insert(0, _bytes(valor))
+        return len(lista)
+
+    def lrange(self, chave, inicio, fim):
+        lista = self.dados.get(_bytes(chave), [])
+        return list(lista[inicio:None if fim == -1 else fim + 1])
+
+    def ltrim(self, chave, inicio, fim):
+        lista = self.dados.get(_bytes(chave), [])
+        lista[:] = lista[inicio:None if fim == -1 else fim + 1]
+        self._limpar_vazia(chave)
+        return True
+
+    def lmove(self, origem, destino, lado_origem, lado_destino):
+        lista = self.dados.get(_bytes(origem))
+        if not lista:
+            return None
+        valor = lista.pop(0 if lado_origem == "LEFT" else -1)
+        self._limpar_vazia(origem)
+        if lado_destino == "LEFT":
+            self.lpush(destino, valor)
+        else:
+            self.rpush(destino, valor)
+        return valor
+
+    def lrem(self, chave, quantidade, valor):
+        lista = self.dados.get(_bytes(chave), [])
+        removidos = 0
+        while _bytes(valor) in lista and (quantidade == 0 or removidos < quantidade):
+            lista.remove(_bytes(valor))
+            removidos += 1
+        self._limpar_vazia(chave)
+        return removidos
+
+    # --- Conjuntos --------------------------------------------------------
+
+    def sadd(self, chave, *valores):
+        conjunto = self.dados.setdefault(_bytes(chave), set())
+        antes = len(conjunto)
+        conjunto.update(_bytes(v) for v in valores)
+        return len(conjunto) - antes
+
+    def srem(self, chave, *valores):
+        conjunto = self.dados.get(_bytes(chave), set())
+        antes = len(conjunto)
+        conjunto.difference_update(_bytes(v) for v in valores)
+        self._limpar_vazia(chave)
+        return antes - len(conjunto)
+
+    def smembers(self, chave):
+        return set(self.dados.get(_bytes(chave), set()))
+
+    def srandmember(self, chave, quantidade):
+        conjunto = list(self.dados.get(_bytes(chave), set()))
+        return random.sample(conjunto, min(quantidade, len(conjunto)))
+
+    # --- Hashes -----------------------------------------------------------
+
+    def hset(self, chave, campo=None, valor=None, mapping=None):
+        mapa = self.dados.setdefault(_bytes(chave), {})
+        itens = dict(mapping or {})
+        if campo is not None:
+            itens[campo] = valor
+        for campo_, valor_ in itens.items():
+            mapa[_bytes(campo_)] = _bytes(valor_)
+        return len(itens)
+
+    def hsetnx(self, chave, campo, valor):
+        mapa = self.dados.setdefault(_bytes(chave), {})
+        if _bytes(campo) in mapa:
+            return 0
+        mapa[_bytes(campo)] = _bytes(valor)
+        return 1
+
+    def hgetall(self, chave):
+        return dict(self.dados.get(_bytes(chave), {}))
+
+    def hdel(self, chave, *campos):
+        mapa = self.dados.get(_bytes(chave), {})
+        removidos = sum(mapa.pop(_bytes(campo), None) is not None for campo in campos)
+        self._limpar_vazia(chave)
+        return removidos
+
+
+class _Pipeline:
+    """Enfileira os comandos e os executa em ordem no `execute()`."""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._comandos = []
+
+    def __getattr__(self, nome):
+        metodo = getattr(self._redis, nome)
+
+        def enfileirar(*args, **kwargs):
+            self._comandos.append((metodo, args, kwargs))
+            return self
+
+        return enfileirar
+
+    def execute(self):
+        comandos, self._comandos = self._comandos, []
+        return [metodo(*args, **kwargs) for metodo, args, kwargs in comandos]
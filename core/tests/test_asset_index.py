@@ -0,0 +1,171 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import asset_index
+from core.models import CategoriaVideo, VideoBase
+from core.tests.redis_falso import RedisFalso
+
+
+def _cliente_r2(chaves):
+    """Cliente falso cujo paginador de list_objects_v2 filtra `chaves` pelo prefixo."""
+    paginador = mock.Mock()
+    paginador.paginate.side_effect = lambda Bucket, Prefix: [
+        {"Contents": [{"Key": chave} for chave in chaves if chave.startswith(Prefix)]}
+    ]
+    cliente = mock.Mock()
+    cliente.get_paginator.return_value = paginador
+    return cliente
+
+
+class PrefixoTests(SimpleTestCase):
+    def test_chave_da_biblioteca(self):
+        self.assertEqual(asset_index._prefixo("media/videos_base/natureza/rio.mp4"), "media/videos_base/")
+
+    def test_chave_curta_usa_a_propria_chave(self):
+        self.assertEqual(asset_index._prefixo("rio.mp4"), "rio.mp4")
+        self.assertEqual(asset_index._prefixo("media/rio.mp4"), "media/rio.mp4")
+
+    def test_prefixos_cobertos_por_outro_sao_removidos(self):
+        self.assertEqual(
+            asset_index._sem_redundantes(["media/videos_base/", "media/videos_base/", "media/x.mp4", "media/"]),
+            ["media/"],
+        )
+        self.assertEqual(
+            asset_index._sem_redundantes(["media/videos_base/", "rio.mp4"]),
+            ["media/videos_base/", "rio.mp4"],
+        )
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME="bucket-teste")
+class ReconciliacaoTests(TestCase):
+    def setUp(self):
+        self.redis = RedisFalso()
+        patcher = mock.patch.object(asset_index, "get_redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        categoria = CategoriaVideo.objects.create(nome="Natureza")
+        self.categoria = categoria
+        self.presente = VideoBase.objects.create(
+            titulo="rio", categoria=categoria, object_key="media/videos_base/natureza/rio.mp4", disponivel=False,
+        )
+        self.faltante = VideoBase.objects.create(
+            titulo="mar", categoria=categoria, object_key="media/videos_base/natureza/mar.mp4",
+        )
+        self.solto = VideoBase.objects.create(titulo="solto", categoria=categoria, object_key="solto.mp4")
+        self.sem_chave = VideoBase.objects.create(titulo="sem chave", categoria=categoria, object_key="")
+
+    def _reconciliar(self, chaves):
+        cliente = _cliente_r2(chaves)
+        with mock.patch.object(asset_index, "get_r2_client", return_value=cliente):
+            resumo = asset_index.reconciliar_disponibilidade(models=(VideoBase,))
+        prefixos = [chamada.kwargs["Prefix"] for chamada in cliente.get_paginator.return_value.paginate.call_args_list]
+        return resumo, prefixos
+
+    def test_marca_disponibilidade_pela_listagem(self):
+        resumo, _ = self._reconciliar(["media/videos_base/natureza/rio.mp4", "solto.mp4"])
+
+        disponiveis = dict(VideoBase.objects.values_list("titulo", "disponivel"))
+        self.assertEqual(disponiveis, {"rio": True, "mar": False, "solto": True, "sem chave": False})
+        self.assertFalse(VideoBase.objects.filter(verificado_em__isnull=True).exists())
+        self.assertEqual(resumo["VideoBase"]["disponiveis"], 2)
+        self.assertEqual(
+            resumo["VideoBase"]["faltantes"], [(self.faltante.id, "media/videos_base/natureza/mar.mp4", "mar")],
+        )
+
+    def test_nunca_lista_o_bucket_inteiro(self):
+        _, prefixos = self._reconciliar([])
+        self.assertEqual(prefixos, ["media/videos_base/", "solto.mp4"])
+        self.assertNotIn("", prefixos)
+
+    def test_apaga_os_ids_guardados_no_redis(self):
+        self.redis.sadd(asset_index._chave_ids(VideoBase, self.categoria.pk), self.faltante.id)
+        self.redis.sadd("outra:chave", 1)
+        self._reconciliar([])
+        self.assertFalse(self.redis.smembers(asset_index._chave_ids(VideoBase, self.categoria.pk)))
+        self.assertTrue(self.redis.smembers("outra:chave"))
+
+    def test_listagem_com_erro_nao_altera_nada(self):
+        cliente = mock.Mock()
+        cliente.get_paginator.return_value.paginate.side_effect = RuntimeError("R2 fora")
+        with mock.patch.object(asset_index, "get_r2_client", return_value=cliente):
+            with self.assertRaises(RuntimeError):
+                asset_index.reconciliar_disponibilidade(models=(VideoBase,))
+        self.assertFalse(VideoBase.objects.filter(verificado_em__isnull=False).exists())
+
+
+class EscolherMidiaTests(TestCase):
+    def setUp(self):
+        self.redis = RedisFalso()
+        for nome, valor in {
+            "get_redis_client": mock.Mock(return_value=self.redis),
+            "MIDIA_RECENTES_EVITADAS": 5,
+        }.items():
+            patcher = mock.patch.object(asset_index, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.categoria = CategoriaVideo.objects.create(nome="Cidades")
+
+    def _criar(self, quantidade, disponivel=True):
+        return [
+            VideoBase.objects.create(
+                titulo=f"video {i}", categoria=self.categoria,
+                object_key=f"media/videos_base/cidades/video_{i}.mp4", disponivel=disponivel,
+            )
+            for i in range(quantidade)
+        ]
+
+    def test_evita_as_escolhas_recentes(self):
+        self._criar(10)
+        escolhidos = [asset_index.escolher_midia(VideoBase, self.categoria).id for _ in range(60)]
+        for i, escolhido in enumerate(escolhidos):
+            self.assertNotIn(escolhido, escolhidos[max(0, i - 5):i])
+
+    def test_poucas_midias_ainda_sao_escolhidas(self):
+        (unico,) = self._criar(1)
+        for _ in range(3):
+            self.assertEqual(asset_index.escolher_midia(VideoBase, self.categoria), unico)
+
+    def test_ignora_indisponiveis_e_categoria_vazia(self):
+        self.assertIsNone(asset_index.escolher_midia(VideoBase, self.categoria))
+        self._criar(3, disponivel=False)
+        self.assertIsNone(asset_index.escolher_midia(VideoBase, self.categoria.pk))
+
+    def test_escolha_com_ids_no_redis_faz_uma_consulta(self):
+        self._criar(10)
+        asset_index.escolher_midia(VideoBase, self.categoria)
+        with self.assertNumQueries(1):
+            asset_index.escolher_midia(VideoBase, self.categoria)
+
+    def test_ids_ficam_no_redis_com_ttl(self):
+        videos = self._criar(3)
+        asset_index.escolher_midia(VideoBase, self.categoria)
+        chave = asset_index._chave_ids(VideoBase, self.categoria.pk)
+        self.assertEqual(self.redis.smembers(chave), {str(v.id).encode() for v in videos})
+        self.assertEqual(self.redis.ttls[chave.encode()], asset_index.MIDIA_IDS_TTL_SEGUNDOS)
+
+    def test_midia_que_ficou_indisponivel_sai_do_conjunto(self):
+        self._criar(2)
+        asset_index.escolher_midia(VideoBase, self.categoria)
+        VideoBase.objects.update(disponivel=False)
+        self.assertIsNone(asset_index.escolher_midia(VideoBase, self.categoria))
+        self.assertEqual(asset_index.ids_disponiveis(VideoBase, self.categoria.pk), [])
+
+    def test_invalidar_recarrega_do_banco(self):
+        self._criar(2)
+        antes = asset_index.ids_disponiveis(VideoBase, self.categoria.pk)
+        (novo,) = self._criar(1)
+        self.assertEqual(asset_index.ids_disponiveis(VideoBase, self.categoria.pk), antes)
+
+        asset_index.invalidar_ids(VideoBase, self.categoria.pk)
+        self.assertIn(novo.id, asset_index.ids_disponiveis(VideoBase, self.categoria.pk))
+
+    def test_redis_fora_consulta_o_banco(self):
+        (unico,) = self._criar(1)
+        asset_index.get_redis_client.side_effect = ConnectionError("redis fora")
+        self.assertEqual(asset_index.escolher_midia(VideoBase, self.categoria), unico)
+        asset_index.invalidar_ids()  # não levanta
+
+    def test_midia_nova_so_entra_depois_de_verificada(self):
+        VideoBase.objects.create(titulo="novo", categoria=self.categoria, object_key="media/videos_base/cidades/novo.mp4")
+        self.assertIsNone(asset_index.escolher_midia(VideoBase, self.categoria))
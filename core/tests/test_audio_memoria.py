@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import tempfile
+import wave
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core import audio_utils
+from core.audio_utils import SAMPLE_RATE
+
+
+class ExtrairAudioPcmTests(SimpleTestCase):
+    def test_s16le_da_saida_do_ffmpeg_vira_float32(self):
+        pcm = np.array([0, 16384, -32768], dtype=np.int16).tobytes()
+        with mock.patch.object(audio_utils.subprocess, "run", return_value=mock.Mock(stdout=pcm)) as run:
+            audio = audio_utils.extrair_audio_pcm("video.mp4")
+
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertEqual(audio.tolist(), [0.0, 0.5, -1.0])
+        cmd = run.call_args.args[0]
+        self.assertEqual(cmd[-1], "pipe:1")
+        self.assertEqual(cmd[cmd.index("-ar") + 1], str(SAMPLE_RATE))
+
+    def test_memoria_sem_arquivo_temporario(self):
+        with mock.patch.object(audio_utils, "extrair_audio_pcm", return_value=np.zeros(4, dtype=np.float32)), \
+                mock.patch.object(audio_utils, "extract_audio_from_video") as extrair_wav:
+            audio, caminho = audio_utils.obter_audio_para_transcricao("video.mp4")
+        self.assertEqual(len(audio), 4)
+        self.assertIsNone(caminho)
+        extrair_wav.assert_not_called()
+
+    def test_falha_em_memoria_cai_para_o_wav(self):
+        erro = subprocess.CalledProcessError(1, ["ffmpeg"])
+        with mock.patch.object(audio_utils, "extrair_audio_pcm", side_effect=erro), \
+                mock.patch.object(audio_utils, "extract_audio_from_video", return_value="/tmp/a.wav"):
+            self.assertEqual(audio_utils.obter_audio_para_transcricao("video.mp4"), ("/tmp/a.wav", "/tmp/a.wav"))
+
+
+class CarregarAudioTests(SimpleTestCase):
+    def test_array_passa_direto(self):
+        audio = np.zeros(4, dtype=np.float32)
+        self.assertIs(audio_utils.carregar_audio(audio), audio)
+
+    def _wav(self, amostras, taxa=SAMPLE_RATE):
+        fd, caminho = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        self.addCleanup(os.remove, caminho)
+        with wave.open(caminho, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(taxa)
+            wav.writeframes(np.array(amostras, dtype=np.int16).tobytes())
+        return caminho
+
+    def test_wav_lido_sem_faster_whisper(self):
+        caminho = self._wav([0, -16384, 32767])
+        with mock.patch.dict(sys.modules, {"faster_whisper.audio": None}):
+            audio = audio_utils.carregar_audio(caminho)
+        self.assertEqual(audio.dtype, np.float32)
+        self.assertEqual(audio.tolist()[:2], [0.0, -0.5])
+
+    def test_wav_fora_do_formato_sem_faster_whisper(self):
+        caminho = self._wav([0, 0], taxa=44100)
+        with mock.patch.dict(sys.modules, {"faster_whisper.audio": None}):
+            with self.assertRaises(ValueError):
+                audio_utils.carregar_audio(caminho)
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import asset_cache
+from core.cache_utils import CacheDisco
+
+
+class ObterAtivoTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        self.travas = os.path.join(self.pasta, "travas")
+        os.makedirs(self.travas)
+        self.cache = CacheDisco(
+            "ativos", os.path.join(self.pasta, "ativos"), tamanho_max_bytes=1024 * 1024,
+            ao_descartar=asset_cache._remover_trava,
+        )
+        self.etag = "etag-1"
+        self.downloads = []
+        for nome, valor in {
+            "cache_ativos": self.cache,
+            "_DIRETORIO_TRAVAS": self.travas,
+            "_travas_thread": {},
+            "_etags": {},
+            "r2_configurado": mock.Mock(return_value=True),
+            "etag_no_r2": mock.Mock(side_effect=lambda object_key: self.etag),
+            "download_from_cloudflare": mock.Mock(side_effect=self._baixar),
+        }.items():
+            patcher = mock.patch.object(asset_cache, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _baixar(self, object_key, extensao):
+        time.sleep(0.02)  # dá tempo para downloads concorrentes se sobreporem
+        self.downloads.append(object_key)
+        fd, caminho = tempfile.mkstemp(suffix=extensao, dir=self.pasta)
+        with os.fdopen(fd, "wb") as f:
+            f.write(f"{object_key}@{self.etag}".encode())
+        return caminho
+
+    def _ler(self, caminho):
+        with open(caminho, "rb") as f:
+            return f.read().decode()
+
+    def test_segundo_pedido_sai_do_cache(self):
+        primeiro = asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        segundo = asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+
+        self.assertEqual(self.downloads, ["media/musicas/a.mp3"])
+        self.assertNotEqual(primeiro, segundo)  # cada job recebe a sua cópia
+        self.assertEqual(self._ler(segundo), "media/musicas/a.mp3@etag-1")
+        os.remove(primeiro)
+        self.assertEqual(self._ler(asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)), "media/musicas/a.mp3@etag-1")
+
+    def test_arquivo_substituido_no_r2_vira_outra_entrada(self):
+        asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        self.etag = "etag-2"
+        with mock.patch.object(asset_cache, "ATIVOS_ETAG_TTL_SEGUNDOS", 0):
+            caminho = asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        self.assertEqual(len(self.downloads), 2)
+        self.assertEqual(self._ler(caminho), "media/musicas/a.mp3@etag-2")
+
+    def test_etag_reaproveitado_dentro_do_ttl(self):
+        asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        asset_cache.etag_no_r2.assert_called_once_with("media/musicas/a.mp3")
+
+    def test_sem_r2_baixa_direto(self):
+        asset_cache.r2_configurado.return_value = False
+        asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        self.assertEqual(len(self.downloads), 2)
+        asset_cache.etag_no_r2.assert_not_called()
+
+    def test_pedidos_simultaneos_baixam_uma_vez(self):
+        caminhos = []
+        threads = [
+            threading.Thread(target=lambda: caminhos.append(asset_cache.obter_ativo("media/videos_base/b.mp4", ".mp4", self.pasta)))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.downloads, ["media/videos_base/b.mp4"])
+        self.assertEqual(len(caminhos), 6)
+        self.assertTrue(all(self._ler(c) == "media/videos_base/b.mp4@etag-1" for c in caminhos))
+
+    def test_descarte_apaga_a_trava_que_ninguem_usa(self):
+        asset_cache.obter_ativo("media/musicas/a.mp3", ".mp3", self.pasta)
+        (trava,) = os.listdir(self.travas)
+        chave = trava[:-len(".lock")]
+
+        asset_cache._remover_trava(chave)
+        self.assertEqual(os.listdir(self.travas), [])
+        self.assertNotIn(chave, asset_cache._travas_thread)
+
+    def test_trava_em_uso_nao_e_apagada(self):
+        with asset_cache._trava("chave"):
+            asset_cache._remover_trava("chave")
+            self.assertEqual(os.listdir(self.travas), ["chave.lock"])
+            self.assertIn("chave", asset_cache._travas_thread)
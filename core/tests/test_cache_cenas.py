@@ -0,0 +1,97 @@
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import scene_cache
+from core.cache_utils import CacheDisco
+
+
+class ChavesCenasTests(SimpleTestCase):
+    def test_prompt_normalizado(self):
+        self.assertEqual(scene_cache.normalizar_prompt("  Pôr-do-sol   na PRAIA! "), "por do sol na praia")
+
+    def test_prompts_equivalentes_caem_na_mesma_chave(self):
+        self.assertEqual(
+            scene_cache.chave_imagem("Pôr do sol na praia", 0),
+            scene_cache.chave_imagem("por do sol, na praia", 0),
+        )
+        self.assertNotEqual(scene_cache.chave_imagem("praia", 0), scene_cache.chave_imagem("praia", 1))
+
+    def test_chave_do_clipe_inclui_o_formato(self):
+        chave = scene_cache.chave_clipe_pexels(123)
+        with mock.patch.object(scene_cache, "FPS", 60):
+            self.assertNotEqual(scene_cache.chave_clipe_pexels(123), chave)
+
+
+class CacheCenasTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        self.temp_dir = os.path.join(self.pasta, "job")
+        os.makedirs(self.temp_dir)
+        self.cache = CacheDisco("cenas", os.path.join(self.pasta, "cache"), tamanho_max_bytes=1024 * 1024)
+        for nome, valor in {"cache_cenas": self.cache, "CENAS_CACHE_REUSO": 1.0, "CENAS_CACHE_VARIANTES": 1}.items():
+            patcher = mock.patch.object(scene_cache, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _arquivo(self, nome, conteudo=b"x"):
+        caminho = os.path.join(self.pasta, nome)
+        with open(caminho, "wb") as f:
+            f.write(conteudo)
+        return caminho
+
+    def test_imagem_guardada_sai_do_cache_como_copia(self):
+        variante, caminho = scene_cache.obter_imagem("praia", self.temp_dir)
+        self.assertIsNone(caminho)
+        scene_cache.guardar_imagem("Praia!", variante, self._arquivo("flux.jpg", b"imagem"))
+
+        _, caminho = scene_cache.obter_imagem("praia", self.temp_dir)
+        self.assertEqual(os.path.dirname(caminho), self.temp_dir)
+        with open(caminho, "rb") as f:
+            self.assertEqual(f.read(), b"imagem")
+
+    def test_sem_reuso_sempre_busca_nova(self):
+        scene_cache.guardar_imagem("praia", 0, self._arquivo("flux.jpg"))
+        with mock.patch.object(scene_cache, "CENAS_CACHE_REUSO", 0):
+            self.assertEqual(scene_cache.obter_imagem("praia", self.temp_dir), (0, None))
+
+    def test_prefere_o_clipe_que_ja_esta_no_cache(self):
+        self.cache.guardar(scene_cache.chave_clipe_pexels(2), ".mp4", self._arquivo("clipe.mp4"))
+        videos = [{"id": 1}, {"id": 2}, {"id": 3}]
+        self.assertEqual([scene_cache.escolher_video_pexels(videos)["id"] for _ in range(5)], [2] * 5)
+
+    def _normalizar(self, no_formato_final, falhar=False):
+        bruto = self._arquivo("bruto.mp4")
+        with mock.patch.object(scene_cache, "_clipe_no_formato_final", return_value=no_formato_final), \
+                mock.patch.object(scene_cache.subprocess, "run") as run:
+            if falhar:
+                run.side_effect = subprocess.CalledProcessError(1, ["ffmpeg"])
+            else:
+                run.side_effect = lambda cmd, **kwargs: open(cmd[-1], "wb").close()
+            return bruto, scene_cache.normalizar_e_guardar_clipe(7, bruto, self.temp_dir), run
+
+    def test_clipe_normalizado_vai_para_o_cache(self):
+        bruto, caminho, run = self._normalizar(no_formato_final=False)
+        cmd = run.call_args.args[0]
+        self.assertIn("-vf", cmd)
+        self.assertFalse(os.path.exists(bruto))
+        self.assertTrue(self.cache.contem_local(scene_cache.chave_clipe_pexels(7), ".mp4"))
+        self.assertIsNotNone(scene_cache.obter_clipe_pexels(7, self.temp_dir))
+        self.assertNotEqual(caminho, bruto)
+
+    def test_clipe_no_formato_final_e_so_copiado(self):
+        _, _, run = self._normalizar(no_formato_final=True)
+        cmd = run.call_args.args[0]
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "copy")
+        self.assertNotIn("-vf", cmd)
+
+    def test_falha_na_conversao_devolve_o_bruto(self):
+        bruto, caminho, _ = self._normalizar(no_formato_final=False, falhar=True)
+        self.assertEqual(caminho, bruto)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+        self.assertIsNone(scene_cache.obter_clipe_pexels(7, self.temp_dir))
@@ -0,0 +1,108 @@
+import os
+import tempfile
+from unittest import mock
+
+import torch
+from django.test import SimpleTestCase
+
+from core import tts_utils
+from core.cache_utils import CacheDisco
+
+
+class ChaveNarracaoTests(SimpleTestCase):
+    def setUp(self):
+        self.voz = torch.linspace(0, 1, 8)
+
+    def test_normaliza_espacos_e_quebras_de_linha(self):
+        self.assertEqual(
+            tts_utils.normalizar_texto_narracao("  Olá,\t  mundo \r\n\r\nfim.  "),
+            "Olá, mundo\nfim.",
+        )
+
+    def test_textos_equivalentes_caem_na_mesma_chave(self):
+        a = tts_utils.normalizar_texto_narracao("Olá mundo\nfim")
+        b = tts_utils.normalizar_texto_narracao("Olá   mundo\r\n\r\n fim ")
+        self.assertEqual(
+            tts_utils.chave_narracao(a, self.voz, 1.0),
+            tts_utils.chave_narracao(b, self.voz, 1.0),
+        )
+
+    def test_chave_depende_da_velocidade_e_da_voz(self):
+        base = tts_utils.chave_narracao("texto", self.voz, 1.0)
+        self.assertNotEqual(base, tts_utils.chave_narracao("texto", self.voz, 1.1))
+        self.assertNotEqual(base, tts_utils.chave_narracao("texto", self.voz * 2, 1.0))
+        self.assertNotEqual(base, tts_utils.chave_narracao("outro texto", self.voz, 1.0))
+
+    def test_chave_usa_o_conteudo_do_embedding(self):
+        # Tensores distintos com o mesmo conteúdo (ex.: voz .npy recarregada)
+        self.assertEqual(
+            tts_utils.chave_narracao("texto", self.voz, 1.0),
+            tts_utils.chave_narracao("texto", self.voz.clone(), 1.0),
+        )
+
+
+class CacheDiscoTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        self.descartadas = []
+        self.cache = CacheDisco(
+            "teste", os.path.join(self.pasta, "cache"), tamanho_max_bytes=10,
+            ao_descartar=self.descartadas.append,
+        )
+
+    def _origem(self, conteudo, nome="origem.bin"):
+        caminho = os.path.join(self.pasta, nome)
+        with open(caminho, "wb") as f:
+            f.write(conteudo)
+        return caminho
+
+    def _temporarios(self):
+        return [nome for nome in os.listdir(self.cache.diretorio) if nome.endswith(".tmp")]
+
+    def test_guardar_e_obter(self):
+        origem = self._origem(b"audio")
+        caminho = self.cache.guardar("chave", ".wav", origem, metadados={"duracao": 1.5})
+
+        self.assertEqual(self.cache.obter("chave", ".wav"), caminho)
+        with open(caminho, "rb") as f:
+            self.assertEqual(f.read(), b"audio")
+        self.assertEqual(self.cache.obter_metadados("chave"), {"duracao": 1.5})
+        self.assertTrue(os.path.exists(origem))
+        self.assertEqual(self._temporarios(), [])
+
+    def test_guardar_movendo_a_origem(self):
+        origem = self._origem(b"audio")
+        caminho = self.cache.guardar("chave", ".wav", origem, mover=True)
+        self.assertFalse(os.path.exists(origem))
+        self.assertTrue(os.path.exists(caminho))
+
+    def test_falha_na_escrita_preserva_a_entrada_anterior(self):
+        caminho = self.cache.guardar("chave", ".wav", self._origem(b"antigo"))
+
+        def escrever_pela_metade(f):
+            f.write(b"nov")
+            raise OSError("disco cheio")
+
+        with self.assertRaises(OSError):
+            self.cache._substituir_atomicamente(caminho, escrever_pela_metade)
+        with open(caminho, "rb") as f:
+            self.assertEqual(f.read(), b"antigo")
+        self.assertEqual(self._temporarios(), [])
+
+    def test_descarta_a_menos_usada_e_avisa(self):
+        self.cache.guardar("velha", ".bin", self._origem(b"123456"))
+        os.utime(self.cache.caminho("velha", ".bin"), (1, 1))
+        self.cache.guardar("nova", ".bin", self._origem(b"123456"))
+
+        self.assertFalse(self.cache.contem_local("velha", ".bin"))
+        self.assertTrue(self.cache.contem_local("nova", ".bin"))
+        self.assertEqual(self.descartadas, ["velha"])
+        self.assertEqual(self.cache.metricas()["descartes"], 1)
+
+    def test_falha_nao_vai_ao_r2_sem_prefixo(self):
+        with mock.patch.object(self.cache, "_baixar_do_r2") as baixar:
+            self.assertIsNone(self.cache.obter("ausente", ".wav"))
+        baixar.assert_not_called()
+        self.assertEqual(self.cache.metricas()["falhas"], 1)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import render_plan
+from core.render_plan import arquivo_temporario, buscar_cenas_em_paralelo, entregar_arquivo
+
+
+class BuscarCenasEmParaleloTests(SimpleTestCase):
+    def test_ordem_dos_indices_e_falhas_de_fora(self):
+        def obter(indice, item, cancelado):
+            time.sleep(0.03 * (3 - indice))  # termina na ordem inversa
+            if item == "erro":
+                raise RuntimeError("pexels fora")
+            return None if item == "vazio" else item
+
+        cenas = buscar_cenas_em_paralelo(obter, ["a", "erro", "b", "vazio"], concorrencia=4)
+        self.assertEqual(cenas, ["a", "b"])
+
+    def test_concorrencia_limitada(self):
+        ativas = []
+        maximo = []
+        trava = threading.Lock()
+
+        def obter(indice, item, cancelado):
+            with trava:
+                ativas.append(indice)
+                maximo.append(len(ativas))
+            time.sleep(0.02)
+            with trava:
+                ativas.remove(indice)
+            return item
+
+        self.assertEqual(buscar_cenas_em_paralelo(obter, list(range(6)), concorrencia=2), list(range(6)))
+        self.assertLessEqual(max(maximo), 2)
+
+    def test_cena_lenta_e_descartada_e_avisada(self):
+        viu_cancelamento = threading.Event()
+
+        def obter(indice, item, cancelado):
+            if item == "lenta" and cancelado.wait(5):
+                viu_cancelamento.set()
+            return item
+
+        with self.assertLogs("core.render_plan", level="WARNING"):
+            cenas = buscar_cenas_em_paralelo(obter, ["a", "lenta"], concorrencia=2, timeout_por_cena=0.2)
+        self.assertEqual(cenas, ["a"])
+        self.assertTrue(viu_cancelamento.wait(1))
+
+    def test_cenas_ainda_na_fila_desistem_ao_fim(self):
+        chamadas = []
+
+        def obter(indice, item, cancelado):
+            chamadas.append(indice)
+            time.sleep(0.05)
+            return item
+
+        # A busca é interrompida com cenas ainda na fila do pool
+        with mock.patch.object(render_plan, "wait", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                buscar_cenas_em_paralelo(obter, list(range(4)), concorrencia=1)
+        time.sleep(0.2)
+        self.assertLessEqual(len(chamadas), 1)
+
+
+class EntregarArquivoTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+
+    def test_cena_esperada_e_movida_para_o_destino(self):
+        temp = arquivo_temporario(self.pasta, ".jpg")
+        destino = os.path.join(self.pasta, "cena_0.jpg")
+        self.assertEqual(entregar_arquivo(temp, destino, threading.Event()), destino)
+        self.assertTrue(os.path.exists(destino))
+        self.assertFalse(os.path.exists(temp))
+
+    def test_cena_cancelada_nao_publica_nada(self):
+        temp = arquivo_temporario(self.pasta, ".jpg")
+        cancelado = threading.Event()
+        cancelado.set()
+        destino = os.path.join(self.pasta, "cena_0.jpg")
+        self.assertIsNone(entregar_arquivo(temp, destino, cancelado))
+        self.assertEqual(os.listdir(self.pasta), [])
+
+
+class ExecutarComQuadrosTests(SimpleTestCase):
+    def test_ffmpeg_nao_fica_orfao_se_os_quadros_falharem(self):
+        def quadros():
+            yield b"q"
+            raise OSError("imagem corrompida")
+
+        processo = mock.Mock()
+        processo.poll.return_value = None
+        plano = render_plan.PlanoRender()
+        plano._quadros_stdin = quadros()
+        with mock.patch.object(render_plan.subprocess, "Popen", return_value=processo):
+            with self.assertRaises(OSError):
+                plano._executar_com_quadros(["ffmpeg"])
+        processo.stdin.close.assert_called_once_with()
+        processo.kill.assert_called_once_with()
+
+    def test_codigo_de_saida_decide_depois_de_pipe_quebrado(self):
+        processo = mock.Mock()
+        processo.stdin.write.side_effect = BrokenPipeError
+        processo.wait.return_value = 1
+        processo.poll.return_value = 1
+        plano = render_plan.PlanoRender()
+        plano._quadros_stdin = iter([b"q"])
+        with mock.patch.object(render_plan.subprocess, "Popen", return_value=processo):
+            with self.assertRaises(render_plan.subprocess.CalledProcessError):
+                plano._executar_com_quadros(["ffmpeg"])
+        processo.kill.assert_not_called()
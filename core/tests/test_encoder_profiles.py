@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import encoder_profiles
+from core.encoder_profiles import PERFIS, perfil_do_job
+
+
+def _assinatura(perfil_encoder):
+    return SimpleNamespace(plano=SimpleNamespace(perfil_encoder=perfil_encoder))
+
+
+@mock.patch.object(encoder_profiles, "ENCODER_PERFIL_PADRAO", "padrao")
+class PerfilDoJobTests(SimpleTestCase):
+    def test_override_do_job_vence_o_plano(self):
+        self.assertIs(perfil_do_job({"perfil_encoder": "rascunho"}, _assinatura("premium")), PERFIS["rascunho"])
+
+    def test_override_invalido_cai_no_plano(self):
+        self.assertIs(perfil_do_job({"perfil_encoder": "ultra"}, _assinatura("premium")), PERFIS["premium"])
+
+    def test_sem_override_usa_o_plano(self):
+        self.assertIs(perfil_do_job({}, _assinatura("premium")), PERFIS["premium"])
+
+    def test_sem_assinatura_usa_o_padrao(self):
+        self.assertIs(perfil_do_job(None, None), PERFIS["padrao"])
+        with mock.patch.object(encoder_profiles, "ENCODER_PERFIL_PADRAO", "rascunho"):
+            self.assertIs(perfil_do_job(), PERFIS["rascunho"])
+
+    def test_plano_sem_perfil_valido_usa_o_padrao(self):
+        self.assertIs(perfil_do_job({}, _assinatura("")), PERFIS["padrao"])
+        self.assertIs(perfil_do_job({}, SimpleNamespace(plano=None)), PERFIS["padrao"])
+
+    def test_padrao_mal_configurado_cai_em_padrao(self):
+        with mock.patch.object(encoder_profiles, "ENCODER_PERFIL_PADRAO", "inexistente"):
+            self.assertIs(perfil_do_job(), PERFIS["padrao"])
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError
+
+from core import http_client
+
+
+class SessoesTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(http_client, "_sessoes", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_uma_sessao_por_host(self):
+        sessao = http_client.obter_sessao("api.pexels.com")
+        self.assertIs(http_client.obter_sessao("api.pexels.com"), sessao)
+        self.assertIsNot(http_client.obter_sessao("gen.pollinations.ai"), sessao)
+
+    def test_post_nunca_e_repetido(self):
+        retry = http_client.obter_sessao("gen.pollinations.ai").get_adapter("https://gen.pollinations.ai/").max_retries
+        self.assertIsInstance(retry, http_client._RetryComPrazo)
+        self.assertTrue(retry.is_retry("GET", 503))
+        self.assertFalse(retry.is_retry("POST", 503))
+        self.assertFalse(retry.is_retry("GET", 404))
+
+
+class RetryComPrazoTests(SimpleTestCase):
+    def _incrementar(self):
+        retry = http_client._RetryComPrazo(total=3, connect=3, backoff_factor=0.5)
+        return retry.increment(method="GET", url="/videos", error=ConnectTimeoutError("lento"))
+
+    def test_sem_prazo_registrado_tenta_de_novo(self):
+        self.assertEqual(self._incrementar().total, 2)
+
+    def test_tentativa_que_passaria_do_prazo_nao_comeca(self):
+        with http_client._dentro_do_prazo((5, 30), prazo=10):
+            with self.assertRaises(MaxRetryError):
+                self._incrementar()
+
+    def test_tentativa_dentro_do_prazo(self):
+        with http_client._dentro_do_prazo((5, 30), prazo=60):
+            self.assertEqual(self._incrementar().total, 2)
+        self.assertIsNone(http_client._prazo.limite)
+
+
+class RequisitarTests(SimpleTestCase):
+    def setUp(self):
+        self.sessao = mock.Mock()
+        for nome, valor in {
+            "_metricas": {},
+            "_semaforos": {},
+            "obter_sessao": mock.Mock(return_value=self.sessao),
+        }.items():
+            patcher = mock.patch.object(http_client, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_timeout_padrao_e_metricas_por_endpoint(self):
+        self.sessao.request.side_effect = [mock.Mock(status_code=200), mock.Mock(status_code=503)]
+        http_client.get("https://api.pexels.com/videos/search?query=mar")
+        http_client.get("https://api.pexels.com/videos/123")
+
+        self.assertEqual(self.sessao.request.call_args.kwargs["timeout"], http_client.HTTP_TIMEOUT_PADRAO)
+        metricas = http_client.metricas_http()["api.pexels.com/videos"]
+        self.assertEqual((metricas["chamadas"], metricas["erros"]), (2, 1))
+
+    def test_excecao_conta_como_erro_e_sobe(self):
+        self.sessao.request.side_effect = ConnectionError("fora")
+        with self.assertRaises(ConnectionError):
+            http_client.post("https://gen.pollinations.ai/v1/chat", json={})
+        self.assertEqual(http_client.metricas_http()["gen.pollinations.ai/v1"]["erros"], 1)
+
+    def test_concorrencia_limitada_por_host(self):
+        with mock.patch.object(http_client, "HTTP_CONCORRENCIA_POR_HOST", {"api.pexels.com": 2}):
+            semaforo = http_client._semaforo("api.pexels.com")
+        self.assertIs(http_client._semaforo("api.pexels.com"), semaforo)
+        self.assertTrue(semaforo.acquire(blocking=False))
+        self.assertTrue(semaforo.acquire(blocking=False))
+        self.assertFalse(semaforo.acquire(blocking=False))
+
+    def _download(self, blocos, cancelado=None):
+        resposta = mock.MagicMock()
+        resposta.__enter__.return_value = resposta
+        resposta.iter_content.return_value = iter(blocos)
+        self.sessao.get.return_value = resposta
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        destino = os.path.join(pasta.name, "clipe.mp4")
+        return destino, http_client.baixar_para_arquivo("https://videos.pexels.com/v/1.mp4", destino, cancelado=cancelado)
+
+    def test_download_em_blocos_para_o_disco(self):
+        destino, resultado = self._download([b"ab", b"cd"])
+        self.assertEqual(resultado, destino)
+        with open(destino, "rb") as f:
+            self.assertEqual(f.read(), b"abcd")
+        self.assertTrue(self.sessao.get.call_args.kwargs["stream"])
+
+    def test_download_cancelado_para_entre_blocos(self):
+        cancelado = threading.Event()
+
+        def blocos():
+            yield b"ab"
+            cancelado.set()
+            yield b"cd"
+
+        _, resultado = self._download(blocos(), cancelado)
+        self.assertIsNone(resultado)
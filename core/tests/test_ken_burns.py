@@ -0,0 +1,66 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from core import ken_burns
+from core.ken_burns import ALTURA, FPS, LARGURA
+from core.render_plan import Cena, PlanoRender
+
+
+class FiltroKenBurnsTests(SimpleTestCase):
+    def test_sobreamostragem_so_ate_o_zoom_maximo(self):
+        filtro = ken_burns.filtro_ken_burns(2.0)
+        self.assertTrue(filtro.startswith("scale=1242:2208:"))
+        self.assertIn(f"d={2 * FPS}:", filtro)
+        self.assertIn(f"s={LARGURA}x{ALTURA}", filtro)
+
+    def test_legado_mantem_o_scale_antigo(self):
+        self.assertTrue(ken_burns.filtro_ken_burns(2.0, "legado").startswith("scale=2160:3840:"))
+
+    def test_sempre_ao_menos_um_quadro(self):
+        self.assertEqual(ken_burns.total_de_quadros(0.0), 1)
+        self.assertEqual(ken_burns.total_de_quadros(1.01), FPS)
+
+
+class QuadrosKenBurnsTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.imagem = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        self.addCleanup(os.remove, self.imagem)
+        Image.new("RGB", (300, 200), "red").save(self.imagem)
+        # Zoom máximo atingido nos primeiros quadros
+        patcher = mock.patch.object(ken_burns, "ZOOM_MAX", 1.003)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_quadros_rgb24_na_resolucao_final(self):
+        quadros = list(ken_burns.quadros_ken_burns(self.imagem, 0.2))
+        self.assertEqual(len(quadros), ken_burns.total_de_quadros(0.2))
+        self.assertTrue(all(len(q) == LARGURA * ALTURA * 3 for q in quadros))
+
+    def test_quadro_no_zoom_maximo_e_reaproveitado(self):
+        quadros = list(ken_burns.quadros_ken_burns(self.imagem, 0.2))
+        self.assertIsNot(quadros[0], quadros[1])
+        self.assertIs(quadros[-1], quadros[-2])
+
+
+class MotorPillowNoPlanoTests(SimpleTestCase):
+    def test_imagens_viram_um_fluxo_de_quadros_no_stdin(self):
+        plano = PlanoRender()
+        with mock.patch("core.render_plan.quadros_ken_burns", side_effect=lambda caminho, duracao: iter([caminho.encode()])):
+            plano.fundo_de_cenas([Cena("imagem", "a.jpg", 1.0), Cena("imagem", "b.jpg", 1.0)], motor_ken_burns="pillow")
+            self.assertEqual(list(plano._quadros_stdin), [b"a.jpg", b"b.jpg"])
+
+        cmd = plano.comando("saida.mp4", 2.0)
+        self.assertEqual(cmd[cmd.index("-i") + 1], "pipe:0")
+        self.assertEqual(cmd.count("-i"), 1)
+        self.assertIn("rawvideo", cmd)
+
+    def test_clipe_no_meio_volta_para_o_filtro(self):
+        plano = PlanoRender()
+        plano.fundo_de_cenas([Cena("imagem", "a.jpg", 1.0), Cena("video", "b.mp4", 1.0)], motor_ken_burns="pillow")
+        self.assertIsNone(plano._quadros_stdin)
+        self.assertIn("zoompan", " ".join(plano.comando("saida.mp4", 2.0)))
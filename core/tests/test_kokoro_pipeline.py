@@ -0,0 +1,84 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import tts_utils
+
+
+class RegistroPipelinesTests(SimpleTestCase):
+    def setUp(self):
+        self.construidos = []
+
+        def construir(lang_code, repo_id):
+            time.sleep(0.01)  # dá tempo para as outras threads chegarem ao lock
+            pipeline = mock.Mock(name=f"KPipeline({lang_code})")
+            self.construidos.append(lang_code)
+            return pipeline
+
+        for nome, valor in {
+            "_pipelines": {},
+            "_pipeline_locks": {},
+            "KPipeline": mock.Mock(side_effect=construir),
+            "_metricas": dict.fromkeys(tts_utils._metricas, 0),
+        }.items():
+            patcher = mock.patch.object(tts_utils, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_pipeline_e_carregado_uma_vez_por_idioma(self):
+        primeiro = tts_utils.get_kokoro_pipeline("p")
+        self.assertIs(tts_utils.get_kokoro_pipeline("p"), primeiro)
+        self.assertIsNot(tts_utils.get_kokoro_pipeline("a"), primeiro)
+
+        self.assertEqual(self.construidos, ["p", "a"])
+        self.assertEqual(tts_utils.obter_metricas_tts()["carregamentos"], 2)
+
+    def test_threads_concorrentes_nao_carregam_duas_vezes(self):
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(tts_utils.get_kokoro_pipeline("p")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.construidos, ["p"])
+        self.assertEqual(len({id(p) for p in resultados}), 1)
+
+    def test_usar_pipeline_da_acesso_exclusivo(self):
+        dentro = threading.Event()
+        liberar = threading.Event()
+        ordem = []
+
+        def primeiro():
+            with tts_utils.usar_pipeline("p"):
+                ordem.append("primeiro entrou")
+                dentro.set()
+                liberar.wait(1)
+                ordem.append("primeiro saiu")
+
+        def segundo():
+            with tts_utils.usar_pipeline("p"):
+                ordem.append("segundo entrou")
+
+        t1 = threading.Thread(target=primeiro)
+        t1.start()
+        dentro.wait(1)
+        t2 = threading.Thread(target=segundo)
+        t2.start()
+        time.sleep(0.05)
+        liberar.set()
+        t1.join()
+        t2.join()
+
+        self.assertEqual(ordem, ["primeiro entrou", "primeiro saiu", "segundo entrou"])
+
+    def test_aquecer_registra_falha_sem_levantar(self):
+        tts_utils.KPipeline.side_effect = RuntimeError("sem rede")
+        with self.assertLogs("core.tts_utils", level="ERROR"):
+            tts_utils.aquecer_pipelines(["p"])
+        self.assertEqual(tts_utils._pipelines, {})
@@ -0,0 +1,51 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import asset_index
+from core.media_ingest import ingerir_midia
+from core.models import VideoBase
+
+
+class IngerirMidiaTests(SimpleTestCase):
+    def setUp(self):
+        self.midia = mock.Mock(categoria_id=7, disponivel=False, verificado_em=None)
+        self.midia.arquivo_video.name = "videos_base/cidades/rio.mov"
+        self.midia.arquivo_video.open.side_effect = lambda modo: io.BytesIO(b"original")
+        for alvo in (
+            mock.patch.object(VideoBase, "objects", mock.Mock(**{"get.return_value": self.midia})),
+            mock.patch.object(asset_index, "invalidar_ids"),
+        ):
+            alvo.start()
+            self.addCleanup(alvo.stop)
+
+    def test_libera_para_sorteio_mesmo_se_o_ffprobe_falhar(self):
+        with mock.patch("core.media_ingest._ingerir", return_value=(None, "rio.mov", {})):
+            self.assertFalse(ingerir_midia("video", 1))
+
+        self.assertTrue(self.midia.disponivel)
+        self.assertIsNotNone(self.midia.verificado_em)
+        self.midia.save.assert_called_once_with()
+        asset_index.invalidar_ids.assert_called_once_with(type(self.midia), 7)
+
+    def test_arquivo_convertido_substitui_o_original(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, pasta)
+        destino = os.path.join(pasta, "normalizado.mp4")
+        with open(destino, "wb") as f:
+            f.write(b"convertido")
+        self.addCleanup(os.remove, destino)
+
+        def salvar(nome, arquivo, save):
+            self.midia.arquivo_video.name = f"videos_base/cidades/{nome}"
+
+        self.midia.arquivo_video.save.side_effect = salvar
+        with mock.patch("core.media_ingest._ingerir", return_value=(destino, "rio.mp4", {"normalizado": True})):
+            self.assertTrue(ingerir_midia("video", 1))
+
+        self.assertTrue(self.midia.normalizado)
+        self.assertTrue(self.midia.disponivel)
+        self.midia.arquivo_video.storage.delete.assert_called_once_with("videos_base/cidades/rio.mov")
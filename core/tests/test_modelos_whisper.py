@@ -0,0 +1,70 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import transcription_utils as tu
+
+
+class RegistroModelosWhisperTests(SimpleTestCase):
+    def setUp(self):
+        self.carregados = []
+
+        def carregar(tamanho, device, compute_type):
+            time.sleep(0.01)  # dá tempo para as outras threads chegarem à trava
+            self.carregados.append((tamanho, device, compute_type))
+            return mock.Mock(name=f"WhisperModel({tamanho})")
+
+        for nome, valor in {
+            "_modelos": {},
+            "_travas_carga": {},
+            "WhisperModel": mock.Mock(side_effect=carregar),
+            "WHISPER_MODELOS": {},
+            "WHISPER_MODEL_SIZE": "medium",
+            "WHISPER_DEVICE": "cpu",
+            "WHISPER_COMPUTE_TYPE": "int8",
+            "WHISPER_OCIOSO_SEGUNDOS": 0,
+        }.items():
+            patcher = mock.patch.object(tu, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_modelo_e_carregado_so_no_primeiro_uso(self):
+        self.assertEqual(self.carregados, [])
+        primeiro = tu.get_whisper_model("transcricao")
+        self.assertIs(tu.get_whisper_model("transcricao"), primeiro)
+        self.assertEqual(self.carregados, [("medium", "cpu", "int8")])
+
+    def test_tarefas_com_a_mesma_configuracao_compartilham_o_modelo(self):
+        self.assertIs(tu.get_whisper_model("transcricao"), tu.get_whisper_model("palavras"))
+        self.assertEqual(len(self.carregados), 1)
+
+    def test_legendas_continuam_no_large_v3(self):
+        self.assertIsNot(tu.get_whisper_model("legendas"), tu.get_whisper_model("transcricao"))
+        self.assertEqual([c[0] for c in self.carregados], ["large-v3", "medium"])
+
+    def test_configuracao_por_tarefa_nos_settings(self):
+        with mock.patch.object(tu, "WHISPER_MODELOS", {"palavras": {"tamanho": "small", "compute_type": "float32"}}):
+            tu.get_whisper_model("palavras")
+        self.assertEqual(self.carregados, [("small", "cpu", "float32")])
+
+    def test_threads_concorrentes_nao_carregam_duas_vezes(self):
+        modelos = []
+        threads = [
+            threading.Thread(target=lambda: modelos.append(tu.get_whisper_model("transcricao")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.carregados), 1)
+        self.assertEqual(len({id(m) for m in modelos}), 1)
+
+    def test_descarregar_libera_os_modelos(self):
+        tu.get_whisper_model("transcricao")
+        tu.descarregar_modelos_whisper()
+        tu.get_whisper_model("transcricao")
+        self.assertEqual(len(self.carregados), 2)
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import services
+
+
+def _arquivo(largura, altura, tipo="video/mp4"):
+    return {"link": f"https://videos.pexels.com/{largura}x{altura}.mp4", "width": largura, "height": altura, "file_type": tipo}
+
+
+class EscolherRendicaoPexelsTests(SimpleTestCase):
+    def test_menor_que_ainda_cobre_a_tela(self):
+        arquivos = [_arquivo(2160, 3840), _arquivo(1080, 1920), _arquivo(720, 1280), _arquivo(1440, 2560)]
+        self.assertEqual(services.escolher_rendicao_pexels(arquivos)["width"], 1080)
+
+    def test_paisagem_precisa_cobrir_a_altura(self):
+        # O grafo faz scale(increase)+crop: 1920x1080 teria que ser ampliado
+        arquivos = [_arquivo(1920, 1080), _arquivo(3840, 2160)]
+        self.assertEqual(services.escolher_rendicao_pexels(arquivos)["width"], 3840)
+
+    def test_nenhuma_cobre_fica_com_a_maior(self):
+        arquivos = [_arquivo(540, 960), _arquivo(720, 1280)]
+        self.assertEqual(services.escolher_rendicao_pexels(arquivos)["width"], 720)
+
+    def test_ignora_o_que_nao_e_mp4_ou_nao_tem_tamanho(self):
+        arquivos = [_arquivo(1080, 1920, "video/webm"), {"link": "x", "width": None, "height": None}, _arquivo(720, 1280)]
+        self.assertEqual(services.escolher_rendicao_pexels(arquivos)["width"], 720)
+
+    def test_sem_arquivos(self):
+        self.assertIsNone(services.escolher_rendicao_pexels([]))
+
+
+class BaixarCenaPexelsTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.temp_dir = pasta.name
+        busca = mock.Mock(status_code=200)
+        busca.json.return_value = {"videos": [{"id": 9, "video_files": [_arquivo(1080, 1920), _arquivo(2160, 3840)]}]}
+        for alvo, valor in {
+            "PEXELS_FFMPEG_DIRETO": False,
+            "http_client": mock.Mock(**{"get.return_value": busca}),
+            "scene_cache": mock.Mock(**{
+                "escolher_video_pexels.side_effect": lambda videos: videos[0],
+                "obter_clipe_pexels.return_value": None,
+                "normalizar_e_guardar_clipe.side_effect": lambda video_id, caminho, temp_dir: caminho,
+            }),
+        }.items():
+            patcher = mock.patch.object(services, alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _baixar(self, conteudo):
+        def baixar(url, destino, timeout, cancelado):
+            with open(destino, "wb") as f:
+                f.write(conteudo)
+            return destino
+
+        services.http_client.baixar_para_arquivo.side_effect = baixar
+        return services._baixar_cena_pexels(0, "mar", 3, {}, self.temp_dir, threading.Event())
+
+    def test_baixa_em_blocos_a_rendicao_escolhida(self):
+        cena = self._baixar(b"mp4")
+        self.assertEqual(cena.caminho, os.path.join(self.temp_dir, "pexels_000.mp4"))
+        url = services.http_client.baixar_para_arquivo.call_args.args[0]
+        self.assertTrue(url.endswith("1080x1920.mp4"))
+        services.scene_cache.normalizar_e_guardar_clipe.assert_called_once()
+
+    def test_download_vazio_nao_vira_cena(self):
+        self.assertIsNone(self._baixar(b""))
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_clipe_em_cache_nao_e_baixado(self):
+        services.scene_cache.obter_clipe_pexels.return_value = "/tmp/cache.mp4"
+        cena = services._baixar_cena_pexels(0, "mar", 3, {}, self.temp_dir, threading.Event())
+        self.assertEqual(cena.caminho, "/tmp/cache.mp4")
+        services.http_client.baixar_para_arquivo.assert_not_called()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core import services
+from core.forms import VOZES_KOKORO
+from core.models import Usuario
+
+VOZ = VOZES_KOKORO[0][0]
+
+
+class PreviewVozAudioTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username="ouvinte", email="ouvinte@example.com", password="senha-teste", email_verificado=True,
+        )
+        self.client.force_login(usuario)
+
+        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
+            f.write(b"ID3mp3")
+        self.addCleanup(os.remove, f.name)
+
+        self.pronto = mock.patch("core.views.preview_voz_pronto", return_value=True).start()
+        self.obter = mock.patch("core.views.obter_preview_voz", return_value=f.name).start()
+        mock.patch("core.views.versao_preview_voz", return_value="v1").start()
+        self.falhou = mock.patch("core.views.preview_voz_falhou", return_value=False).start()
+        self.addCleanup(mock.patch.stopall)
+        self.url = reverse("preview_voz_audio", args=[VOZ])
+
+    def test_serve_o_mp3_com_etag_e_cache_longo(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(b"".join(resposta.streaming_content), b"ID3mp3")
+        resposta.close()
+        self.assertEqual(resposta["ETag"], '"v1"')
+        self.assertIn("immutable", resposta["Cache-Control"])
+
+    def test_etag_igual_responde_304_sem_abrir_o_arquivo(self):
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH='"v1"')
+        self.assertEqual(resposta.status_code, 304)
+        self.obter.assert_not_called()
+
+    def test_etag_antiga_recebe_o_arquivo(self):
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH='"v0"')
+        self.assertEqual(resposta.status_code, 200)
+        resposta.close()
+
+    def test_preview_em_geracao_responde_202(self):
+        self.pronto.return_value = False
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(resposta["Retry-After"], "2")
+        self.assertEqual(resposta["Cache-Control"], "no-store")
+        self.obter.assert_not_called()
+
+    def test_falha_recente_responde_500(self):
+        self.pronto.return_value = False
+        self.falhou.return_value = True
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 500)
+        resposta = self.client.get(reverse("preview_voz", args=[VOZ]))
+        self.assertEqual(resposta.status_code, 500)
+
+    def test_voz_desconhecida(self):
+        resposta = self.client.get(reverse("preview_voz_audio", args=["voz_que_nao_existe"]))
+        self.assertEqual(resposta.status_code, 404)
+
+
+class ExecutorImediato:
+    def submit(self, funcao, *args):
+        funcao(*args)
+
+
+class PreviewVozFalhaTests(SimpleTestCase):
+    def setUp(self):
+        for nome, valor in {
+            "_previews_falhas": {},
+            "_previews_pendentes": set(),
+            "_previews_executor": ExecutorImediato(),
+            "caminho_preview_voz": mock.Mock(return_value="/nao/existe.mp3"),
+        }.items():
+            patcher = mock.patch.object(services, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(services, "obter_preview_voz", side_effect=RuntimeError("libmp3lame"))
+        self.obter = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_falha_nao_e_repetida_a_cada_poll(self):
+        self.assertFalse(services.preview_voz_pronto(VOZ))
+        self.assertTrue(services.preview_voz_falhou(VOZ))
+        for _ in range(5):
+            self.assertFalse(services.preview_voz_pronto(VOZ))
+        self.assertEqual(self.obter.call_count, 1)
+        self.assertNotIn(VOZ, services._previews_pendentes)
+
+    def test_tenta_de_novo_depois_da_janela(self):
+        services.preview_voz_pronto(VOZ)
+        with mock.patch.object(services, "PREVIEW_VOZ_FALHA_SEGUNDOS", 0):
+            self.assertFalse(services.preview_voz_falhou(VOZ))
+            services.preview_voz_pronto(VOZ)
+        self.assertEqual(self.obter.call_count, 2)
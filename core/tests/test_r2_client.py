@@ -0,0 +1,71 @@
+import os
+import threading
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from django.test import SimpleTestCase
+
+from core import r2_client, utils
+from core.r2_client import TRANSFERENCIA
+
+
+class ClienteR2Tests(SimpleTestCase):
+    def setUp(self):
+        self.boto3 = mock.Mock()
+        self.boto3.session.Session.return_value.client.side_effect = lambda *args, **kwargs: mock.Mock()
+        for nome, valor in {"_clientes": {}, "boto3": self.boto3}.items():
+            patcher = mock.patch.object(r2_client, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _criados(self):
+        return self.boto3.session.Session.return_value.client.call_count
+
+    def test_um_cliente_por_processo(self):
+        cliente = r2_client.get_r2_client()
+        self.assertIs(r2_client.get_r2_client(), cliente)
+        self.assertEqual(self._criados(), 1)
+
+        config = self.boto3.session.Session.return_value.client.call_args.kwargs["config"]
+        self.assertEqual(config.max_pool_connections, r2_client.R2_CONEXOES)
+        self.assertEqual(config.retries, {"max_attempts": r2_client.R2_TENTATIVAS, "mode": "standard"})
+
+    def test_processo_filho_cria_o_seu(self):
+        do_pai = r2_client.get_r2_client()
+        with mock.patch.object(r2_client.os, "getpid", return_value=-1):
+            do_filho = r2_client.get_r2_client()
+        self.assertIsNot(do_filho, do_pai)
+        self.assertEqual(list(r2_client._clientes), [-1])
+
+    def test_threads_concorrentes_criam_um_cliente(self):
+        clientes = []
+        threads = [threading.Thread(target=lambda: clientes.append(r2_client.get_r2_client())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self._criados(), 1)
+        self.assertEqual(len({id(c) for c in clientes}), 1)
+
+
+class HelpersR2Tests(SimpleTestCase):
+    def setUp(self):
+        self.cliente = mock.Mock()
+        patcher = mock.patch.object(utils, "get_r2_client", return_value=self.cliente)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_usa_o_cliente_compartilhado_e_o_multipart(self):
+        self.assertTrue(utils.upload_to_r2("/tmp/video.mp4", "videos_gerados/a.mp4"))
+        self.assertIs(self.cliente.upload_file.call_args.kwargs["Config"], TRANSFERENCIA)
+
+    def test_download_de_chave_usa_o_cliente_compartilhado(self):
+        caminho = utils.download_from_cloudflare("media/musicas/a.mp3", ".mp3")
+        self.addCleanup(os.remove, caminho)
+        args, kwargs = self.cliente.download_file.call_args
+        self.assertEqual(args[1:], ("media/musicas/a.mp3", caminho))
+        self.assertIs(kwargs["Config"], TRANSFERENCIA)
+
+    def test_erro_do_r2_vira_false(self):
+        self.cliente.upload_file.side_effect = ClientError({"Error": {"Code": "500"}}, "PutObject")
+        self.assertFalse(utils.upload_to_r2("/tmp/video.mp4", "videos_gerados/a.mp4"))
@@ -0,0 +1,107 @@
+from django.test import SimpleTestCase
+
+from core.encoder_profiles import PERFIS
+from core.ken_burns import FPS
+from core.render_plan import (
+    ARGS_CODIFICACAO_PADRAO, Cena, PlanoRender, args_copia_de_video, distribuir_duracao, escapar_caminho_filtro,
+)
+
+
+class ArgsCopiaDeVideoTests(SimpleTestCase):
+    def test_troca_a_codificacao_do_video_por_copia(self):
+        args = PERFIS["padrao"].args(FPS)
+        self.assertEqual(args_copia_de_video(args), ["-c:v", "copy", "-c:a", "aac", "-b:a", "128k"])
+
+    def test_mantem_as_opcoes_que_nao_sao_de_video(self):
+        args = ["-c:v", "libx264", "-g", "60", "-b:v", "4M", "-movflags", "+faststart", "-c:a", "aac", "-ar", "44100"]
+        self.assertEqual(
+            args_copia_de_video(args),
+            ["-c:v", "copy", "-movflags", "+faststart", "-c:a", "aac", "-ar", "44100"],
+        )
+
+    def test_sem_audio(self):
+        self.assertEqual(args_copia_de_video(PERFIS["premium"].args(FPS, com_audio=False)), ["-c:v", "copy"])
+
+
+def _valor(cmd, opcao):
+    return cmd[cmd.index(opcao) + 1]
+
+
+class PlanoRenderTests(SimpleTestCase):
+    def _cenas(self):
+        return distribuir_duracao([Cena("imagem", "a.jpg"), Cena("video", "b.mp4")], 10.0)
+
+    def test_duracao_dividida_entre_as_cenas(self):
+        self.assertEqual([cena.duracao for cena in self._cenas()], [5.0, 5.0])
+        self.assertEqual(distribuir_duracao([], 10.0), [])
+
+    def test_video_inteiro_num_unico_comando(self):
+        plano = PlanoRender()
+        plano.fundo_de_cenas(self._cenas(), motor_ken_burns="filtro")
+        plano.legendas_ass("/tmp/legenda.ass")
+        plano.marca_dagua()
+        plano.sobrepor_imagem("texto.png")
+        plano.definir_audio(caminho_musica="musica.mp3", caminho_narrador="narracao.wav", volume_musica=0.3)
+        cmd = plano.comando("saida.mp4", 10.0, caminho_thumbnail="thumb.jpg")
+
+        self.assertEqual(cmd.count("-filter_complex"), 1)
+        self.assertEqual(
+            [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"],
+            ["a.jpg", "b.mp4", "texto.png", "musica.mp3", "narracao.wav"],
+        )
+        # O clipe fica em loop e é cortado na duração da cena
+        indice_clipe = cmd.index("b.mp4")
+        self.assertEqual(cmd[indice_clipe - 5:indice_clipe - 1], ["-stream_loop", "-1", "-t", "5.000"])
+
+        grafo = _valor(cmd, "-filter_complex").split(";")
+        self.assertIn("zoompan", grafo[0])
+        self.assertTrue(grafo[0].startswith("[0:v]"))
+        self.assertTrue(grafo[1].startswith("[1:v]"))
+        self.assertIn("concat=n=2:v=1:a=0", grafo[2])
+        self.assertIn("ass=filename='/tmp/legenda.ass'", grafo[3])
+        self.assertIn("LUNDERON.COM", grafo[4])
+        self.assertIn("[2:v]overlay=", grafo[5])
+        self.assertIn("[3:a]volume=0.3", grafo[6])
+        self.assertTrue(grafo[7].startswith("[4:a]"))
+        self.assertIn("amix=inputs=2", grafo[7])
+        self.assertIn("split=2[v_final][v_thumb_src]", grafo[8])
+        self.assertEqual(grafo[9], f"[v_thumb_src]trim=start_frame={FPS}:end_frame={FPS + 1}[v_thumb]")
+
+        mapas = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-map"]
+        self.assertEqual(mapas, ["[v_final]", plano.audio, "[v_thumb]"])
+        # O vídeo final vem antes da thumbnail, com a codificação padrão
+        saida = cmd.index("saida.mp4")
+        self.assertEqual(cmd[saida - 2:saida], ["-t", "10.0"])
+        self.assertEqual(cmd[saida - 2 - len(ARGS_CODIFICACAO_PADRAO):saida - 2], ARGS_CODIFICACAO_PADRAO)
+        self.assertEqual(cmd[-1], "thumb.jpg")
+
+    def test_thumbnail_nao_passa_do_fim_do_video(self):
+        plano = PlanoRender()
+        plano.fundo_de_video("fundo.mp4")
+        cmd = plano.comando("saida.mp4", 0.5, caminho_thumbnail="thumb.jpg")
+        quadro = int(0.4 * FPS)
+        self.assertIn(f"trim=start_frame={quadro}:end_frame={quadro + 1}", _valor(cmd, "-filter_complex"))
+
+    def test_cena_unica_dispensa_o_concat(self):
+        plano = PlanoRender()
+        plano.fundo_de_cenas([Cena("video", "b.mp4", 4.0)], motor_ken_burns="filtro")
+        cmd = plano.comando("saida.mp4", 4.0)
+        self.assertNotIn("concat", _valor(cmd, "-filter_complex"))
+        self.assertEqual(_valor(cmd, "-map"), plano.video)
+
+    def test_so_narracao(self):
+        plano = PlanoRender()
+        plano.fundo_de_video("fundo.mp4", loop=True)
+        plano.definir_audio(caminho_narrador="narracao.wav")
+        cmd = plano.comando("saida.mp4", 8.0)
+        self.assertIn("[1:a]acopy", _valor(cmd, "-filter_complex"))
+        self.assertNotIn("-an", cmd)
+        self.assertEqual(cmd[cmd.index("fundo.mp4") - 3:cmd.index("fundo.mp4") - 1], ["-stream_loop", "-1"])
+
+    def test_sem_audio(self):
+        plano = PlanoRender()
+        plano.fundo_de_video("fundo.mp4")
+        self.assertIn("-an", plano.comando("saida.mp4", 8.0))
+
+    def test_caminho_escapado_para_o_filtro(self):
+        self.assertEqual(escapar_caminho_filtro("C:\\temp\\legenda.ass"), "C\\:/temp/legenda.ass")
@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import scene_planner
+from core.cache_utils import CacheDisco
+from core.scene_planner import ESTILO_IMAGEM, ESTILO_PEXELS
+
+HISTORIA = (
+    "O marinheiro enfrentou a tempestade no oceano escuro. "
+    "Depois o marinheiro chegou ao castelo abandonado na montanha. "
+    "No castelo encontrou um dragão dourado dormindo sobre tesouros."
+)
+
+
+def _resposta(conteudo):
+    resposta = mock.Mock()
+    resposta.json.return_value = {"choices": [{"message": {"content": json.dumps(conteudo)}}]}
+    return resposta
+
+
+class PlanejarCenasTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.cache = CacheDisco("roteiros", os.path.join(pasta.name, "roteiros"), tamanho_max_bytes=1024 * 1024)
+        patcher = mock.patch.object(scene_planner, "cache_roteiros", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_uma_chamada_ao_llm_e_depois_o_cache(self):
+        with mock.patch.object(scene_planner.http_client, "post", return_value=_resposta({"cenas": ["storm", "castle"]})) as post:
+            primeiro = scene_planner.planejar_cenas(HISTORIA, 2, ESTILO_PEXELS)
+            segundo = scene_planner.planejar_cenas(HISTORIA, 2, ESTILO_PEXELS)
+
+        self.assertEqual((primeiro.cenas, primeiro.origem), (["storm", "castle"], "llm"))
+        self.assertEqual((segundo.cenas, segundo.origem), (["storm", "castle"], "cache"))
+        post.assert_called_once()
+        corpo = post.call_args.kwargs["json"]
+        self.assertEqual(corpo["response_format"], {"type": "json_object"})
+        self.assertIn("exactly 2", corpo["messages"][0]["content"])
+
+    def test_llm_devolve_cenas_demais(self):
+        with mock.patch.object(scene_planner.http_client, "post", return_value=_resposta({"cenas": ["a", " ", "b", "c"]})):
+            self.assertEqual(scene_planner.planejar_cenas(HISTORIA, 2).cenas, ["a", "b"])
+
+    def test_falha_do_llm_usa_cenas_genericas_em_ingles(self):
+        with mock.patch.object(scene_planner.http_client, "post", return_value=_resposta({"cenas": []})):
+            roteiro = scene_planner.planejar_cenas(HISTORIA, 3, ESTILO_IMAGEM)
+        self.assertEqual((roteiro.cenas, roteiro.idioma, roteiro.origem), (scene_planner.cenas_genericas(3), "en", "generico"))
+
+    def test_falha_do_llm_usa_palavras_chave_para_o_pexels(self):
+        with mock.patch.object(scene_planner.http_client, "post", side_effect=ConnectionError("fora")):
+            roteiro = scene_planner.planejar_cenas(HISTORIA, 3, ESTILO_PEXELS)
+        self.assertEqual((roteiro.idioma, roteiro.origem), ("pt", "local"))
+        self.assertEqual(len(roteiro.cenas), 3)
+
+    def test_llm_lento_nao_segura_o_video_mas_alimenta_o_cache(self):
+        liberar = threading.Event()
+        respondeu = threading.Event()
+        gravar = scene_planner._gravar_cache
+
+        def gravar_e_avisar(*args):
+            gravar(*args)
+            respondeu.set()
+
+        def post_lento(*args, **kwargs):
+            liberar.wait(5)
+            return _resposta({"cenas": ["storm", "castle"]})
+
+        with mock.patch.object(scene_planner.http_client, "post", side_effect=post_lento), \
+                mock.patch.object(scene_planner, "ROTEIRO_TIMEOUT_SEGUNDOS", 0.05), \
+                mock.patch.object(scene_planner, "_gravar_cache", side_effect=gravar_e_avisar):
+            roteiro = scene_planner.planejar_cenas(HISTORIA, 2, ESTILO_PEXELS)
+            self.assertEqual(roteiro.origem, "local")
+            liberar.set()
+            self.assertTrue(respondeu.wait(5))
+
+        self.assertEqual(scene_planner.planejar_cenas(HISTORIA, 2, ESTILO_PEXELS).origem, "cache")
+
+    def test_historia_vazia(self):
+        self.assertEqual(scene_planner.planejar_cenas("  ", 3).origem, "vazio")
+
+
+class RoteiroLocalTests(SimpleTestCase):
+    def test_palavras_chave_seguem_a_ordem_da_historia(self):
+        cenas = scene_planner.palavras_chave_locais(HISTORIA, 3)
+        self.assertEqual(len(cenas), 3)
+        self.assertIn("marinheiro", cenas[0])
+        self.assertIn("dragão", cenas[2])
+        # Sem stopwords nem palavras curtas
+        self.assertNotIn("depois", " ".join(cenas))
+
+    def test_termo_repetido_nao_domina_todas_as_cenas(self):
+        # "castelo" tem a maior pontuação nos três trechos, mas só entra no primeiro
+        texto = "castelo " * 10 + "castelo " * 7 + "floresta " * 3 + "castelo " * 7 + "lago " * 3
+        self.assertEqual(scene_planner.palavras_chave_locais(texto, 3, 1), ["castelo", "floresta", "lago"])
+
+    def test_sem_palavras_uteis(self):
+        self.assertEqual(scene_planner.palavras_chave_locais("e o de um", 3), [])
+
+    def test_cenas_genericas_repetem_em_ordem(self):
+        total = len(scene_planner.CENAS_GENERICAS_IMAGEM)
+        cenas = scene_planner.cenas_genericas(total + 1)
+        self.assertEqual(cenas[:total], scene_planner.CENAS_GENERICAS_IMAGEM)
+        self.assertEqual(cenas[-1], cenas[0])
@@ -0,0 +1,148 @@
+import io
+import os
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+import torch
+from django.test import SimpleTestCase
+
+from core import services
+from core.tts_utils import KOKORO_SAMPLE_RATE
+
+
+class ResultadoFalso:
+    """Como o KPipeline.Result: desempacota em (grafemas, fonemas, áudio)."""
+
+    def __init__(self, texto, audio):
+        self.graphemes = texto
+        self.phonemes = ""
+        self.audio = audio
+
+    def __iter__(self):
+        return iter((self.graphemes, self.phonemes, self.audio))
+
+
+class PipelineFalso:
+    def __init__(self, blocos):
+        self.voices = {}
+        self.blocos = blocos
+        self.chamadas = []
+
+    def __call__(self, texto, voice, speed, split_pattern):
+        self.chamadas.append((texto, voice, speed))
+        for i, bloco in enumerate(self.blocos):
+            yield ResultadoFalso(f"trecho {i}", bloco)
+
+
+class SinteseEmBlocosTests(SimpleTestCase):
+    def setUp(self):
+        self.pipeline = PipelineFalso([
+            torch.full((KOKORO_SAMPLE_RATE,), 0.5),
+            None,  # trecho sem áudio (ex.: só pontuação)
+            torch.full((KOKORO_SAMPLE_RATE // 2,), -0.5),
+        ])
+
+        @contextmanager
+        def usar_pipeline(lang_code="p"):
+            yield self.pipeline
+
+        for nome, valor in {
+            "usar_pipeline": usar_pipeline,
+            "_carregar_voz_para_sintese": mock.Mock(return_value=torch.zeros(4)),
+            "registrar_sintese": mock.Mock(),
+        }.items():
+            patcher = mock.patch.object(services, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_blocos_saem_um_a_um_em_float32(self):
+        blocos = list(services.sintetizar_em_blocos("texto", "pf_dora", torch.zeros(4), 1.0))
+
+        self.assertEqual([len(bloco) for bloco, _ in blocos], [KOKORO_SAMPLE_RATE, KOKORO_SAMPLE_RATE // 2])
+        self.assertTrue(all(bloco.dtype == np.float32 for bloco, _ in blocos))
+        self.assertEqual([resultado.graphemes for _, resultado in blocos], ["trecho 0", "trecho 2"])
+        self.assertIn("pf_dora", self.pipeline.voices)
+        services.registrar_sintese.assert_called_once_with(mock.ANY, 1.5)
+
+    def test_pcm_cru_vai_para_o_destino(self):
+        destino = io.BytesIO()
+        duracao = services.escrever_pcm_narracao("texto", "pf_dora", 100, destino)
+
+        self.assertEqual(duracao, 1.5)
+        pcm = np.frombuffer(destino.getvalue(), dtype=np.float32)
+        self.assertEqual(len(pcm), KOKORO_SAMPLE_RATE * 3 // 2)
+        self.assertEqual(pcm[0], 0.5)
+        self.assertEqual(pcm[-1], -0.5)
+        self.assertEqual(self.pipeline.chamadas[0][2], 1.0)
+
+    def test_wav_escrito_bloco_a_bloco(self):
+        cache = mock.Mock(**{"obter.return_value": None})
+        with mock.patch.object(services, "cache_narracao", cache), \
+                mock.patch.object(services, "alinhar_palavras_kokoro", return_value=[]) as alinhar:
+            caminho, _, duracao = services.gerar_audio_e_tempos("texto", "pf_dora", 100, obter_tempos=True)
+        self.addCleanup(os.remove, caminho)
+
+        self.assertEqual(duracao, 1.5)
+        self.assertEqual(sf.info(caminho).frames, KOKORO_SAMPLE_RATE * 3 // 2)
+        # Cada bloco é alinhado a partir de onde o anterior terminou
+        self.assertEqual([c.args[1:] for c in alinhar.call_args_list], [(0.0, 1.0), (1.0, 0.5)])
+        cache.guardar.assert_called_once()
+
+    def test_sem_audio_nao_deixa_arquivo(self):
+        self.pipeline.blocos = [None]
+        cache = mock.Mock(**{"obter.return_value": None})
+        criados = []
+        criar = tempfile.NamedTemporaryFile
+
+        def criar_e_anotar(*args, **kwargs):
+            arquivo = criar(*args, **kwargs)
+            criados.append(arquivo.name)
+            return arquivo
+
+        with mock.patch.object(services, "cache_narracao", cache), \
+                mock.patch.object(tempfile, "NamedTemporaryFile", side_effect=criar_e_anotar):
+            self.assertEqual(services.gerar_audio_e_tempos("texto", "pf_dora", 100), (None, None, 0))
+        self.assertEqual(len(criados), 1)
+        self.assertFalse(os.path.exists(criados[0]))
+        cache.guardar.assert_not_called()
+
+
+class SintetizarParaFfmpegTests(SimpleTestCase):
+    def setUp(self):
+        self.processo = mock.Mock(stdin=io.BytesIO(), returncode=0)
+        self.processo.communicate.return_value = (None, b"")
+        patcher = mock.patch.object(services.subprocess, "Popen", return_value=self.processo)
+        self.popen = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pcm_entra_pelo_stdin_do_ffmpeg(self):
+        def escrever(texto, voz, velocidade, destino):
+            destino.write(b"\x00" * 8)
+            return 2.0
+
+        with mock.patch.object(services, "escrever_pcm_narracao", side_effect=escrever):
+            self.assertEqual(services.sintetizar_para_ffmpeg("texto", "pf_dora", 100, ["saida.mp3"]), 2.0)
+
+        cmd = self.popen.call_args.args[0]
+        self.assertEqual(cmd[cmd.index("-i") + 1], "pipe:0")
+        self.assertEqual(cmd[-1], "saida.mp3")
+        self.assertTrue(self.processo.stdin.closed)
+
+    def test_falha_na_sintese_mata_o_ffmpeg(self):
+        with mock.patch.object(services, "escrever_pcm_narracao", side_effect=RuntimeError("kokoro")):
+            with self.assertRaises(RuntimeError):
+                services.sintetizar_para_ffmpeg("texto", "pf_dora", 100, ["saida.mp3"])
+        self.processo.kill.assert_called_once_with()
+        self.processo.wait.assert_called_once_with()
+
+    def test_erro_do_ffmpeg_sobe_com_o_stderr(self):
+        self.processo.returncode = 1
+        self.processo.communicate.return_value = (None, b"Unknown encoder")
+        with mock.patch.object(services, "escrever_pcm_narracao", return_value=2.0):
+            with self.assertRaises(subprocess.CalledProcessError) as contexto:
+                services.sintetizar_para_ffmpeg("texto", "pf_dora", 100, ["saida.mp3"])
+        self.assertEqual(contexto.exception.stderr, "Unknown encoder")
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import torch
+from django.test import SimpleTestCase
+
+from core import services, tts_utils
+from core.tts_utils import SEGUNDOS_POR_FRAME
+
+
+def _resultado(texto, fonemas="", pred_dur=None, tokens=None):
+    return SimpleNamespace(graphemes=texto, phonemes=fonemas, pred_dur=pred_dur, tokens=tokens)
+
+
+class AlinharPalavrasKokoroTests(SimpleTestCase):
+    def setUp(self):
+        pipeline = SimpleNamespace(model=SimpleNamespace(vocab=dict.fromkeys("abcdefg ", 1)))
+        patcher = mock.patch.object(tts_utils, "get_kokoro_pipeline", return_value=pipeline)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertTempos(self, palavras, esperado):
+        self.assertEqual([p["word"] for p in palavras], [e[0] for e in esperado])
+        for palavra, (_, inicio, fim) in zip(palavras, esperado):
+            self.assertAlmostEqual(palavra["start"], inicio)
+            self.assertAlmostEqual(palavra["end"], fim)
+
+    def test_duracoes_por_fonema_viram_tempos_por_palavra(self):
+        # Bordas de 2 frames; "ab" e "cd" com 4 frames por fonema, espaço de 2
+        resultado = _resultado("ab cd", "ab cd", torch.tensor([2, 4, 4, 2, 4, 4, 2]))
+        palavras = tts_utils.alinhar_palavras_kokoro(resultado, 10.0, 22 * SEGUNDOS_POR_FRAME)
+        self.assertTempos(palavras, [("ab", 10.05, 10.25), ("cd", 10.3, 10.5)])
+
+    def test_escala_as_duracoes_para_o_audio_real(self):
+        resultado = _resultado("ab cd", "ab cd", torch.tensor([2, 4, 4, 2, 4, 4, 2]))
+        palavras = tts_utils.alinhar_palavras_kokoro(resultado, 0.0, 2 * 22 * SEGUNDOS_POR_FRAME)
+        self.assertTempos(palavras, [("ab", 0.1, 0.5), ("cd", 0.6, 1.0)])
+
+    def test_fonemas_fora_do_vocabulario_sao_ignorados(self):
+        resultado = _resultado("ab cd", "ab ˈcd", torch.tensor([2, 4, 4, 2, 4, 4, 2]))
+        palavras = tts_utils.alinhar_palavras_kokoro(resultado, 0.0, 22 * SEGUNDOS_POR_FRAME)
+        self.assertTempos(palavras, [("ab", 0.05, 0.25), ("cd", 0.3, 0.5)])
+
+    def test_g2p_que_juntou_palavras_distribui_dentro_da_fala(self):
+        # Três palavras no texto, duas no G2P: a fala vai de 0.05 s a 0.5 s
+        resultado = _resultado("a bb c", "ab cd", torch.tensor([2, 4, 4, 2, 4, 4, 2]))
+        palavras = tts_utils.alinhar_palavras_kokoro(resultado, 0.0, 22 * SEGUNDOS_POR_FRAME)
+        self.assertTempos(palavras, [("a", 0.05, 0.1625), ("bb", 0.1625, 0.3875), ("c", 0.3875, 0.5)])
+
+    def test_sem_duracoes_distribui_pelo_numero_de_letras(self):
+        palavras = tts_utils.alinhar_palavras_kokoro(_resultado("ab, abcd!"), 10.0, 3.0)
+        self.assertTempos(palavras, [("ab,", 10.0, 11.0), ("abcd!", 11.0, 13.0)])
+
+    def test_duracoes_que_nao_batem_com_os_fonemas(self):
+        palavras = tts_utils.alinhar_palavras_kokoro(_resultado("ab", "ab", torch.tensor([2, 4])), 0.0, 1.0)
+        self.assertTempos(palavras, [("ab", 0.0, 1.0)])
+
+    def test_timestamps_por_token_tem_prioridade(self):
+        tokens = [
+            SimpleNamespace(text="hello", phonemes="həlˈO", start_ts=0.1, end_ts=0.4),
+            SimpleNamespace(text=",", phonemes="", start_ts=None, end_ts=None),
+            SimpleNamespace(text="world", phonemes="wˈɜɹld", start_ts=0.5, end_ts=0.9),
+        ]
+        palavras = tts_utils.alinhar_palavras_kokoro(_resultado("hello, world", tokens=tokens), 2.0, 1.0)
+        self.assertTempos(palavras, [("hello", 2.1, 2.4), ("world", 2.5, 2.9)])
+
+    def test_trecho_sem_texto(self):
+        self.assertEqual(tts_utils.alinhar_palavras_kokoro(_resultado("  "), 0.0, 1.0), [])
+
+
+class TemposNoCacheDeNarracaoTests(SimpleTestCase):
+    def test_narracao_em_cache_devolve_os_tempos_guardados(self):
+        palavras = [{"word": "oi", "start": 0.0, "end": 0.3}]
+        cache = mock.Mock(**{
+            "obter.return_value": "/cache/narracao.wav",
+            "obter_metadados.return_value": {"duracao": 0.3, "palavras": palavras},
+            "copiar_para_temp.return_value": "/tmp/narracao.wav",
+        })
+        with mock.patch.object(services, "cache_narracao", cache), \
+                mock.patch.object(services, "_carregar_voz_para_sintese", return_value=torch.zeros(4)):
+            self.assertEqual(
+                services.gerar_audio_e_tempos("oi", "pf_dora", 100, obter_tempos=True),
+                ("/tmp/narracao.wav", palavras, 0.3),
+            )
+            self.assertEqual(
+                services.gerar_audio_e_tempos("oi", "pf_dora", 100),
+                ("/tmp/narracao.wav", None, 0.3),
+            )
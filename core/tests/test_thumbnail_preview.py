@@ -0,0 +1,97 @@
+import os
+import subprocess
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import utils
+
+VIDEO_KEY = "videos_gerados/abc.mp4"
+
+
+class ChavesDoVideoTests(SimpleTestCase):
+    def test_thumbnail_e_previa_seguem_o_nome_do_video(self):
+        self.assertEqual(utils.thumbnail_key_do_video(VIDEO_KEY), "thumbnails/abc.jpg")
+        self.assertEqual(utils.preview_key_do_video(VIDEO_KEY), "previews/abc.webp")
+
+
+class PublicarThumbnailEPreviewTests(SimpleTestCase):
+    def setUp(self):
+        self.enviados = {}
+
+        def enviar(caminho, object_key):
+            self.enviados[object_key] = caminho
+            return True
+
+        for nome, valor in {
+            "upload_to_r2": mock.Mock(side_effect=enviar),
+            "gerar_thumbnail_local": mock.Mock(),
+            "gerar_preview_webp": mock.Mock(),
+        }.items():
+            patcher = mock.patch.object(utils, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _thumbnail_pronta(self):
+        fd, caminho = tempfile.mkstemp(suffix=".jpg")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"jpeg")
+        self.addCleanup(os.remove, caminho)
+        return caminho
+
+    def test_thumbnail_do_render_so_e_enviada(self):
+        thumbnail = self._thumbnail_pronta()
+        chaves = utils.publicar_thumbnail_e_preview("/tmp/video.mp4", VIDEO_KEY, 30.0, thumbnail)
+
+        self.assertEqual(chaves, ("thumbnails/abc.jpg", "previews/abc.webp"))
+        self.assertEqual(self.enviados["thumbnails/abc.jpg"], thumbnail)
+        utils.gerar_thumbnail_local.assert_not_called()
+        utils.gerar_preview_webp.assert_called_once_with("/tmp/video.mp4", self.enviados["previews/abc.webp"], 30.0)
+        # O arquivo do render fica com o chamador; os temporários daqui somem
+        self.assertTrue(os.path.exists(thumbnail))
+        self.assertFalse(os.path.exists(self.enviados["previews/abc.webp"]))
+
+    def test_sem_thumbnail_extrai_um_quadro_do_arquivo_local(self):
+        utils.publicar_thumbnail_e_preview("/tmp/video.mp4", VIDEO_KEY, 0.5)
+        caminho, segundo = utils.gerar_thumbnail_local.call_args.args[1:]
+        self.assertAlmostEqual(segundo, 0.4)
+        self.assertEqual(self.enviados["thumbnails/abc.jpg"], caminho)
+        self.assertFalse(os.path.exists(caminho))
+
+    def test_falha_na_thumbnail_nao_impede_a_previa(self):
+        utils.gerar_thumbnail_local.side_effect = subprocess.CalledProcessError(1, ["ffmpeg"])
+        self.assertEqual(
+            utils.publicar_thumbnail_e_preview("/tmp/video.mp4", VIDEO_KEY, 30.0),
+            (None, "previews/abc.webp"),
+        )
+        self.assertNotIn("thumbnails/abc.jpg", self.enviados)
+
+    def test_falha_na_previa(self):
+        utils.gerar_preview_webp.side_effect = subprocess.CalledProcessError(1, ["ffmpeg"])
+        self.assertEqual(
+            utils.publicar_thumbnail_e_preview("/tmp/video.mp4", VIDEO_KEY, 30.0, self._thumbnail_pronta()),
+            ("thumbnails/abc.jpg", None),
+        )
+
+    def test_upload_que_falhou_nao_devolve_a_chave(self):
+        utils.upload_to_r2.side_effect = None
+        utils.upload_to_r2.return_value = False
+        self.assertEqual(utils.publicar_thumbnail_e_preview("/tmp/video.mp4", VIDEO_KEY, 30.0), (None, None))
+
+
+class ComandosFfmpegTests(SimpleTestCase):
+    def test_previa_com_quadros_espacados_pelo_video(self):
+        with mock.patch.object(utils.subprocess, "run") as run:
+            utils.gerar_preview_webp("video.mp4", "previa.webp", 60.0)
+        cmd = run.call_args.args[0]
+        self.assertIn("fps=0.2000,scale=270:-2", cmd[cmd.index("-vf") + 1])
+        self.assertEqual(cmd[cmd.index("-frames:v") + 1], "12")
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "libwebp")
+        self.assertEqual(cmd[-1], "previa.webp")
+
+    def test_thumbnail_com_seek_antes_da_entrada(self):
+        with mock.patch.object(utils.subprocess, "run") as run:
+            utils.gerar_thumbnail_local("video.mp4", "thumb.jpg", 1.0)
+        cmd = run.call_args.args[0]
+        self.assertLess(cmd.index("-ss"), cmd.index("-i"))
@@ -0,0 +1,224 @@
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core import transcription_utils as tu
+from core.audio_utils import SAMPLE_RATE
+from core.tests.redis_falso import RedisFalso
+
+
+def _segmento(start, end, text="", words=None):
+    return SimpleNamespace(start=start, end=end, text=text, words=words)
+
+
+class TranscreverLoteLocalTests(SimpleTestCase):
+    def setUp(self):
+        self.pipeline = mock.Mock()
+        for alvo, valor in {
+            "get_whisper_model": mock.Mock(return_value="modelo"),
+            "BatchedInferencePipeline": mock.Mock(return_value=self.pipeline),
+        }.items():
+            patcher = mock.patch.object(tu, alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.audios = [np.zeros(SAMPLE_RATE * 10, dtype=np.float32), np.zeros(SAMPLE_RATE * 40, dtype=np.float32)]
+
+    def test_janelas_nao_misturam_audios(self):
+        self.pipeline.transcribe.return_value = ([], None)
+        tu._transcrever_lote_local(self.audios)
+
+        janelas = self.pipeline.transcribe.call_args.kwargs["clip_timestamps"]
+        self.assertEqual(janelas, [{"start": 0.0, "end": 10.0}, {"start": 10.0, "end": 40.0}, {"start": 40.0, "end": 50.0}])
+        self.assertEqual(len(self.pipeline.transcribe.call_args.args[0]), SAMPLE_RATE * 50)
+
+    def test_segmentos_voltam_para_o_audio_certo(self):
+        self.pipeline.transcribe.return_value = (
+            [_segmento(1.0, 3.0, "primeiro"), _segmento(12.0, 15.0, "segundo"), _segmento(9.5, 10.7, "borda")],
+            None,
+        )
+        primeiro, segundo = tu._transcrever_lote_local(self.audios)
+
+        self.assertEqual(primeiro, [{"start": 1.0, "end": 3.0, "text": "primeiro"}])
+        self.assertEqual(segundo[0], {"start": 2.0, "end": 5.0, "text": "segundo"})
+        # O meio (10.1 s) decide o áudio; a borda fica presa ao início dele
+        self.assertEqual(segundo[1]["start"], 0.0)
+        self.assertAlmostEqual(segundo[1]["end"], 0.7)
+
+    def test_modo_palavras(self):
+        palavras = [SimpleNamespace(word=" oi", start=11.0, end=11.4)]
+        self.pipeline.transcribe.return_value = ([_segmento(11.0, 11.4, " oi", palavras)], None)
+        primeiro, segundo = tu._transcrever_lote_local(self.audios, modo="palavras")
+
+        self.assertEqual(primeiro, [])
+        self.assertEqual(segundo, [{"word": " oi", "start": 1.0, "end": mock.ANY}])
+        self.assertAlmostEqual(segundo[0]["end"], 1.4)
+        self.assertTrue(self.pipeline.transcribe.call_args.kwargs["word_timestamps"])
+
+    def test_sem_audio_nao_chama_o_modelo(self):
+        self.assertEqual(tu._transcrever_lote_local([np.zeros(0, dtype=np.float32)]), [[]])
+        self.pipeline.transcribe.assert_not_called()
+
+
+class RemapearItensTests(SimpleTestCase):
+    def test_tempos_voltam_para_a_linha_do_tempo_original(self):
+        mapa = [(0.0, 4.0, 6.0), (2.5, 20.0, 25.0)]
+        itens = tu._remapear_itens(
+            [{"start": 0.5, "end": 1.5, "text": "a"}, {"start": 3.0, "end": 3.5, "text": "b"}], mapa,
+        )
+        self.assertEqual(itens, [{"start": 4.5, "end": 5.5, "text": "a"}, {"start": 20.5, "end": 21.0, "text": "b"}])
+
+    def test_sem_mapa_nada_muda(self):
+        itens = [{"start": 1.0, "end": 2.0, "text": "a"}]
+        self.assertEqual(tu._remapear_itens(itens, []), [{"start": 1.0, "end": 2.0, "text": "a"}])
+
+
+class FilaTranscricaoTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = RedisFalso()
+        self.entregues = []
+        self.apagados = []
+
+        def assinatura(callback):
+            return SimpleNamespace(delay=lambda itens: self.entregues.append((callback["args"][0], itens)))
+
+        for patcher in (
+            mock.patch.object(tu, "get_redis_client", return_value=self.redis),
+            mock.patch.object(tu, "carregar_audio", side_effect=lambda caminho: np.zeros(SAMPLE_RATE, dtype=np.float32)),
+            mock.patch.object(tu, "_transcrever_lote_local"),
+            mock.patch("celery.signature", side_effect=assinatura),
+            mock.patch("core.utils.download_from_cloudflare", side_effect=self._baixar),
+            mock.patch("core.utils.delete_from_r2", side_effect=self.apagados.append),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.lote = tu._transcrever_lote_local
+        self.lote.side_effect = lambda audios, language, modo: [
+            [{"start": 0.5, "end": 1.0, "text": f"fala {i}"}] for i in range(len(audios))
+        ]
+
+    def _baixar(self, object_key, extensao):
+        if "quebrado" in object_key:
+            return None
+        # O worker apaga o download depois de ler o áudio
+        fd, caminho = tempfile.mkstemp(suffix=extensao)
+        os.close(fd)
+        return caminho
+
+    def _pedido(self, numero, mapa=None, **extra):
+        return {
+            "audio_key": f"transcricao_temp/{numero}.wav", "language": "pt", "modo": "segmentos",
+            "mapa": mapa, "callback": {"task": "core.tasks.task_finalizar_corte_youtube", "args": [numero]}, **extra,
+        }
+
+    def _enfileirar(self, *pedidos):
+        for pedido in pedidos:
+            self.redis.rpush(tu.TRANSCRICAO_FILA_PEDIDOS, json.dumps(pedido))
+
+    def test_callback_recebe_os_itens_remapeados(self):
+        self._enfileirar(self._pedido(1), self._pedido(2, mapa=[[0.0, 30.0, 31.0]]))
+        self.assertEqual(tu.processar_pedidos_transcricao(), 2)
+
+        self.assertEqual(self.entregues, [
+            (1, [{"start": 0.5, "end": 1.0, "text": "fala 0"}]),
+            (2, [{"start": 30.5, "end": 31.0, "text": "fala 1"}]),
+        ])
+        self.assertEqual(self.lote.call_count, 1)  # os dois num único lote
+        self.assertEqual(self.apagados, ["transcricao_temp/1.wav", "transcricao_temp/2.wav"])
+        self.assertEqual(self.redis.lrange(tu.TRANSCRICAO_FILA_PROCESSANDO, 0, -1), [])
+        self.assertEqual(self.redis.hgetall(tu.TRANSCRICAO_PROCESSANDO_DESDE), {})
+
+    def test_audio_que_nao_baixou_recebe_none(self):
+        self._enfileirar(self._pedido(1), self._pedido("quebrado"))
+        tu.processar_pedidos_transcricao()
+        self.assertEqual(dict(self.entregues), {1: [{"start": 0.5, "end": 1.0, "text": "fala 0"}], "quebrado": None})
+
+    def test_lote_que_falhou_entrega_none_a_todos(self):
+        self.lote.side_effect = RuntimeError("sem memória")
+        self._enfileirar(self._pedido(1), self._pedido(2))
+        tu.processar_pedidos_transcricao()
+        self.assertEqual(self.entregues, [(1, None), (2, None)])
+
+    def test_pedido_sem_callback_fica_em_processamento(self):
+        self._enfileirar(self._pedido(1))
+        with mock.patch("celery.signature", side_effect=ConnectionError("broker fora")):
+            with self.assertRaises(ConnectionError):
+                tu.processar_pedidos_transcricao()
+        self.assertEqual(len(self.redis.lrange(tu.TRANSCRICAO_FILA_PROCESSANDO, 0, -1)), 1)
+        self.assertEqual(self.apagados, [])
+
+    def test_pedido_abandonado_volta_para_a_fila(self):
+        bruto = json.dumps(self._pedido(1))
+        self.redis.rpush(tu.TRANSCRICAO_FILA_PROCESSANDO, bruto)
+        self.redis.hset(tu.TRANSCRICAO_PROCESSANDO_DESDE, bruto, time.time() - tu.TRANSCRICAO_PEDIDO_MAX_SEGUNDOS - 1)
+
+        self.assertEqual(tu.processar_pedidos_transcricao(), 1)
+        self.assertEqual(self.entregues, [(1, [{"start": 0.5, "end": 1.0, "text": "fala 0"}])])
+
+    def test_pedido_recente_em_processamento_nao_e_tocado(self):
+        bruto = json.dumps(self._pedido(1))
+        self.redis.rpush(tu.TRANSCRICAO_FILA_PROCESSANDO, bruto)
+        self.redis.hset(tu.TRANSCRICAO_PROCESSANDO_DESDE, bruto, time.time())
+
+        self.assertEqual(tu.processar_pedidos_transcricao(), 0)
+        self.assertEqual(self.redis.lrange(tu.TRANSCRICAO_FILA_PROCESSANDO, 0, -1), [bruto.encode()])
+
+    def test_pedido_sem_horario_comeca_a_contar(self):
+        bruto = json.dumps(self._pedido(1))
+        self.redis.rpush(tu.TRANSCRICAO_FILA_PROCESSANDO, bruto)
+        tu.processar_pedidos_transcricao()
+        self.assertIn(bruto.encode(), self.redis.hgetall(tu.TRANSCRICAO_PROCESSANDO_DESDE))
+        self.assertEqual(self.entregues, [])
+
+    def test_desiste_depois_das_tentativas(self):
+        bruto = json.dumps(self._pedido(1, tentativas=tu.TRANSCRICAO_TENTATIVAS_MAX))
+        self.redis.rpush(tu.TRANSCRICAO_FILA_PROCESSANDO, bruto)
+        self.redis.hset(tu.TRANSCRICAO_PROCESSANDO_DESDE, bruto, 0)
+
+        tu.processar_pedidos_transcricao()
+        self.assertEqual(self.entregues, [(1, None)])
+        self.assertEqual(self.apagados, ["transcricao_temp/1.wav"])
+        self.lote.assert_not_called()
+
+
+class EnfileirarTranscricaoTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = RedisFalso()
+        self.gatilho = mock.Mock()
+        for patcher in (
+            mock.patch.object(tu, "get_redis_client", return_value=self.redis),
+            mock.patch.object(tu, "TRANSCRICAO_VAD", False),
+            mock.patch("core.utils.upload_to_r2", return_value=True),
+            mock.patch("core.utils.delete_from_r2"),
+            mock.patch("core.tasks.task_transcrever_lote", self.gatilho),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        self.callback = {"task": "core.tasks.task_finalizar_corte_youtube", "args": [1]}
+
+    def test_pedido_vai_para_a_fila_e_dispara_o_gatilho(self):
+        tu.enfileirar_transcricao(self.audio, self.callback)
+        (bruto,) = self.redis.lrange(tu.TRANSCRICAO_FILA_PEDIDOS, 0, -1)
+        self.assertEqual(json.loads(bruto)["callback"], self.callback)
+        self.gatilho.delay.assert_called_once_with()
+
+    def test_gatilho_que_falhou_nao_desfaz_o_pedido(self):
+        self.gatilho.delay.side_effect = ConnectionError("broker fora")
+        tu.enfileirar_transcricao(self.audio, self.callback)  # não levanta: o pedido já é do worker
+        self.assertEqual(len(self.redis.lrange(tu.TRANSCRICAO_FILA_PEDIDOS, 0, -1)), 1)
+
+    def test_pedido_fora_da_fila_apaga_o_audio_e_levanta(self):
+        from core import utils
+
+        with mock.patch.object(self.redis, "rpush", side_effect=ConnectionError("redis fora")):
+            with self.assertRaises(ConnectionError):
+                tu.enfileirar_transcricao(self.audio, self.callback)
+        (object_key,), _ = utils.delete_from_r2.call_args
+        self.assertTrue(object_key.startswith("transcricao_temp/"))
+        self.gatilho.delay.assert_not_called()
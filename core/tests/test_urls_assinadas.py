@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from django.test import SimpleTestCase, override_settings
+
+from core import utils
+
+
+@override_settings(AWS_STORAGE_BUCKET_NAME="bucket-teste")
+class UrlsAssinadasTests(SimpleTestCase):
+    def setUp(self):
+        self.assinadas = []
+
+        def assinar(operacao, Params, ExpiresIn):
+            if Params["Key"] == "quebrada":
+                raise ClientError({"Error": {"Code": "500", "Message": "falha"}}, "GeneratePresignedUrl")
+            self.assinadas.append(Params["Key"])
+            return f"https://r2.example/{Params['Key']}?assinatura={len(self.assinadas)}"
+
+        cliente = mock.Mock()
+        cliente.generate_presigned_url.side_effect = assinar
+        self.agora = 1000.0
+        for alvo, valor in {
+            "get_r2_client": mock.Mock(return_value=cliente),
+            "_urls_assinadas": OrderedDict(),
+            "PRESIGNED_CACHE_MAX_SEGUNDOS": 600,
+            "PRESIGNED_CACHE_MAX_ENTRADAS": 3,
+        }.items():
+            patcher = mock.patch.object(utils, alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(utils.time, "monotonic", side_effect=lambda: self.agora)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_url_reaproveitada_dentro_da_janela(self):
+        primeira = utils.generate_presigned_urls(["a"])
+        self.agora += 299
+        self.assertEqual(utils.generate_presigned_urls(["a"]), primeira)
+        self.assertEqual(self.assinadas, ["a"])
+
+    def test_lote_assina_so_as_faltantes(self):
+        utils.generate_presigned_urls(["a"])
+        urls = utils.generate_presigned_urls(["a", "b", "c"])
+        self.assertEqual(set(urls), {"a", "b", "c"})
+        self.assertEqual(self.assinadas, ["a", "b", "c"])
+
+    def test_reassina_depois_da_janela(self):
+        # Janela = metade da validade pedida, limitada a PRESIGNED_CACHE_MAX_SEGUNDOS
+        utils.generate_presigned_urls(["a"], expiration=400)
+        self.agora += 200
+        segunda = utils.generate_presigned_urls(["a"], expiration=400)
+        self.assertEqual(self.assinadas, ["a", "a"])
+        self.assertTrue(segunda["a"].endswith("assinatura=2"))
+
+    def test_validades_diferentes_nao_se_misturam(self):
+        utils.generate_presigned_urls(["a"], expiration=3600)
+        utils.generate_presigned_urls(["a"], expiration=60)
+        self.assertEqual(self.assinadas, ["a", "a"])
+
+    def test_acima_do_limite_sai_a_assinatura_mais_antiga(self):
+        for chave in ("a", "b", "c", "d"):
+            utils.generate_presigned_urls([chave])
+            self.agora += 1
+        self.assertEqual([chave for chave, _ in utils._urls_assinadas], ["b", "c", "d"])
+
+    def test_vencidas_sao_descartadas(self):
+        utils.generate_presigned_urls(["a"])
+        self.agora += 600
+        utils.generate_presigned_urls(["b"])
+        self.assertEqual([chave for chave, _ in utils._urls_assinadas], ["b"])
+
+    def test_chave_com_erro_fica_de_fora(self):
+        urls = utils.generate_presigned_urls(["a", "quebrada"])
+        self.assertEqual(list(urls), ["a"])
+        self.assertNotIn(("quebrada", 3600), utils._urls_assinadas)
@@ -0,0 +1,39 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from core import vad_utils
+from core.audio_utils import SAMPLE_RATE
+
+
+class RemapearTempoTests(SimpleTestCase):
+    def setUp(self):
+        self.audio = np.zeros(SAMPLE_RATE * 10, dtype=np.float32)
+        self.intervalo = vad_utils.VAD_INTERVALO_MS / 1000
+        self.audio_fala, self.mapa = vad_utils.concatenar_regioes(self.audio, [(1.0, 2.0), (5.0, 6.5)])
+
+    def test_mapa_das_regioes_concatenadas(self):
+        self.assertEqual(len(self.audio_fala), round(SAMPLE_RATE * (1.0 + self.intervalo + 1.5)))
+        self.assertEqual(len(self.mapa), 2)
+        self.assertEqual(self.mapa[0], (0.0, 1.0, 2.0))
+        inicio_concat, inicio, fim = self.mapa[1]
+        self.assertAlmostEqual(inicio_concat, 1.0 + self.intervalo)
+        self.assertEqual((inicio, fim), (5.0, 6.5))
+
+    def test_tempos_dentro_das_regioes(self):
+        self.assertAlmostEqual(vad_utils.remapear_tempo(0.0, self.mapa), 1.0)
+        self.assertAlmostEqual(vad_utils.remapear_tempo(0.5, self.mapa), 1.5)
+        self.assertAlmostEqual(vad_utils.remapear_tempo(1.0 + self.intervalo + 0.2, self.mapa), 5.2)
+
+    def test_tempo_no_silencio_inserido_fica_no_fim_da_regiao_anterior(self):
+        self.assertAlmostEqual(vad_utils.remapear_tempo(1.0 + self.intervalo / 2, self.mapa), 2.0)
+
+    def test_tempo_depois_do_fim_nao_passa_da_ultima_regiao(self):
+        self.assertAlmostEqual(vad_utils.remapear_tempo(99.0, self.mapa), 6.5)
+
+    def test_sem_mapa_o_tempo_nao_muda(self):
+        self.assertEqual(vad_utils.remapear_tempo(3.3, []), 3.3)
+
+    def test_sem_regioes(self):
+        audio_fala, mapa = vad_utils.concatenar_regioes(self.audio, [])
+        self.assertEqual(len(audio_fala), 0)
+        self.assertEqual(mapa, [])
@@ -0,0 +1,101 @@
+import tempfile
+from collections import OrderedDict
+from unittest import mock
+
+import numpy as np
+import torch
+from django.test import SimpleTestCase
+
+from core import tts_utils
+
+
+class PipelineFalso:
+    """Só o que o banco de vozes usa do KPipeline: load_voice() e o dict `voices`."""
+
+    def __init__(self):
+        self.voices = {}
+        self.carregadas = []
+
+    def load_voice(self, nome_voz):
+        self.carregadas.append(nome_voz)
+        tensor = torch.from_numpy(np.full(4, len(self.carregadas), dtype=np.float32))
+        self.voices[nome_voz] = tensor
+        return tensor
+
+
+class BancoDeVozesTests(SimpleTestCase):
+    def setUp(self):
+        self.pipeline = PipelineFalso()
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        for nome, valor in {
+            "_vozes_lru": OrderedDict(),
+            "_vozes_fixas": {},
+            "_vozes_custom": {},
+            "_pipelines": {"p": self.pipeline},
+            "VOZES_CACHE_MAX": 2,
+            "VOZES_CUSTOM_DIR": pasta.name,
+        }.items():
+            patcher = mock.patch.object(tts_utils, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_voz_repetida_nao_e_recarregada(self):
+        primeira = tts_utils.obter_voz(self.pipeline, "pm_alex")
+        segunda = tts_utils.obter_voz(self.pipeline, "pm_alex")
+        self.assertIs(primeira, segunda)
+        self.assertEqual(self.pipeline.carregadas, ["pm_alex"])
+
+    def test_descarta_a_voz_menos_usada(self):
+        tts_utils.obter_voz(self.pipeline, "a")
+        tts_utils.obter_voz(self.pipeline, "b")
+        tts_utils.obter_voz(self.pipeline, "a")  # "b" passa a ser a menos usada
+        tts_utils.obter_voz(self.pipeline, "c")
+
+        self.assertEqual(list(tts_utils._vozes_lru), ["a", "c"])
+        # O pipeline também solta o tensor descartado
+        self.assertNotIn("b", self.pipeline.voices)
+        self.assertIn("a", self.pipeline.voices)
+
+    def test_voz_fixada_nao_entra_no_lru(self):
+        tts_utils._carregar_voz_kokoro(self.pipeline, "pf_dora", fixar=True)
+        for nome in ("a", "b", "c"):
+            tts_utils.obter_voz(self.pipeline, nome)
+
+        self.assertIn("pf_dora", tts_utils._vozes_fixas)
+        self.assertNotIn("pf_dora", tts_utils._vozes_lru)
+        tts_utils.obter_voz(self.pipeline, "pf_dora")
+        self.assertEqual(self.pipeline.carregadas.count("pf_dora"), 1)
+
+    def test_voz_em_memoria_nao_carrega(self):
+        self.assertIsNone(tts_utils.voz_em_memoria("a"))
+        self.assertEqual(self.pipeline.carregadas, [])
+
+        tensor = tts_utils.obter_voz(self.pipeline, "a")
+        self.assertIs(tts_utils.voz_em_memoria("a"), tensor)
+
+    def test_voz_desconhecida_usa_a_padrao(self):
+        with mock.patch.object(self.pipeline, "load_voice", side_effect=[RuntimeError("404"), torch.zeros(4)]):
+            tensor = tts_utils.obter_voz(self.pipeline, "nao_existe")
+        self.assertIs(tts_utils._vozes_fixas[tts_utils.VOZ_PADRAO], tensor)
+
+
+class HashVozTests(SimpleTestCase):
+    def setUp(self):
+        for nome, valor in {"_hashes_voz": OrderedDict(), "HASHES_VOZ_MAX": 2}.items():
+            patcher = mock.patch.object(tts_utils, nome, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_mesmo_tensor_reaproveita_o_hash(self):
+        tensor = torch.ones(4)
+        self.assertEqual(tts_utils._hash_voz(tensor), tts_utils._hash_voz(tensor))
+        self.assertEqual(len(tts_utils._hashes_voz), 1)
+
+    def test_hashes_ficam_limitados(self):
+        tensores = [torch.full((4,), float(i)) for i in range(5)]
+        for tensor in tensores:
+            tts_utils._hash_voz(tensor)
+
+        self.assertEqual(len(tts_utils._hashes_voz), 2)
+        self.assertEqual([t for t, _ in tts_utils._hashes_voz.values()], tensores[-2:])
@@ -1,65 +1,456 @@
+import bisect
+import json
+import logging
 import os
-import subprocess
 import tempfile
-from faster_whisper import WhisperModel
+import threading
+import time
+import uuid
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
 from django.conf import settings
 
+from .audio_utils import SAMPLE_RATE, carregar_audio
+from .redis_client import get_redis_client
+from .vad_utils import (
+    VAD_MIN_FALA_SEGUNDOS, concatenar_regioes, detectar_fala, duracao_fala, remapear_tempo,
+)
+
+logger = logging.getLogger(__name__)
+
 # Define o modelo Whisper a ser usado. 'base' é um bom equilíbrio entre velocidade e precisão.
-WHISPER_MODEL_SIZE = "medium"
-_model = None
-
-def get_whisper_model():
-    """Carrega o modelo Whisper uma única vez para reutilização."""
-    global _model
-    if _model is None:
-        # Para produção no Cloud Run, 'cpu' e 'int8' são as melhores opções
-        # para equilibrar performance e consumo de recursos.
-        _model = WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
-    return _model
-
-def extract_audio_from_video(video_path):
-    """
-    Extrai o áudio de um arquivo de vídeo usando ffmpeg.
-    Retorna o caminho para o arquivo de áudio temporário.
-    """
-    audio_temp_dir = os.path.join(settings.MEDIA_ROOT, "audio_temp")
-    os.makedirs(audio_temp_dir, exist_ok=True)
-    
-    audio_filename = os.path.basename(video_path).rsplit('.', 1)[0] + ".wav"
-    audio_path = os.path.join(audio_temp_dir, audio_filename)
-
-    cmd = [
-        "ffmpeg", "-i", video_path, "-vn", "-acodec", "pcm_s16le", 
-        "-ar", "16000", "-ac", "1", "-y", audio_path
+WHISPER_MODEL_SIZE = getattr(settings, "WHISPER_MODELO_PADRAO", "medium")
+# Para produção no Cloud Run, 'cpu' e 'int8' são as melhores opções
+# para equilibrar performance e consumo de recursos.
+WHISPER_DEVICE = getattr(settings, "WHISPER_DEVICE", "cpu")
+WHISPER_COMPUTE_TYPE = getattr(settings, "WHISPER_COMPUTE_TYPE", "int8")
+# Configuração por tipo de tarefa: {"tarefa": {"tamanho": ..., "compute_type": ...}}
+WHISPER_MODELOS = getattr(settings, "WHISPER_MODELOS", {})
+# Tamanho usado quando WHISPER_MODELOS não define a tarefa. As legendas do
+# SubtitleProcessor (texto e alinhamento por palavra) continuam no large-v3.
+TAMANHO_PADRAO_POR_TAREFA = {"legendas": "large-v3"}
+# Descarrega modelos sem uso há mais de N segundos (0 = nunca)
+WHISPER_OCIOSO_SEGUNDOS = getattr(settings, "WHISPER_OCIOSO_SEGUNDOS", 600)
+# Tamanho do lote da inferência em lote (BatchedInferencePipeline). 0/1 = desligado
+WHISPER_BATCH_SIZE = getattr(settings, "WHISPER_BATCH_SIZE", 0)
+# Envia as transcrições dos cortes para o worker dedicado (fila 'transcricao')
+TRANSCRICAO_REMOTA = getattr(settings, "TRANSCRICAO_REMOTA", False)
+# Pedidos que o worker junta numa única chamada de inferência em lote
+TRANSCRICAO_LOTE_MAX = getattr(settings, "TRANSCRICAO_LOTE_MAX", 16)
+# Lista no Redis (broker do Celery) com os pedidos pendentes
+TRANSCRICAO_FILA_PEDIDOS = getattr(settings, "TRANSCRICAO_FILA_PEDIDOS", "transcricao:pedidos")
+# Pedidos retirados por um worker e ainda sem callback, e quando foram retirados
+TRANSCRICAO_FILA_PROCESSANDO = f"{TRANSCRICAO_FILA_PEDIDOS}:processando"
+TRANSCRICAO_PROCESSANDO_DESDE = f"{TRANSCRICAO_FILA_PEDIDOS}:desde"
+# Pedido em processamento há mais que isso = worker morreu; volta para a fila
+TRANSCRICAO_PEDIDO_MAX_SEGUNDOS = getattr(settings, "TRANSCRICAO_PEDIDO_MAX_SEGUNDOS", 1800)
+# Quantas vezes um pedido abandonado volta para a fila antes do callback com None
+TRANSCRICAO_TENTATIVAS_MAX = getattr(settings, "TRANSCRICAO_TENTATIVAS_MAX", 2)
+# Janela máxima de cada trecho decodificado pelo Whisper
+JANELA_WHISPER_SEGUNDOS = 30
+# Pré-passagem de VAD: só os trechos com fala vão para o Whisper
+TRANSCRICAO_VAD = getattr(settings, "TRANSCRICAO_VAD", True)
+
+# Registro único de modelos: (tamanho, device, compute_type) -> {"modelo", "ultimo_uso"}
+_modelos = {}
+_modelos_lock = threading.Lock()
+# Uma trava de carga por chave: carregar um modelo não bloqueia quem usa outro
+_travas_carga = {}
+_coletor_iniciado = False
+
+
+def _config_da_tarefa(tarefa):
+    config = WHISPER_MODELOS.get(tarefa, {})
+    return (
+        config.get("tamanho", TAMANHO_PADRAO_POR_TAREFA.get(tarefa, WHISPER_MODEL_SIZE)),
+        config.get("device", WHISPER_DEVICE),
+        config.get("compute_type", WHISPER_COMPUTE_TYPE),
+    )
+
+
+def _coletar_modelos_ociosos():
+    """Thread de fundo: libera modelos que ficaram sem uso além do limite."""
+    intervalo = max(10, min(60, WHISPER_OCIOSO_SEGUNDOS))
+    while True:
+        time.sleep(intervalo)
+        agora = time.monotonic()
+        with _modelos_lock:
+            for chave in list(_modelos):
+                if agora - _modelos[chave]["ultimo_uso"] > WHISPER_OCIOSO_SEGUNDOS:
+                    del _modelos[chave]
+                    logger.info(f"Whisper: modelo {chave} descarregado por inatividade")
+
+
+def get_whisper_model(tarefa="transcricao"):
+    """
+    Retorna o modelo Whisper da tarefa, carregando-o só no primeiro uso.
+    Tarefas com a mesma configuração compartilham a mesma instância.
+    """
+    global _coletor_iniciado
+    chave = _config_da_tarefa(tarefa)
+
+    with _modelos_lock:
+        entrada = _modelos.get(chave)
+        if entrada is not None:
+            entrada["ultimo_uso"] = time.monotonic()
+            return entrada["modelo"]
+        trava = _travas_carga.setdefault(chave, threading.Lock())
+
+    # Só quem pede o mesmo modelo espera a carga (que leva dezenas de segundos)
+    with trava:
+        with _modelos_lock:
+            entrada = _modelos.get(chave)
+        if entrada is None:
+            tamanho, device, compute_type = chave
+            inicio = time.perf_counter()
+            modelo = WhisperModel(tamanho, device=device, compute_type=compute_type)
+            logger.info(f"Whisper: modelo {chave} carregado em {time.perf_counter() - inicio:.1f}s (tarefa: {tarefa})")
+            with _modelos_lock:
+                entrada = _modelos[chave] = {"modelo": modelo, "ultimo_uso": time.monotonic()}
+                if WHISPER_OCIOSO_SEGUNDOS and not _coletor_iniciado:
+                    threading.Thread(target=_coletar_modelos_ociosos, name="whisper-coletor", daemon=True).start()
+                    _coletor_iniciado = True
+
+        entrada["ultimo_uso"] = time.monotonic()
+        return entrada["modelo"]
+
+
+def descarregar_modelos_whisper():
+    """Libera todos os modelos carregados neste processo."""
+    with _modelos_lock:
+        _modelos.clear()
+
+# ================================================================
+#          TRANSCRIÇÃO LOCAL
+# ================================================================
+def _transcrever_local(audio, language="pt", modo="segmentos"):
+    """
+    Roda o Whisper neste processo. `modo` = "segmentos" (texto por trecho)
+    ou "palavras" (tempos por palavra). Retorna listas de dicts serializáveis.
+    """
+    tarefa = "palavras" if modo == "palavras" else "transcricao"
+    model = get_whisper_model(tarefa)
+    opcoes = {"language": language}
+    if modo == "palavras":
+        opcoes["word_timestamps"] = True
+    else:
+        opcoes["beam_size"] = 5
+
+    if WHISPER_BATCH_SIZE > 1:
+        # Inferência em lote: os trechos do áudio são decodificados juntos
+        segments, info = BatchedInferencePipeline(model=model).transcribe(
+            audio, batch_size=WHISPER_BATCH_SIZE, **opcoes
+        )
+    else:
+        segments, info = model.transcribe(audio, **opcoes)
+
+    if modo == "palavras":
+        return [
+            {'word': word.word, 'start': word.start, 'end': word.end}
+            for segment in segments
+            for word in (segment.words or [])
+        ]
+    return [
+        {'start': segment.start, 'end': segment.end, 'text': segment.text}
+        for segment in segments
     ]
-    
-    try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True, encoding='utf-8', stdin=subprocess.DEVNULL)
-        return audio_path
-    except subprocess.CalledProcessError as e:
-        print(f"Erro ao extrair áudio: {e.stderr}")
-        raise
+
+
+def _transcrever_so_fala(audio_path, language="pt", modo="segmentos"):
+    """
+    Passa pelo Whisper apenas as regiões com fala e devolve os tempos já na
+    linha do tempo original. Retorna None se a fala total for curta demais.
+    `audio_path` pode ser um arquivo ou um array PCM de 16 kHz.
+    """
+    audio_fala, mapa = _preparar_fala(audio_path)
+    if audio_fala is None:
+        return None
+    return _remapear_itens(_transcrever_local(audio_fala, language, modo), mapa)
+
+
+def _preparar_fala(audio_path):
+    """(audio_fala, mapa) só com as regiões de fala, ou (None, None) se a fala é curta demais."""
+    audio = carregar_audio(audio_path)
+    regioes = detectar_fala(audio)
+    total_fala = duracao_fala(regioes)
+    duracao_total = len(audio) / SAMPLE_RATE
+    logger.info(f"VAD: {total_fala:.1f}s de fala em {duracao_total:.1f}s de áudio ({len(regioes)} regiões)")
+    if total_fala < VAD_MIN_FALA_SEGUNDOS:
+        return None, None
+    return concatenar_regioes(audio, regioes)
+
+
+def _remapear_itens(itens, mapa):
+    for item in itens:
+        item['start'] = remapear_tempo(item['start'], mapa)
+        item['end'] = remapear_tempo(item['end'], mapa)
+    return itens
+
 
 def transcribe_audio_to_srt(audio_path, language="pt"):
     """
-    Transcreve um arquivo de áudio para um arquivo SRT (formato de legenda simples).
+    Transcreve um áudio (arquivo ou array PCM de 16 kHz, ver `extrair_audio_pcm`)
+    para um arquivo SRT (formato de legenda simples).
+    Retorna None quando o VAD não encontra fala suficiente (só música/silêncio).
     """
-    model = get_whisper_model()
-    segments, info = model.transcribe(audio_path, language=language, beam_size=5)
+    if TRANSCRICAO_VAD:
+        segments = _transcrever_so_fala(audio_path, language, "segmentos")
+        if segments is None:
+            logger.info("Pouca fala no áudio; transcrição ignorada.")
+            return None
+    else:
+        segments = _transcrever_local(audio_path, language, "segmentos")
+    return escrever_srt(segments)
+
+
+def escrever_srt(segments):
+    """Grava os segmentos ({'start', 'end', 'text'}) num SRT temporário e retorna o caminho."""
     srt_temp_dir = os.path.join(settings.MEDIA_ROOT, "legenda_temp")
     os.makedirs(srt_temp_dir, exist_ok=True)
-    srt_filename = os.path.basename(audio_path).rsplit('.', 1)[0] + ".srt"
+    srt_filename = f"{uuid.uuid4().hex}.srt"
     srt_path = os.path.join(srt_temp_dir, srt_filename)
 
     with open(srt_path, "w", encoding="utf-8") as f:
         for i, segment in enumerate(segments):
-            start_time = format_timestamp(segment.start)
-            end_time = format_timestamp(segment.end)
+            start_time = format_timestamp(segment['start'])
+            end_time = format_timestamp(segment['end'])
             f.write(f"{i + 1}\n")
             f.write(f"{start_time} --> {end_time}\n")
-            f.write(f"{segment.text.strip()}\n\n")
+            f.write(f"{segment['text'].strip()}\n\n")
     return srt_path
 
+# ================================================================
+#          TRANSCRIÇÃO EM LOTE NO WORKER DEDICADO
+# ================================================================
+def enfileirar_transcricao(audio_path, callback, language="pt", modo="segmentos"):
+    """
+    Envia o áudio ao worker de transcrição e retorna sem esperar o resultado.
+    O worker junta os pedidos pendentes de vários jobs numa única inferência em
+    lote e chama `callback` (assinatura Celery) com a lista de itens como
+    primeiro argumento, ou None se a transcrição falhou. Se o VAD não encontra
+    fala suficiente, o callback é chamado na hora com [].
+
+    Só levanta exceção se o pedido NÃO ficou na fila (o chamador pode então
+    transcrever localmente). Depois do RPUSH o pedido é do worker: uma falha
+    ao disparar o gatilho não é fatal, o próximo gatilho (ou a varredura
+    periódica do beat) esvazia a fila.
+    """
+    import soundfile as sf
+    from .tasks import task_transcrever_lote
+    from .utils import delete_from_r2, upload_to_r2
+
+    audio, mapa = carregar_audio(audio_path), None
+    if TRANSCRICAO_VAD and modo == "segmentos":
+        audio, mapa = _preparar_fala(audio)
+        if audio is None:
+            logger.info("Pouca fala no áudio; transcrição ignorada.")
+            callback.delay([])
+            return
+
+    object_key = f"transcricao_temp/{uuid.uuid4().hex}.wav"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_f:
+        caminho_temp = temp_f.name
+    try:
+        sf.write(caminho_temp, audio, SAMPLE_RATE, subtype="PCM_16")
+        if not upload_to_r2(caminho_temp, object_key):
+            raise Exception("Falha ao enviar o áudio para o worker de transcrição.")
+    finally:
+        os.remove(caminho_temp)
+
+    pedido = {"audio_key": object_key, "language": language, "modo": modo, "mapa": mapa, "callback": dict(callback)}
+    try:
+        get_redis_client().rpush(TRANSCRICAO_FILA_PEDIDOS, json.dumps(pedido))
+    except Exception:
+        delete_from_r2(object_key)
+        raise
+
+    # Só um gatilho: quem chega primeiro esvazia a fila, os seguintes a encontram vazia
+    try:
+        task_transcrever_lote.delay()
+    except Exception as e:
+        logger.warning(f"Pedido de transcrição na fila, mas o gatilho falhou ({e}); fica para o próximo.")
+
+
+def _retirar_pedidos(cliente, quantidade):
+    """
+    Move até `quantidade` pedidos da fila para a lista de processamento (LMOVE,
+    numa transação) e anota quando foram retirados. Retorna [(bruto, pedido), ...];
+    cada um só sai da lista de processamento em `_confirmar_pedido`.
+    """
+    pipe = cliente.pipeline()
+    for _ in range(quantidade):
+        pipe.lmove(TRANSCRICAO_FILA_PEDIDOS, TRANSCRICAO_FILA_PROCESSANDO, "LEFT", "RIGHT")
+    brutos = [bruto for bruto in pipe.execute() if bruto is not None]
+    if brutos:
+        cliente.hset(TRANSCRICAO_PROCESSANDO_DESDE, mapping={bruto: time.time() for bruto in brutos})
+    return [(bruto, json.loads(bruto)) for bruto in brutos]
+
+
+def _confirmar_pedido(cliente, bruto):
+    """Tira o pedido da lista de processamento (o callback já foi disparado)."""
+    pipe = cliente.pipeline()
+    pipe.lrem(TRANSCRICAO_FILA_PROCESSANDO, 1, bruto)
+    pipe.hdel(TRANSCRICAO_PROCESSANDO_DESDE, bruto)
+    pipe.execute()
+
+
+def _recuperar_pedidos_abandonados(cliente):
+    """
+    Devolve à fila os pedidos em processamento há mais de
+    TRANSCRICAO_PEDIDO_MAX_SEGUNDOS (o worker que os retirou morreu: OOM,
+    restart, time limit). Depois de TRANSCRICAO_TENTATIVAS_MAX devoluções, o
+    callback recebe None e o job transcreve localmente.
+    Retorna quantos pedidos foram recuperados.
+    """
+    from celery import signature
+    from .utils import delete_from_r2
+
+    agora = time.time()
+    desde = cliente.hgetall(TRANSCRICAO_PROCESSANDO_DESDE)
+    recuperados = 0
+    for bruto in cliente.lrange(TRANSCRICAO_FILA_PROCESSANDO, 0, -1):
+        retirado_em = desde.get(bruto)
+        if retirado_em is None:
+            # O worker morreu entre o LMOVE e o HSET: a contagem começa agora
+            cliente.hsetnx(TRANSCRICAO_PROCESSANDO_DESDE, bruto, agora)
+            continue
+        if agora - float(retirado_em) < TRANSCRICAO_PEDIDO_MAX_SEGUNDOS:
+            continue
+        # Quem consegue remover o pedido é quem o recupera (vários workers podem varrer)
+        if not cliente.lrem(TRANSCRICAO_FILA_PROCESSANDO, 1, bruto):
+            continue
+        cliente.hdel(TRANSCRICAO_PROCESSANDO_DESDE, bruto)
+        pedido = json.loads(bruto)
+        tentativas = pedido.get("tentativas", 0) + 1
+        if tentativas > TRANSCRICAO_TENTATIVAS_MAX:
+            logger.error(f"Pedido de transcrição {pedido['audio_key']} abandonado {tentativas - 1}x; desistindo.")
+            signature(pedido["callback"]).delay(None)
+            delete_from_r2(pedido["audio_key"])
+        else:
+            logger.warning(f"Pedido de transcrição {pedido['audio_key']} abandonado; devolvido à fila.")
+            cliente.rpush(TRANSCRICAO_FILA_PEDIDOS, json.dumps({**pedido, "tentativas": tentativas}))
+        recuperados += 1
+    return recuperados
+
+
+def _transcrever_lote_local(audios, language="pt", modo="segmentos"):
+    """
+    Transcreve vários áudios (de jobs diferentes) numa só chamada do
+    BatchedInferencePipeline. Os áudios são concatenados e cada janela de até
+    30 s (`clip_timestamps`) pertence a um único áudio, então cada lote do
+    modelo junta trechos de jobs distintos sem misturar as falas.
+    Retorna uma lista de itens por áudio, com os tempos relativos a ele.
+    """
+    model = get_whisper_model("palavras" if modo == "palavras" else "transcricao")
+    janelas, inicios, duracoes = [], [], []
+    posicao = 0.0
+    for audio in audios:
+        duracao = len(audio) / SAMPLE_RATE
+        inicios.append(posicao)
+        duracoes.append(duracao)
+        inicio_janela = 0.0
+        while inicio_janela < duracao:
+            fim_janela = min(duracao, inicio_janela + JANELA_WHISPER_SEGUNDOS)
+            janelas.append({"start": posicao + inicio_janela, "end": posicao + fim_janela})
+            inicio_janela = fim_janela
+        posicao += duracao
+
+    resultados = [[] for _ in audios]
+    if not janelas:
+        return resultados
+
+    segments, info = BatchedInferencePipeline(model=model).transcribe(
+        np.concatenate(audios).astype(np.float32, copy=False),
+        language=language,
+        batch_size=WHISPER_BATCH_SIZE if WHISPER_BATCH_SIZE > 1 else 8,
+        vad_filter=False,
+        clip_timestamps=janelas,
+        without_timestamps=False,
+        word_timestamps=modo == "palavras",
+    )
+
+    def relativo(tempo, indice):
+        return min(max(0.0, tempo - inicios[indice]), duracoes[indice])
+
+    for segment in segments:
+        # O meio do segmento decide o áudio (as bordas podem cair no limite entre dois)
+        indice = max(0, bisect.bisect_right(inicios, (segment.start + segment.end) / 2) - 1)
+        if modo == "palavras":
+            resultados[indice].extend(
+                {'word': word.word, 'start': relativo(word.start, indice), 'end': relativo(word.end, indice)}
+                for word in (segment.words or [])
+            )
+        else:
+            resultados[indice].append(
+                {'start': relativo(segment.start, indice), 'end': relativo(segment.end, indice), 'text': segment.text}
+            )
+    return resultados
+
+
+def _transcrever_grupo(pedidos, language, modo):
+    """Baixa os áudios do grupo e transcreve os que chegaram num único lote (None = falhou)."""
+    from .utils import download_from_cloudflare
+
+    audios = {}
+    for indice, pedido in enumerate(pedidos):
+        caminho = download_from_cloudflare(pedido["audio_key"], ".wav")
+        if not caminho:
+            logger.error(f"Falha ao baixar o áudio para transcrição: {pedido['audio_key']}")
+            continue
+        try:
+            audios[indice] = carregar_audio(caminho)
+        except Exception as e:
+            logger.error(f"Áudio inválido para transcrição ({pedido['audio_key']}): {e}")
+        finally:
+            os.remove(caminho)
+
+    resultados = [None] * len(pedidos)
+    if audios:
+        inicio = time.perf_counter()
+        try:
+            for indice, itens in zip(audios, _transcrever_lote_local(list(audios.values()), language, modo)):
+                resultados[indice] = itens
+        except Exception as e:
+            logger.error(f"Transcrição em lote falhou: {e}", exc_info=True)
+        logger.info(f"Lote de {len(audios)} áudio(s) ({modo}) transcrito em {time.perf_counter() - inicio:.1f}s")
+    return resultados
+
+
+def processar_pedidos_transcricao():
+    """
+    Executado pelo worker de transcrição: esvazia a fila de pedidos em lotes de
+    até TRANSCRICAO_LOTE_MAX (agrupados por idioma e modo) e dispara o callback
+    de cada pedido com o resultado. Retorna quantos pedidos foram atendidos.
+
+    Os pedidos ficam na lista de processamento até o callback ser disparado;
+    se o worker morrer no meio do lote, `_recuperar_pedidos_abandonados` (no
+    início de cada execução) os devolve à fila.
+    """
+    from celery import signature
+    from .utils import delete_from_r2
+
+    cliente = get_redis_client()
+    _recuperar_pedidos_abandonados(cliente)
+    atendidos = 0
+    while True:
+        retirados = _retirar_pedidos(cliente, TRANSCRICAO_LOTE_MAX)
+        if not retirados:
+            return atendidos
+
+        grupos = {}
+        for bruto, pedido in retirados:
+            grupos.setdefault((pedido["language"], pedido["modo"]), []).append((bruto, pedido))
+        for (language, modo), grupo in grupos.items():
+            pedidos = [pedido for _, pedido in grupo]
+            for (bruto, pedido), itens in zip(grupo, _transcrever_grupo(pedidos, language, modo)):
+                if itens is not None and pedido["mapa"]:
+                    _remapear_itens(itens, pedido["mapa"])
+                signature(pedido["callback"]).delay(itens)
+                _confirmar_pedido(cliente, bruto)
+                delete_from_r2(pedido["audio_key"])
+        atendidos += len(retirados)
+
 # ================================================================
 #          FUNÇÃO ADICIONADA PARA LEGENDAS PRECISAS
 # ================================================================
@@ -68,18 +459,7 @@ def get_word_timestamps(audio_path, language="pt"):
     Transcreve um áudio e retorna uma lista de palavras com seus tempos
     de início e fim, essencial para a legenda karaokê.
     """
-    model = get_whisper_model()
-    segments, info = model.transcribe(audio_path, language=language, word_timestamps=True)
-
-    all_words = []
-    for segment in segments:
-        for word in segment.words:
-            all_words.append({
-                'word': word.word,
-                'start': word.start,
-                'end': word.end
-            })
-    return all_words
+    return _transcrever_local(audio_path, language, "palavras")
 # ================================================================
 
 def format_timestamp(seconds):
@@ -0,0 +1,390 @@
+"""
+Registro de pipelines Kokoro (TTS) compartilhados por processo.
+
+Carregar o KPipeline custa segundos, enquanto sintetizar uma frase curta custa
+milissegundos. Este módulo mantém um pipeline "quente" por idioma, protegido
+por lock para os threads do gunicorn, e coleta métricas de carregamento x síntese.
+Também mantém o banco de vozes (embeddings) já convertidos em tensores.
+"""
+
+import logging
+import os
+import re
+import threading
+import unicodedata
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+from django.conf import settings
+from kokoro import KPipeline
+
+from .cache_utils import CacheDisco, hash_conteudo, r2_configurado
+
+logger = logging.getLogger(__name__)
+
+KOKORO_REPO_ID = getattr(settings, "KOKORO_REPO_ID", "hexgrad/Kokoro-82M")
+KOKORO_SAMPLE_RATE = 24000
+VOZ_PADRAO = "pf_dora"
+VOZES_CUSTOM_DIR = os.path.join(settings.BASE_DIR, "core", "voices_custom")
+VOZES_CACHE_MAX = getattr(settings, "KOKORO_VOZES_CACHE_MAX", 8)
+
+_pipelines = {}
+_pipeline_locks = {}
+_registro_lock = threading.Lock()
+
+# Vozes .npy personalizadas: nome -> (mtime do arquivo, tensor)
+_vozes_custom = {}
+# Vozes do Kokoro fixadas na memória (as oferecidas no formulário)
+_vozes_fixas = {}
+# Demais vozes do Kokoro, com descarte LRU
+_vozes_lru = OrderedDict()
+_vozes_lock = threading.Lock()
+
+# Hash do embedding dos tensores usados por último: id(tensor) -> (tensor, sha256).
+# LRU limitado: vozes .npy recarregadas (mtime novo) não acumulam tensores antigos
+_hashes_voz = OrderedDict()
+_hashes_voz_lock = threading.Lock()
+HASHES_VOZ_MAX = 32
+
+_metricas = {
+    "carregamentos": 0,
+    "tempo_carregamento": 0.0,
+    "sinteses": 0,
+    "tempo_sintese": 0.0,
+    "segundos_audio": 0.0,
+}
+_metricas_lock = threading.Lock()
+
+
+def _registrar_metrica(**valores):
+    with _metricas_lock:
+        for chave, valor in valores.items():
+            _metricas[chave] += valor
+
+
+def obter_metricas_tts():
+    """Retorna uma cópia das métricas acumuladas neste processo."""
+    with _metricas_lock:
+        return dict(_metricas)
+
+
+def registrar_sintese(tempo_sintese, segundos_audio):
+    """Contabiliza uma síntese concluída (chamado por quem consome o pipeline)."""
+    _registrar_metrica(sinteses=1, tempo_sintese=tempo_sintese, segundos_audio=segundos_audio)
+    logger.info(
+        f"Kokoro: {segundos_audio:.1f}s de áudio sintetizados em {tempo_sintese:.2f}s "
+        f"(RTF {tempo_sintese / max(segundos_audio, 0.001):.2f})"
+    )
+
+
+def get_kokoro_pipeline(lang_code="p"):
+    """
+    Retorna o pipeline Kokoro do idioma, carregando-o uma única vez por processo.
+    Usa double-checked locking para que threads concorrentes não carreguem o modelo duas vezes.
+    """
+    pipeline = _pipelines.get(lang_code)
+    if pipeline is not None:
+        return pipeline
+
+    with _registro_lock:
+        pipeline = _pipelines.get(lang_code)
+        if pipeline is None:
+            inicio = time.perf_counter()
+            pipeline = KPipeline(lang_code=lang_code, repo_id=KOKORO_REPO_ID)
+            duracao = time.perf_counter() - inicio
+            _registrar_metrica(carregamentos=1, tempo_carregamento=duracao)
+            logger.info(f"Kokoro: pipeline '{lang_code}' carregado em {duracao:.2f}s")
+
+            _pipeline_locks[lang_code] = threading.RLock()
+            _pipelines[lang_code] = pipeline
+    return pipeline
+
+
+@contextmanager
+def usar_pipeline(lang_code="p"):
+    """
+    Empresta o pipeline do idioma com acesso exclusivo.
+    O KPipeline guarda estado mutável (dicionário de vozes), então a síntese
+    inteira, incluindo o consumo do gerador, deve acontecer dentro deste bloco.
+    """
+    pipeline = get_kokoro_pipeline(lang_code)
+    with _pipeline_locks[lang_code]:
+        yield pipeline
+
+
+# ==============================================================================
+# BANCO DE VOZES
+# ==============================================================================
+
+def _para_tensor(dados):
+    if isinstance(dados, np.ndarray):
+        dados = torch.from_numpy(dados)
+    return dados if dados.dtype == torch.float32 else dados.float()
+
+
+def _carregar_voz_custom(nome_voz):
+    """
+    Retorna o tensor de uma voz .npy personalizada, ou None se ela não existir.
+    O arquivo é mapeado em memória (copy-on-write) e recarregado quando o mtime muda.
+    """
+    caminho = os.path.join(VOZES_CUSTOM_DIR, f"{nome_voz}.npy")
+    try:
+        mtime = os.stat(caminho).st_mtime
+    except OSError:
+        with _vozes_lock:
+            _vozes_custom.pop(nome_voz, None)
+        return None
+
+    with _vozes_lock:
+        em_cache = _vozes_custom.get(nome_voz)
+        if em_cache and em_cache[0] == mtime:
+            return em_cache[1]
+
+    logger.info(f"🎤 Carregando voz personalizada do disco: {nome_voz}")
+    tensor = _para_tensor(np.load(caminho, mmap_mode="c"))
+    with _vozes_lock:
+        _vozes_custom[nome_voz] = (mtime, tensor)
+    return tensor
+
+
+def _carregar_voz_kokoro(pipeline, nome_voz, fixar=False):
+    """Retorna o tensor de uma voz padrão do Kokoro (pode baixar do HF na 1ª vez)."""
+    with _vozes_lock:
+        if nome_voz in _vozes_fixas:
+            return _vozes_fixas[nome_voz]
+        if nome_voz in _vozes_lru:
+            _vozes_lru.move_to_end(nome_voz)
+            return _vozes_lru[nome_voz]
+
+    logger.info(f"🎤 Carregando voz padrão do Kokoro: {nome_voz}")
+    tensor = _para_tensor(pipeline.load_voice(nome_voz))
+
+    with _vozes_lock:
+        if fixar:
+            _vozes_fixas[nome_voz] = tensor
+            return tensor
+        _vozes_lru[nome_voz] = tensor
+        while len(_vozes_lru) > VOZES_CACHE_MAX:
+            descartada, _ = _vozes_lru.popitem(last=False)
+            for p in _pipelines.values():
+                p.voices.pop(descartada, None)
+            logger.info(f"🎤 Voz '{descartada}' descartada do cache (LRU)")
+    return tensor
+
+
+def voz_em_memoria(nome_voz):
+    """
+    Tensor da voz se ela já está no banco (voz .npy atual ou voz do Kokoro já
+    carregada), sem tocar no pipeline nem no seu lock; senão None.
+    """
+    try:
+        tensor = _carregar_voz_custom(nome_voz)
+        if tensor is not None:
+            return tensor
+    except Exception as e:
+        logger.error(f"Erro ao ler arquivo .npy {nome_voz}: {e}")
+        return None
+
+    with _vozes_lock:
+        if nome_voz in _vozes_fixas:
+            return _vozes_fixas[nome_voz]
+        if nome_voz in _vozes_lru:
+            _vozes_lru.move_to_end(nome_voz)
+            return _vozes_lru[nome_voz]
+    return None
+
+
+def obter_voz(pipeline, nome_voz):
+    """
+    Retorna o embedding da voz como tensor float32 pronto para o Kokoro.
+    Prioriza arquivos .npy personalizados; se a voz não existir, usa 'pf_dora'.
+    """
+    try:
+        tensor = _carregar_voz_custom(nome_voz)
+        if tensor is not None:
+            return tensor
+    except Exception as e:
+        logger.error(f"Erro ao ler arquivo .npy {nome_voz}: {e}")
+
+    try:
+        return _carregar_voz_kokoro(pipeline, nome_voz)
+    except Exception as e:
+        logger.warning(f"⚠️ Voz {nome_voz} não encontrada nem em disco nem no sistema. Usando '{VOZ_PADRAO}'. Erro: {e}")
+        return _carregar_voz_kokoro(pipeline, VOZ_PADRAO, fixar=True)
+
+
+def precarregar_vozes(pipeline):
+    """Carrega todas as vozes .npy e todas as vozes de VOZES_KOKORO de uma vez."""
+    from .forms import VOZES_KOKORO
+
+    nomes_custom = set()
+    if os.path.isdir(VOZES_CUSTOM_DIR):
+        for arquivo in os.listdir(VOZES_CUSTOM_DIR):
+            if arquivo.endswith(".npy"):
+                nomes_custom.add(arquivo[:-4])
+
+    for nome_voz in sorted(nomes_custom):
+        try:
+            _carregar_voz_custom(nome_voz)
+        except Exception as e:
+            logger.error(f"Erro ao pré-carregar voz personalizada {nome_voz}: {e}")
+
+    for nome_voz, _ in VOZES_KOKORO:
+        if nome_voz in nomes_custom:
+            continue
+        try:
+            _carregar_voz_kokoro(pipeline, nome_voz, fixar=True)
+        except Exception as e:
+            logger.error(f"Erro ao pré-carregar voz {nome_voz}: {e}")
+
+
+def aquecer_pipelines(lang_codes=None):
+    """
+    Pré-carrega os pipelines (hook para o início dos workers do Celery).
+    Falhas são apenas registradas: o carregamento preguiçoso continua disponível.
+    """
+    if lang_codes is None:
+        lang_codes = getattr(settings, "KOKORO_IDIOMAS_AQUECIMENTO", ["p"])
+
+    for lang_code in lang_codes:
+        try:
+            with usar_pipeline(lang_code) as pipeline:
+                precarregar_vozes(pipeline)
+        except Exception as e:
+            logger.error(f"Kokoro: falha ao aquecer pipeline '{lang_code}': {e}", exc_info=True)
+
+
+# ==============================================================================
+# TEMPOS POR PALAVRA (a partir das durações previstas pelo Kokoro)
+# ==============================================================================
+
+# Cada unidade de pred_dur equivale a 600 amostras a 24 kHz (1/40 s)
+SEGUNDOS_POR_FRAME = 600 / KOKORO_SAMPLE_RATE
+
+
+def _palavras_distribuidas(palavras, inicio, fim):
+    """Distribui o intervalo entre as palavras, proporcionalmente ao número de letras."""
+    pesos = [max(1, sum(c.isalnum() for c in p)) for p in palavras]
+    total = sum(pesos)
+    tempos = []
+    cursor = inicio
+    for palavra, peso in zip(palavras, pesos):
+        duracao = (fim - inicio) * peso / total
+        tempos.append({"word": palavra, "start": cursor, "end": cursor + duracao})
+        cursor += duracao
+    return tempos
+
+
+def alinhar_palavras_kokoro(resultado, inicio_bloco, duracao_bloco):
+    """
+    Retorna [{'word', 'start', 'end'}] para um trecho sintetizado pelo Kokoro,
+    no mesmo formato de transcription_utils.get_word_timestamps.
+
+    Usa, em ordem: os timestamps por token (pipelines em inglês), as durações
+    previstas por fonema (pred_dur) alinhadas às palavras do texto conhecido, ou
+    uma distribuição proporcional do trecho quando nenhuma das duas existe.
+    """
+    palavras = (resultado.graphemes or "").split()
+    if not palavras:
+        return []
+
+    tokens = getattr(resultado, "tokens", None)
+    if tokens and all(getattr(t, "start_ts", None) is not None for t in tokens if t.phonemes):
+        return [
+            {"word": t.text, "start": inicio_bloco + t.start_ts, "end": inicio_bloco + t.end_ts}
+            for t in tokens
+            if t.phonemes and t.start_ts is not None and t.end_ts is not None
+        ]
+
+    pred_dur = getattr(resultado, "pred_dur", None)
+    vocab = getattr(get_kokoro_pipeline("p").model, "vocab", None)
+    if pred_dur is None or not vocab:
+        return _palavras_distribuidas(palavras, inicio_bloco, inicio_bloco + duracao_bloco)
+
+    duracoes = [int(d) for d in pred_dur.tolist()]
+    fonemas = [f for f in (resultado.phonemes or "") if f in vocab]
+    if len(duracoes) != len(fonemas) + 2 or sum(duracoes) == 0:
+        return _palavras_distribuidas(palavras, inicio_bloco, inicio_bloco + duracao_bloco)
+
+    # Corrige pequenas diferenças entre a soma das durações e o áudio real
+    escala = duracao_bloco / (sum(duracoes) * SEGUNDOS_POR_FRAME)
+
+    # Agrupa os fonemas em palavras (separadas por espaço) com início/fim em frames
+    spans = []
+    cursor = duracoes[0]
+    inicio_palavra = None
+    for fonema, duracao in zip(fonemas, duracoes[1:-1]):
+        if fonema == " ":
+            inicio_palavra = None
+        elif fonema.isalpha():
+            if inicio_palavra is None:
+                spans.append([cursor, cursor + duracao])
+                inicio_palavra = cursor
+            else:
+                spans[-1][1] = cursor + duracao
+        cursor += duracao
+
+    def segundos(frames):
+        return inicio_bloco + frames * SEGUNDOS_POR_FRAME * escala
+
+    if len(spans) == len(palavras):
+        return [
+            {"word": palavra, "start": segundos(ini), "end": segundos(fim)}
+            for palavra, (ini, fim) in zip(palavras, spans)
+        ]
+
+    if not spans:
+        return _palavras_distribuidas(palavras, inicio_bloco, inicio_bloco + duracao_bloco)
+
+    # O G2P juntou/separou palavras: distribui o texto conhecido dentro da fala detectada
+    return _palavras_distribuidas(palavras, segundos(spans[0][0]), segundos(spans[-1][1]))
+
+
+# ==============================================================================
+# CACHE DE NARRAÇÕES (endereçado por texto + voz + velocidade)
+# ==============================================================================
+
+VERSAO_CACHE_NARRACAO = "1"
+
+cache_narracao = CacheDisco(
+    nome="narracao",
+    diretorio=os.path.join(getattr(settings, "CACHE_LOCAL_DIR", os.path.join(settings.BASE_DIR, "cache")), "narracao"),
+    tamanho_max_bytes=getattr(settings, "TTS_CACHE_MAX_MB", 1024) * 1024 * 1024,
+    prefixo_r2="cache/narracao" if getattr(settings, "TTS_CACHE_R2", False) and r2_configurado() else None,
+)
+
+
+def normalizar_texto_narracao(texto):
+    """Normaliza o texto para que variações irrelevantes (espaços, quebras de linha do Windows) caiam na mesma chave."""
+    texto = unicodedata.normalize("NFC", texto or "").replace("\r\n", "\n").replace("\r", "\n")
+    linhas = [re.sub(r"[ \t]+", " ", linha).strip() for linha in texto.split("\n")]
+    return "\n".join(linha for linha in linhas if linha)
+
+
+def _hash_voz(tensor):
+    with _hashes_voz_lock:
+        em_cache = _hashes_voz.get(id(tensor))
+        if em_cache and em_cache[0] is tensor:
+            _hashes_voz.move_to_end(id(tensor))
+            return em_cache[1]
+    h = hash_conteudo(tensor.detach().cpu().contiguous().numpy().tobytes())
+    with _hashes_voz_lock:
+        _hashes_voz[id(tensor)] = (tensor, h)
+        _hashes_voz.move_to_end(id(tensor))
+        while len(_hashes_voz) > HASHES_VOZ_MAX:
+            _hashes_voz.popitem(last=False)
+    return h
+
+
+def chave_narracao(texto_normalizado, tensor_voz, speed_factor):
+    """Chave de conteúdo da narração: texto normalizado + embedding da voz + velocidade."""
+    return hash_conteudo(
+        VERSAO_CACHE_NARRACAO,
+        KOKORO_REPO_ID,
+        texto_normalizado,
+        _hash_voz(tensor_voz),
+        f"{speed_factor:.4f}",
+    )
@@ -9,10 +9,16 @@ from django.conf import settings
 from django.urls import reverse
 
 # Imports para as funções R2
-import boto3
+import os
 from botocore.exceptions import ClientError
-import requests
+import subprocess
 import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from . import http_client
+from .r2_client import TRANSFERENCIA, get_r2_client
 
 
 def generate_verification_token():
@@ -85,13 +91,7 @@ def verificar_arquivo_existe_no_r2(object_key):
     Verifica se um arquivo realmente existe no Cloudflare R2 antes de tentar baixar
     """
     try:
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
+        s3_client = get_r2_client()
 
         # Tenta obter os metadados do objeto
         s3_client.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=object_key)
@@ -109,34 +109,104 @@ def verificar_arquivo_existe_no_r2(object_key):
         return False
 
 
+def etag_no_r2(object_key):
+    """
+    ETag do objeto no R2 (sem aspas), ou None se ele não existir ou houver erro.
+    """
+    try:
+        s3_client = get_r2_client()
+        resposta = s3_client.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=object_key)
+        return resposta.get("ETag", "").strip('"') or None
+    except ClientError as e:
+        print(f"Erro ao obter ETag de {object_key} no R2: {e}")
+        return None
+    except Exception as e:
+        print(f"Erro inesperado ao obter ETag de {object_key} no R2: {e}")
+        return None
+
+
+# URLs assinadas reaproveitadas enquanto ainda valem pelo menos metade do pedido
+# (e no máximo PRESIGNED_CACHE_MAX_SEGUNDOS depois de assinadas)
+PRESIGNED_CACHE_MAX_SEGUNDOS = getattr(settings, "PRESIGNED_CACHE_MAX_SEGUNDOS", 600)
+PRESIGNED_CACHE_MAX_ENTRADAS = getattr(settings, "PRESIGNED_CACHE_MAX_ENTRADAS", 10000)
+# Em ordem de assinatura: as mais antigas (mais perto de expirar) saem primeiro
+_urls_assinadas = OrderedDict()
+_urls_assinadas_lock = threading.Lock()
+
+
+def generate_presigned_urls(object_keys, expiration=3600):
+    """
+    Assina várias chaves de uma vez (a assinatura é local, com o cliente
+    compartilhado) e retorna {object_key: url}. Chaves que falharem ficam de fora.
+    """
+    agora = time.monotonic()
+    janela = min(expiration / 2, PRESIGNED_CACHE_MAX_SEGUNDOS)
+    urls = {}
+    faltantes = []
+    with _urls_assinadas_lock:
+        for object_key in object_keys:
+            em_cache = _urls_assinadas.get((object_key, expiration))
+            if em_cache and agora - em_cache[1] < janela:
+                urls[object_key] = em_cache[0]
+            else:
+                faltantes.append(object_key)
+    if not faltantes:
+        return urls
+
+    s3_client = get_r2_client()
+    novas = {}
+    for object_key in faltantes:
+        try:
+            novas[object_key] = s3_client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": object_key},
+                ExpiresIn=expiration,
+            )
+        except ClientError as e:
+            print(f"Erro ao gerar URL assinada para {object_key}: {e}")
+
+    with _urls_assinadas_lock:
+        for object_key, url in novas.items():
+            _urls_assinadas[(object_key, expiration)] = (url, agora)
+            _urls_assinadas.move_to_end((object_key, expiration))
+        # Vencidas não voltam a ser usadas; acima do limite, sai a assinatura mais antiga
+        while _urls_assinadas:
+            _, assinada_em = next(iter(_urls_assinadas.values()))
+            vencida = agora - assinada_em >= PRESIGNED_CACHE_MAX_SEGUNDOS
+            if not vencida and len(_urls_assinadas) <= PRESIGNED_CACHE_MAX_ENTRADAS:
+                break
+            _urls_assinadas.popitem(last=False)
+    urls.update(novas)
+    return urls
+
+
 def generate_presigned_url(object_key, expiration=3600):
     """
     Gera uma URL assinada temporária para um objeto no Cloudflare R2
     """
     try:
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
-
-        url = s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": object_key},
-            ExpiresIn=expiration,
-        )
-        return url
-    except ClientError as e:
+        return generate_presigned_urls([object_key], expiration).get(object_key)
+    except Exception as e:
         print(f"Erro ao gerar URL assinada: {e}")
         return None
 
 
+def urls_midia_biblioteca(object_keys, expiration=3600):
+    """
+    URLs para exibir mídias da biblioteca (VideoBase/MusicaBase): pelo domínio
+    público do R2 quando R2_BIBLIOTECA_PUBLICA, sem assinatura; senão assinadas em lote.
+    """
+    url_publica = getattr(settings, "CLOUDFLARE_R2_PUBLIC_URL", "")
+    if getattr(settings, "R2_BIBLIOTECA_PUBLICA", False) and url_publica:
+        return {object_key: f"{url_publica.rstrip('/')}/{object_key}" for object_key in object_keys}
+    return generate_presigned_urls(object_keys, expiration)
+
+
 def download_from_cloudflare(url_or_key, extension):
     """
     Faz download de um arquivo do Cloudflare R2
-    Suporta tanto URLs públicas quanto chaves de objeto (para URLs assinadas)
+    Suporta tanto URLs públicas quanto chaves de objeto (baixadas pelo cliente
+    S3 compartilhado, em partes paralelas quando o arquivo é grande)
     """
     try:
         # Verificar se o parâmetro é válido
@@ -144,29 +214,24 @@ def download_from_cloudflare(url_or_key, extension):
             print(f"Erro: url_or_key é None ou vazio")
             return None
 
-        # Se for uma chave de objeto (não uma URL completa), gera URL assinada
-        if not url_or_key.startswith("http"):
-            download_url = generate_presigned_url(url_or_key)
-        else:
-            download_url = url_or_key
-
-        if not download_url:
-            print(f"Erro: não foi possível gerar URL de download para {url_or_key}")
-            return None
-
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = requests.get(download_url, stream=True, headers=headers)
-        response.raise_for_status()
-
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
-
-        with open(temp_file.name, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        return temp_file.name
+        with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp_file:
+            caminho_temp = temp_file.name
+
+        try:
+            if not url_or_key.startswith("http"):
+                get_r2_client().download_file(
+                    settings.AWS_STORAGE_BUCKET_NAME, url_or_key, caminho_temp, Config=TRANSFERENCIA
+                )
+            else:
+                headers = {
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+                }
+                http_client.baixar_para_arquivo(url_or_key, caminho_temp, headers=headers, timeout=(5, 60))
+        except Exception:
+            os.remove(caminho_temp)
+            raise
+
+        return caminho_temp
     except Exception as e:
         print(f"Erro ao baixar {url_or_key}: {e}")
         return None
@@ -177,15 +242,9 @@ def upload_to_r2(caminho_arquivo_local, object_key):
     Faz o upload de um arquivo para o bucket R2 principal.
     """
     try:
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
+        s3_client = get_r2_client()
         s3_client.upload_file(
-            caminho_arquivo_local, settings.AWS_STORAGE_BUCKET_NAME, object_key
+            caminho_arquivo_local, settings.AWS_STORAGE_BUCKET_NAME, object_key, Config=TRANSFERENCIA
         )
         return True
     except ClientError as e:
@@ -198,14 +257,8 @@ def upload_fileobj_to_r2(file_obj, object_key):
     Faz o upload de um objeto tipo arquivo (stream) para o bucket R2 principal.
     """
     try:
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
-        s3_client.upload_fileobj(file_obj, settings.AWS_STORAGE_BUCKET_NAME, object_key)
+        s3_client = get_r2_client()
+        s3_client.upload_fileobj(file_obj, settings.AWS_STORAGE_BUCKET_NAME, object_key, Config=TRANSFERENCIA)
         return True
     except ClientError as e:
         print(f"Erro no upload de stream para o R2: {e}")
@@ -217,13 +270,7 @@ def delete_from_r2(object_key):
     Apaga um arquivo do bucket R2 principal.
     """
     try:
-        s3_client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
+        s3_client = get_r2_client()
         s3_client.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=object_key)
         return True
     except ClientError as e:
@@ -231,14 +278,93 @@ def delete_from_r2(object_key):
         return False
 
 
+def thumbnail_key_do_video(object_key):
+    """Chave da thumbnail correspondente a um vídeo em videos_gerados/."""
+    return object_key.replace("videos_gerados/", "thumbnails/").replace(".mp4", ".jpg")
+
+
+def preview_key_do_video(object_key):
+    """Chave da prévia animada (WebP) correspondente a um vídeo em videos_gerados/."""
+    return object_key.replace("videos_gerados/", "previews/").replace(".mp4", ".webp")
+
+
+def gerar_thumbnail_local(caminho_video, caminho_thumbnail, segundo=1.0):
+    """
+    Extrai um quadro JPEG do vídeo local (seek antes do -i: só decodifica
+    a partir do keyframe mais próximo).
+    """
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-ss", str(segundo), "-i", caminho_video,
+        "-frames:v", "1", "-q:v", "2", caminho_thumbnail,
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, text=True, stdin=subprocess.DEVNULL, timeout=60)
+    return caminho_thumbnail
+
+
+def gerar_preview_webp(caminho_video, caminho_preview, duracao, quadros=12, largura=270, fps_preview=4):
+    """
+    Prévia animada em WebP: `quadros` quadros espaçados ao longo do vídeo,
+    reduzidos para `largura` px e tocados a `fps_preview` quadros/s em loop.
+    """
+    taxa = quadros / max(float(duracao or 0), 1.0)
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i", caminho_video,
+        "-vf", f"fps={taxa:.4f},scale={largura}:-2:flags=lanczos,setpts=N/{fps_preview}/TB",
+        "-frames:v", str(quadros), "-r", str(fps_preview), "-an",
+        "-c:v", "libwebp", "-quality", "60", "-compression_level", "4", "-loop", "0",
+        caminho_preview,
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, text=True, stdin=subprocess.DEVNULL, timeout=120)
+    return caminho_preview
+
+
+def publicar_thumbnail_e_preview(caminho_video_local, object_key, duracao, caminho_thumbnail=None):
+    """
+    Gera (a partir do arquivo local, antes da limpeza) e envia ao R2 a thumbnail
+    e a prévia WebP do vídeo `object_key`. Se `caminho_thumbnail` já veio pronto
+    (saída lateral do render), só é enviado. Retorna (thumbnail_key, preview_key);
+    o que falhar volta como None.
+    """
+    thumbnail_key = thumbnail_key_do_video(object_key)
+    preview_key = preview_key_do_video(object_key)
+    caminhos_temp = []
+    try:
+        if not (caminho_thumbnail and os.path.exists(caminho_thumbnail) and os.path.getsize(caminho_thumbnail)):
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_f:
+                caminho_thumbnail = temp_f.name
+            caminhos_temp.append(caminho_thumbnail)
+            try:
+                gerar_thumbnail_local(caminho_video_local, caminho_thumbnail, min(1.0, max(0.0, duracao - 0.1)))
+            except (subprocess.SubprocessError, OSError) as e:
+                print(f"Erro ao gerar thumbnail local: {e}")
+                caminho_thumbnail = None
+        if not (caminho_thumbnail and upload_to_r2(caminho_thumbnail, thumbnail_key)):
+            thumbnail_key = None
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".webp") as temp_f:
+            caminho_preview = temp_f.name
+        caminhos_temp.append(caminho_preview)
+        try:
+            gerar_preview_webp(caminho_video_local, caminho_preview, duracao)
+            if not upload_to_r2(caminho_preview, preview_key):
+                preview_key = None
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"Erro ao gerar prévia WebP: {e}")
+            preview_key = None
+
+        return thumbnail_key, preview_key
+    finally:
+        for caminho in caminhos_temp:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
 def generate_thumbnail_from_video_r2(object_key):
     """
     Gera uma thumbnail a partir de um vídeo no R2.
+    Só usada como fallback: o normal é `publicar_thumbnail_e_preview` sobre o arquivo local.
     """
-    import tempfile
-    import subprocess
-    import os
-
     caminho_video_local = None
     caminho_thumbnail_local = None
 
@@ -251,24 +377,10 @@ def generate_thumbnail_from_video_r2(object_key):
         # 2. Gerar a thumbnail com ffmpeg
         with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_f:
             caminho_thumbnail_local = temp_f.name
-        
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            caminho_video_local,
-            "-ss",
-            "00:00:01",
-            "-vframes",
-            "1",
-            "-q:v",
-            "2",
-            caminho_thumbnail_local,
-        ]
-        subprocess.run(cmd, check=True, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+        gerar_thumbnail_local(caminho_video_local, caminho_thumbnail_local)
 
         # 3. Fazer upload da thumbnail para o R2
-        thumbnail_object_key = object_key.replace("videos_gerados/", "thumbnails/").replace(".mp4", ".jpg")
+        thumbnail_object_key = thumbnail_key_do_video(object_key)
         if not upload_to_r2(caminho_thumbnail_local, thumbnail_object_key):
             raise Exception("Falha no upload da thumbnail para o R2.")
 
@@ -289,25 +401,14 @@ def generate_thumbnail_from_video_r2(object_key):
 def get_valid_media_from_category(model, category):
     """
     Retorna uma mídia válida (com object_key) da categoria especificada
-    Verifica se o arquivo realmente existe no R2 antes de retornar
+    A existência no R2 vem do índice `disponivel` (reconciliação periódica) e o
+    sorteio é feito sobre os ids em memória, sem ORDER BY RANDOM() (core/asset_index.py)
     """
-    # Primeiro, verifica se há mídias válidas na categoria
-    valid_media = (
-        model.objects.filter(categoria=category)
-        .exclude(object_key__isnull=True)
-        .exclude(object_key__exact="")
-    )
-
-    if not valid_media.exists():
-        print(f"Erro: Não há {model.__name__} válidos para a categoria {category}")
-        return None
+    from .asset_index import escolher_midia
 
-    # Tenta encontrar uma mídia que realmente existe no R2
-    for media in valid_media.order_by("?"):
-        if verificar_arquivo_existe_no_r2(media.object_key):
-            return media
-
-    print(
-        f"Erro: Nenhum {model.__name__} encontrado para a categoria {category} que exista no R2"
-    )
-    return None
+    media = escolher_midia(model, category)
+    if not media:
+        print(
+            f"Erro: Nenhum {model.__name__} encontrado para a categoria {category} que exista no R2"
+        )
+    return media
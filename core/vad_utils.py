@@ -0,0 +1,118 @@
+"""
+Detecção de fala (VAD) sobre o áudio PCM de 16 kHz usado pelo Whisper.
+
+Usado para mandar ao modelo apenas os trechos com fala de um corte (pulando
+música e silêncio) e para decidir, sem transcrever, se há fala suficiente para
+gerar legendas. Os tempos são sempre devolvidos na linha do tempo original.
+"""
+
+import bisect
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from .audio_utils import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Fala total mínima (s) para valer a pena transcrever
+VAD_MIN_FALA_SEGUNDOS = getattr(settings, "VAD_MIN_FALA_SEGUNDOS", 2.0)
+# Silêncios menores que isso não separam duas regiões de fala
+VAD_MIN_SILENCIO_MS = getattr(settings, "VAD_MIN_SILENCIO_MS", 500)
+# Margem adicionada antes e depois de cada região
+VAD_MARGEM_MS = getattr(settings, "VAD_MARGEM_MS", 200)
+# Silêncio inserido entre as regiões concatenadas, para o Whisper não colar frases
+VAD_INTERVALO_MS = getattr(settings, "VAD_INTERVALO_MS", 300)
+
+
+def _regioes_silero(audio):
+    """Silero VAD que acompanha o faster-whisper (ONNX, roda em CPU)."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    opcoes = VadOptions(min_silence_duration_ms=VAD_MIN_SILENCIO_MS, speech_pad_ms=VAD_MARGEM_MS)
+    return [
+        (trecho["start"] / SAMPLE_RATE, trecho["end"] / SAMPLE_RATE)
+        for trecho in get_speech_timestamps(audio, opcoes)
+    ]
+
+
+def _regioes_energia(audio, quadro_ms=30):
+    """
+    Fallback por energia: quadros de 30 ms acima de um limiar adaptativo
+    (piso de ruído do próprio áudio + 12 dB). Não distingue música de fala.
+    """
+    tamanho_quadro = SAMPLE_RATE * quadro_ms // 1000
+    n_quadros = len(audio) // tamanho_quadro
+    if n_quadros == 0:
+        return []
+
+    quadros = audio[:n_quadros * tamanho_quadro].reshape(n_quadros, tamanho_quadro)
+    energia_db = 10 * np.log10(np.mean(quadros ** 2, axis=1) + 1e-10)
+    limiar = max(np.percentile(energia_db, 10) + 12.0, -50.0)
+    ativos = np.concatenate(([False], energia_db > limiar, [False]))
+
+    bordas = np.flatnonzero(np.diff(ativos.astype(np.int8)))
+    duracao_quadro = quadro_ms / 1000
+    margem = VAD_MARGEM_MS / 1000
+    min_silencio = VAD_MIN_SILENCIO_MS / 1000
+    duracao_total = len(audio) / SAMPLE_RATE
+
+    regioes = []
+    for inicio_q, fim_q in zip(bordas[::2], bordas[1::2]):
+        inicio = max(0.0, inicio_q * duracao_quadro - margem)
+        fim = min(duracao_total, fim_q * duracao_quadro + margem)
+        if regioes and inicio - regioes[-1][1] < min_silencio:
+            regioes[-1] = (regioes[-1][0], fim)
+        else:
+            regioes.append((inicio, fim))
+    return regioes
+
+
+def detectar_fala(audio):
+    """Retorna as regiões de fala [(inicio, fim), ...] em segundos."""
+    if audio is None or len(audio) == 0:
+        return []
+    try:
+        return _regioes_silero(audio)
+    except Exception as e:
+        logger.warning(f"VAD Silero indisponível ({e}). Usando detecção por energia.")
+        return _regioes_energia(audio)
+
+
+def duracao_fala(regioes):
+    return sum(fim - inicio for inicio, fim in regioes)
+
+
+def concatenar_regioes(audio, regioes):
+    """
+    Junta só os trechos de fala, separados por um curto silêncio.
+    Retorna (audio_fala, mapa), onde o mapa é uma lista de
+    (inicio_concatenado, inicio_original, fim_original) para `remapear_tempo`.
+    """
+    intervalo = np.zeros(SAMPLE_RATE * VAD_INTERVALO_MS // 1000, dtype=np.float32)
+    partes = []
+    mapa = []
+    posicao = 0.0
+    for inicio, fim in regioes:
+        trecho = audio[int(inicio * SAMPLE_RATE):int(fim * SAMPLE_RATE)]
+        if partes:
+            partes.append(intervalo)
+            posicao += len(intervalo) / SAMPLE_RATE
+        mapa.append((posicao, inicio, inicio + len(trecho) / SAMPLE_RATE))
+        partes.append(trecho)
+        posicao += len(trecho) / SAMPLE_RATE
+
+    if not partes:
+        return np.zeros(0, dtype=np.float32), []
+    return np.concatenate(partes).astype(np.float32, copy=False), mapa
+
+
+def remapear_tempo(tempo, mapa):
+    """Converte um tempo do áudio concatenado para a linha do tempo original."""
+    if not mapa:
+        return tempo
+    indice = max(0, bisect.bisect_right([m[0] for m in mapa], tempo) - 1)
+    inicio_concat, inicio_original, fim_original = mapa[indice]
+    # Tempos que caem no silêncio inserido ficam presos ao fim da região anterior
+    return min(inicio_original + max(0.0, tempo - inicio_concat), fim_original)
@@ -2,11 +2,9 @@
 import json
 import logging
 import os
-import random
 import re
 import uuid
 from datetime import timedelta
-import shutil
 import requests
 import stripe
 import yt_dlp
@@ -15,14 +13,14 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Count, Q, Sum
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.core.mail import send_mail
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods, require_POST
+from django.views.decorators.http import condition, require_http_methods, require_POST
 from django.http import JsonResponse
 from .models import VideoGerado
 
@@ -34,6 +32,7 @@ from .forms import (
     EditarAssinaturaForm,
     EditarPerfilForm,
     GeradorForm,
+    VOZES_KOKORO,
 )
 from .models import (
     Assinatura,
@@ -47,7 +46,13 @@ from .models import (
     VideoBase,
     VideoGerado,
 )
-from .services import gerar_audio_e_tempos, estimar_tempo_narracao as estimar_tempo_narracao_service
+from .services import (
+    estimar_tempo_narracao as estimar_tempo_narracao_service,
+    obter_preview_voz,
+    preview_voz_falhou,
+    preview_voz_pronto,
+    versao_preview_voz,
+)
 from .tasks import task_processar_corte_youtube, task_processar_geracao_video
 from .utils import (
     delete_from_r2,
@@ -56,6 +61,7 @@ from .utils import (
     is_token_valid,
     send_verification_email,
     upload_fileobj_to_r2,
+    urls_midia_biblioteca,
 )
 
 logger = logging.getLogger(__name__)
@@ -89,58 +95,70 @@ def _get_user_video_usage(user):
     return videos_criados, limite_videos_mes, assinatura_ativa
 
 
+def _voz_valida(nome_da_voz):
+    return any(nome == nome_da_voz for nome, _ in VOZES_KOKORO)
+
+
+def _preview_em_geracao(nome_da_voz):
+    """
+    202 enquanto o preview é sintetizado em segundo plano (o cliente tenta de
+    novo), ou 500 se a última tentativa falhou há pouco.
+    """
+    if preview_voz_falhou(nome_da_voz):
+        return JsonResponse({"error": "Erro ao gerar áudio de demonstração."}, status=500)
+    response = JsonResponse({"status": "gerando"}, status=202)
+    response["Retry-After"] = "2"
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _etag_preview_voz(request, nome_da_voz):
+    return versao_preview_voz(nome_da_voz) if _voz_valida(nome_da_voz) else None
+
+
 @login_required
 @require_http_methods(["GET", "POST"]) # <--- CORREÇÃO: Aceita GET para players de áudio
 def preview_voz(request, nome_da_voz):
     """
-    Gera um preview de áudio para uma voz específica e retorna a URL.
+    Retorna a URL do preview de áudio de uma voz específica.
     Aceita GET para permitir que tags <audio src="..."> funcionem diretamente.
+    A URL é versionada, então o navegador pode guardar o áudio em cache.
     """
-    caminho_audio_temp = None
-    
-    try:
-        # Texto padrão para o teste
-        texto_teste = "Olá! Esta é uma demonstração da voz que você escolheu para o seu vídeo."
-        
-        # Gera o áudio usando o Service (que suporta as novas vozes misturadas)
-        caminho_audio_temp, _, _ = gerar_audio_e_tempos(
-            texto=texto_teste,
-            voz=nome_da_voz,
-            velocidade=100
-        )
+    if not _voz_valida(nome_da_voz):
+        return JsonResponse({"error": "Voz desconhecida."}, status=404)
 
-        if not caminho_audio_temp or not os.path.exists(caminho_audio_temp):
-            raise Exception("Falha ao gerar o arquivo de áudio temporário.")
+    if not preview_voz_pronto(nome_da_voz):
+        return _preview_em_geracao(nome_da_voz)
 
-        # Define pasta pública para previews
-        preview_dir_relativo = 'audio_previews'
-        preview_dir_absoluto = os.path.join(settings.MEDIA_ROOT, preview_dir_relativo)
-        os.makedirs(preview_dir_absoluto, exist_ok=True)
-        
-        # Nome único para evitar cache do navegador
-        nome_arquivo = f"preview_{nome_da_voz}_{request.user.id}_{random.randint(1000, 9999)}.wav"
-        caminho_audio_final = os.path.join(preview_dir_absoluto, nome_arquivo)
+    url_audio = reverse("preview_voz_audio", args=[nome_da_voz])
+    return JsonResponse({"url": f"{url_audio}?v={versao_preview_voz(nome_da_voz)}"})
 
-        # Move o arquivo (shutil.move é mais seguro que os.rename entre partições Docker)
-        shutil.move(caminho_audio_temp, caminho_audio_final)
 
-        # Gera a URL
-        url_audio = os.path.join(settings.MEDIA_URL, preview_dir_relativo, nome_arquivo).replace('\\', '/')
+@login_required
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_etag_preview_voz)
+def preview_voz_audio(request, nome_da_voz):
+    """
+    Serve o MP3 de demonstração da voz. O arquivo é renderizado uma única vez
+    (no deploy via `gerar_previews_voz` ou, em segundo plano, no primeiro acesso)
+    e reutilizado. Enquanto não existe, a resposta é 202.
+    """
+    if not _voz_valida(nome_da_voz):
+        raise Http404("Voz desconhecida.")
 
-        return JsonResponse({'url': url_audio})
+    if not preview_voz_pronto(nome_da_voz):
+        return _preview_em_geracao(nome_da_voz)
 
+    try:
+        caminho_preview = obter_preview_voz(nome_da_voz)
     except Exception as e:
         logger.error(f"Erro ao gerar preview de voz '{nome_da_voz}': {e}", exc_info=True)
-        
-        # Tenta limpar lixo se sobrou
-        if caminho_audio_temp and os.path.exists(caminho_audio_temp):
-            try:
-                os.remove(caminho_audio_temp)
-            except:
-                pass
-                
         return JsonResponse({"error": "Erro ao gerar áudio de demonstração."}, status=500)
 
+    response = FileResponse(open(caminho_preview, "rb"), content_type="audio/mpeg")
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
 @login_required
 def meus_videos(request):
     # --- LÓGICA DE NOTIFICAÇÃO ---
@@ -219,21 +237,20 @@ def video_download_page(request, video_id):
 def videos_por_categoria(request, categoria_id):
     try:
         categoria = get_object_or_404(CategoriaVideo, id=categoria_id)
-        videos = (
+        videos = list(
             VideoBase.objects.filter(categoria=categoria)
             .exclude(object_key__isnull=True)
             .exclude(object_key__exact="")
+            .values_list("id", "object_key", "titulo")
         )
 
-        videos_data = []
-        for video in videos:
-            presigned_url = generate_presigned_url(
-                video.object_key, expiration=3600
-            )  # 1 hour
-            if presigned_url:
-                videos_data.append(
-                    {"id": video.id, "url": presigned_url, "titulo": video.titulo}
-                )
+        # URL pública (ou todas assinadas de uma vez, com cache) em vez de uma assinatura por vídeo
+        urls = urls_midia_biblioteca([object_key for _, object_key, _ in videos], expiration=3600)
+        videos_data = [
+            {"id": video_id, "url": urls[object_key], "titulo": titulo}
+            for video_id, object_key, titulo in videos
+            if object_key in urls
+        ]
 
         return JsonResponse({"videos": videos_data})
 
@@ -256,8 +273,8 @@ def preview_video_base(request, categoria_id):
                 status=404,
             )
 
-        presigned_url = generate_presigned_url(
-            video_base.object_key, expiration=300
+        presigned_url = urls_midia_biblioteca([video_base.object_key], expiration=300).get(
+            video_base.object_key
         )  # 5 minutos
 
         if not presigned_url:
@@ -190,4 +190,145 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60      # 30 minutos máximo
 CELERY_TASK_SOFT_TIME_LIMIT = 28 * 60 # Aviso com 28 minutos
-CELERY_WORKER_MAX_TASKS_PER_CHILD = 1 # Reinicia o worker após cada vídeo para limpar RAM
\ No newline at end of file
+CELERY_WORKER_MAX_TASKS_PER_CHILD = 1 # Reinicia o worker após cada vídeo para limpar RAM
+# Índice de disponibilidade da biblioteca (VideoBase/MusicaBase x R2)
+R2_RECONCILIACAO_MINUTOS = env.int('R2_RECONCILIACAO_MINUTOS', default=15)
+CELERY_BEAT_SCHEDULE = {
+    'reconciliar-midias-r2': {
+        'task': 'core.tasks.task_reconciliar_midias_r2',
+        'schedule': R2_RECONCILIACAO_MINUTOS * 60,
+    },
+}
+
+# ================================================================
+# CONFIGURAÇÕES DE TTS (Kokoro)
+# ================================================================
+KOKORO_REPO_ID = env('KOKORO_REPO_ID', default='hexgrad/Kokoro-82M')
+# Idiomas carregados no início do worker do Celery (evita pagar o load na 1ª tarefa)
+KOKORO_IDIOMAS_AQUECIMENTO = env.list('KOKORO_IDIOMAS_AQUECIMENTO', default=['p'])
+KOKORO_AQUECER_WORKER = env.bool('KOKORO_AQUECER_WORKER', default=True)
+# Quantas vozes fora do formulário ficam em memória antes do descarte LRU
+KOKORO_VOZES_CACHE_MAX = env.int('KOKORO_VOZES_CACHE_MAX', default=8)
+# Depois de uma falha ao gerar o preview de uma voz, responde 500 (sem nova síntese) por N segundos
+PREVIEW_VOZ_FALHA_SEGUNDOS = env.int('PREVIEW_VOZ_FALHA_SEGUNDOS', default=300)
+
+# ================================================================
+# CACHES LOCAIS DOS WORKERS
+# ================================================================
+CACHE_LOCAL_DIR = env('CACHE_LOCAL_DIR', default=str(BASE_DIR / 'cache'))
+# Narrações já sintetizadas (chave: texto normalizado + voz + velocidade)
+TTS_CACHE_MAX_MB = env.int('TTS_CACHE_MAX_MB', default=1024)
+# Compartilha o cache de narrações entre workers via R2 (prefixo cache/narracao/)
+TTS_CACHE_R2 = env.bool('TTS_CACHE_R2', default=False)
+# Vídeos de fundo e músicas da biblioteca (chave: object_key + ETag do R2)
+ATIVOS_CACHE_MAX_MB = env.int('ATIVOS_CACHE_MAX_MB', default=8192)
+ATIVOS_ETAG_TTL_SEGUNDOS = env.int('ATIVOS_ETAG_TTL_SEGUNDOS', default=300)
+
+# ================================================================
+# CONFIGURAÇÕES DO WHISPER (faster-whisper)
+# ================================================================
+WHISPER_MODELO_PADRAO = env('WHISPER_MODELO_PADRAO', default='medium')
+WHISPER_DEVICE = env('WHISPER_DEVICE', default='cpu')
+WHISPER_COMPUTE_TYPE = env('WHISPER_COMPUTE_TYPE', default='int8')
+# Tarefas com a mesma configuração compartilham o mesmo modelo em memória
+WHISPER_MODELOS = {
+    # Legendas SRT dos cortes
+    'transcricao': {
+        'tamanho': env('WHISPER_MODELO_TRANSCRICAO', default=WHISPER_MODELO_PADRAO),
+        'compute_type': env('WHISPER_COMPUTE_TYPE_TRANSCRICAO', default=WHISPER_COMPUTE_TYPE),
+    },
+    # SubtitleProcessor: legendas automáticas com tempos por palavra
+    'legendas': {
+        'tamanho': env('WHISPER_MODELO_LEGENDAS', default='large-v3'),
+        'compute_type': env('WHISPER_COMPUTE_TYPE_LEGENDAS', default=WHISPER_COMPUTE_TYPE),
+    },
+    # Tempos por palavra (fallback da legenda karaokê)
+    'palavras': {
+        'tamanho': env('WHISPER_MODELO_PALAVRAS', default=WHISPER_MODELO_PADRAO),
+        'compute_type': env('WHISPER_COMPUTE_TYPE_PALAVRAS', default=WHISPER_COMPUTE_TYPE),
+    },
+}
+# Descarrega o modelo após N segundos sem uso (0 desativa)
+WHISPER_OCIOSO_SEGUNDOS = env.int('WHISPER_OCIOSO_SEGUNDOS', default=600)
+# Inferência em lote no worker de transcrição (0 desativa)
+WHISPER_BATCH_SIZE = env.int('WHISPER_BATCH_SIZE', default=0)
+WHISPER_AQUECER_WORKER = env.bool('WHISPER_AQUECER_WORKER', default=False)
+
+# Worker dedicado de transcrição (fila 'transcricao', modelo residente)
+TRANSCRICAO_REMOTA = env.bool('TRANSCRICAO_REMOTA', default=False)
+# Pedidos de jobs diferentes juntados numa única inferência em lote
+TRANSCRICAO_LOTE_MAX = env.int('TRANSCRICAO_LOTE_MAX', default=16)
+# Pedido retirado há mais que isso sem callback = worker morreu; volta para a fila
+TRANSCRICAO_PEDIDO_MAX_SEGUNDOS = env.int('TRANSCRICAO_PEDIDO_MAX_SEGUNDOS', default=CELERY_TASK_TIME_LIMIT)
+TRANSCRICAO_TENTATIVAS_MAX = env.int('TRANSCRICAO_TENTATIVAS_MAX', default=2)
+if TRANSCRICAO_REMOTA:
+    # Varredura periódica: esvazia pedidos cujo gatilho falhou e recupera os abandonados
+    CELERY_BEAT_SCHEDULE['transcricao-pendentes'] = {
+        'task': 'core.tasks.task_transcrever_lote',
+        'schedule': env.int('TRANSCRICAO_VARREDURA_SEGUNDOS', default=60),
+        'options': {'expires': 60},
+    }
+CELERY_TASK_ROUTES = {
+    'core.tasks.task_transcrever_lote': {'queue': 'transcricao'},
+}
+
+# VAD antes da transcrição dos cortes (pula música e silêncio)
+TRANSCRICAO_VAD = env.bool('TRANSCRICAO_VAD', default=True)
+VAD_MIN_FALA_SEGUNDOS = env.float('VAD_MIN_FALA_SEGUNDOS', default=2.0)
+
+# ==============================================================================
+# RENDERIZAÇÃO
+# ==============================================================================
+# Cenas, legendas, overlays, áudio e thumbnail num único grafo/codificação do ffmpeg
+RENDER_PASSAGEM_UNICA = env.bool('RENDER_PASSAGEM_UNICA', default=True)
+RENDER_TIMEOUT = env.int('RENDER_TIMEOUT', default=900)
+# Cenas de fundo (Pexels/Pollinations) buscadas em paralelo
+CENAS_CONCORRENCIA = env.int('CENAS_CONCORRENCIA', default=4)
+CENAS_TIMEOUT_SEGUNDOS = env.int('CENAS_TIMEOUT_SEGUNDOS', default=90)
+# Ken Burns das cenas de imagem: "filtro" (zoompan sobreamostrado 1.15x) ou "pillow" (quadros crus)
+KEN_BURNS_MOTOR = env('KEN_BURNS_MOTOR', default='filtro')
+# Cache de cenas de fundo (imagens Flux por prompt, clipes Pexels normalizados por id)
+CENAS_CACHE_MAX_MB = env.int('CENAS_CACHE_MAX_MB', default=4096)
+CENAS_CACHE_R2 = env.bool('CENAS_CACHE_R2', default=False)
+# Chance de reaproveitar uma cena em cache (0 = sempre buscar uma nova)
+CENAS_CACHE_REUSO = env.float('CENAS_CACHE_REUSO', default=0.7)
+CENAS_CACHE_VARIANTES = env.int('CENAS_CACHE_VARIANTES', default=3)
+# Roteiro das cenas: espera máxima pelo LLM antes de usar o roteiro local
+ROTEIRO_TIMEOUT_SEGUNDOS = env.int('ROTEIRO_TIMEOUT_SEGUNDOS', default=8)
+
+# ==============================================================================
+# HTTP EXTERNO (Pollinations, Pexels, URLs do R2)
+# ==============================================================================
+HTTP_TENTATIVAS = env.int('HTTP_TENTATIVAS', default=3)
+HTTP_BACKOFF = env.float('HTTP_BACKOFF', default=0.5)
+HTTP_CONEXOES_POR_HOST = env.int('HTTP_CONEXOES_POR_HOST', default=8)
+# Tempo total de uma chamada com as retentativas (abaixo de CENAS_TIMEOUT_SEGUNDOS)
+HTTP_PRAZO_SEGUNDOS = env.int('HTTP_PRAZO_SEGUNDOS', default=75)
+# Pexels: o ffmpeg lê o clipe direto da URL ao normalizar (sem o arquivo cru em disco)
+PEXELS_FFMPEG_DIRETO = env.bool('PEXELS_FFMPEG_DIRETO', default=False)
+
+# ==============================================================================
+# CODIFICAÇÃO (perfis em core/encoder_profiles.py)
+# ==============================================================================
+# Perfil quando nem o job nem o plano escolhem um: "rascunho", "padrao" ou "premium"
+ENCODER_PERFIL_PADRAO = env('ENCODER_PERFIL_PADRAO', default='padrao')
+
+# ==============================================================================
+# CLIENTE R2 (boto3 compartilhado por processo, core/r2_client.py)
+# ==============================================================================
+R2_CONEXOES = env.int('R2_CONEXOES', default=20)
+R2_TENTATIVAS = env.int('R2_TENTATIVAS', default=3)
+# Uploads/downloads acima disso vão em partes paralelas (multipart)
+R2_MULTIPART_MB = env.int('R2_MULTIPART_MB', default=16)
+R2_TRANSFERENCIA_THREADS = env.int('R2_TRANSFERENCIA_THREADS', default=8)
+# Vídeos/músicas da biblioteca servidos pelo CLOUDFLARE_R2_PUBLIC_URL, sem assinar URL.
+# Só ligar se o bucket (ou o prefixo media/) estiver de fato exposto no domínio público
+R2_BIBLIOTECA_PUBLICA = env.bool('R2_BIBLIOTECA_PUBLICA', default=False)
+# Por quanto tempo (no máximo) uma URL assinada é reaproveitada
+PRESIGNED_CACHE_MAX_SEGUNDOS = env.int('PRESIGNED_CACHE_MAX_SEGUNDOS', default=600)
+PRESIGNED_CACHE_MAX_ENTRADAS = env.int('PRESIGNED_CACHE_MAX_ENTRADAS', default=10000)
+# Escolha aleatória de mídia: ids por categoria no Redis e mídias recentes evitadas
+MIDIA_IDS_TTL_SEGUNDOS = env.int('MIDIA_IDS_TTL_SEGUNDOS', default=60)
+MIDIA_RECENTES_EVITADAS = env.int('MIDIA_RECENTES_EVITADAS', default=5)
+# Ids por categoria e escolhas recentes ficam no Redis do broker, sob este prefixo
+MIDIA_REDIS_PREFIXO = env('MIDIA_REDIS_PREFIXO', default='midia')
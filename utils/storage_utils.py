@@ -1,19 +1,14 @@
-import boto3
 from botocore.exceptions import ClientError
 from django.conf import settings
 
+from core.r2_client import get_r2_client
+
 def criar_pasta_r2(caminho_completo):
     """
     Cria uma pasta no Cloudflare R2
     """
     try:
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
+        s3_client = get_r2_client()
         
         # Cria objeto vazio para simular pasta
         s3_client.put_object(
@@ -32,13 +27,7 @@ def listar_arquivos_na_pasta(caminho_pasta):
     Lista todos os arquivos em uma pasta do R2
     """
     try:
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
+        s3_client = get_r2_client()
         
         response = s3_client.list_objects_v2(
             Bucket=settings.AWS_STORAGE_BUCKET_NAME,